@@ -6,36 +6,42 @@ os.environ['TQDM_DISABLE'] = '1'
 
 import asyncio
 import logging
+import time
+import uuid
 import numpy as np
-import torch
 import json
+import re
 import wave
 import io
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from collections import deque
-from typing import Dict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
 from datetime import datetime
 from qdrant_client import QdrantClient
 
-try:
-    from sentence_transformers import SentenceTransformer
-    # Monkey-patch the encode method to disable progress bar
-    if SentenceTransformer is not None:
-        _original_encode = SentenceTransformer.encode
-        def _encode_no_progress(self, *args, **kwargs):
-            kwargs['show_progress_bar'] = False
-            return _original_encode(self, *args, **kwargs)
-        SentenceTransformer.encode = _encode_no_progress
-except Exception:
-    SentenceTransformer = None
-
 # Import application modules
 from app.services.vector_store_service import VectorStoreService
-from app.services.llm_service import LLMService
+from app.services.embedding_service import EMBEDDING_MODEL, load_embedding_model
+from app.services.vad_service import SileroVAD
+from app.services.llm_router_service import create_llm_router
 from app.services.tts_service import TTSService
 from app.services.asr_service import ASRService
 from app.services.database_service import db_service
+from app.services.endpointing_service import AdaptiveEndpointer
+from app.services.menu_catalog_service import menu_catalog
+from app.services.reservation_service import reservation_service
+from app.services.print_worker_service import PRINT_WORKER_MODE, print_worker
+from app.services.leader_service import leader
+from app.services.session_store_service import InMemorySessionStore, create_session_store
+from app.services.tracing_service import NULL_TRACE, tracer
+from app.services.hedging_service import deadline_after
+from app.services.metrics_service import DROPPED_FRAMES, VAD_FRAMES, register_live_gauges, render_metrics
+from app.services.audio_codec_service import (
+    CODEC_OPUS, CODEC_PCM, OPUS_AVAILABLE, OpusFrameDecoder, encode_wav_to_ogg_opus, negotiate_codec
+)
 from app.config.prompts import get_prompt_with_menu
 from app.tools.order_tools import TOOLS, OrderToolExecutor
 
@@ -61,6 +67,16 @@ vector_store_service = None
 llm_service = None
 tts_service = None
 asr_service = None
+session_store = None
+
+# Silero VAD ONNX model, vendored so startup never goes to torch.hub / GitHub
+SILERO_VAD_MODEL = os.getenv("SILERO_VAD_MODEL", str(Path(__file__).parent / "models" / "silero_vad.onnx"))
+
+# Startup: services that must be up for /readyz, and how long a kiosk connecting
+# during startup waits before being turned away (close code 1013, try again later)
+REQUIRED_SERVICES = ("database", "vad", "vector_store", "llm", "asr", "tts")
+STARTUP_WAIT_SECONDS = float(os.getenv("STARTUP_WAIT_SECONDS", "30"))
+DB_CONNECT_ATTEMPTS = int(os.getenv("DB_CONNECT_ATTEMPTS", "5"))
 
 # VAD settings
 SAMPLE_RATE = 16000
@@ -70,27 +86,53 @@ MIN_SILENCE_MS = 500
 PRE_ROLL_MS = 300
 POST_ROLL_MS = 500
 
-# Active connections
+# Sentence boundaries for streaming TTS
+SENTENCE_END = re.compile(r'([.!?]+)')
+
+# Barge-in settings (customer speech during bot playback cancels the turn)
+BARGE_IN_ENABLED = os.getenv("BARGE_IN_ENABLED", "true").lower() in ("1", "true", "yes")
+BARGE_IN_MIN_SPEECH_MS = int(os.getenv("BARGE_IN_MIN_SPEECH_MS", "200"))
+
+# Time budget of a turn from end-of-speech; ASR/TTS calls are cut off (or skipped) once it's spent
+TURN_DEADLINE_S = float(os.getenv("TURN_DEADLINE_S", "30"))
+
+# Frames buffered between the socket receiver and VAD (~2 s); oldest dropped when full
+AUDIO_QUEUE_MAX_FRAMES = int(os.getenv("AUDIO_QUEUE_MAX_FRAMES", "64"))
+
+# Adaptive endpointing (MIN_SILENCE_MS is the base wait, tuned via ENDPOINT_* env vars)
+endpointer = AdaptiveEndpointer(SAMPLE_RATE, CHUNK_SIZE, MIN_SILENCE_MS)
+
+# Active connections (per-socket state; durable session fields also live in session_store)
 connections: Dict[str, dict] = {}
 
+# Per-service startup state ("starting" / "ready" / "failed") and init time, for /readyz and /health
+startup_status: Dict[str, dict] = {}
+startup_complete = asyncio.Event()
+startup_task = None
+
+# Connection and DB pool gauges are read from live state on every /metrics scrape
+register_live_gauges(lambda: len(connections), lambda: db_service.pool)
+
 
 def init_vad():
-    """Initialize Silero VAD model."""
+    """Initialize Silero VAD model from the vendored ONNX file."""
     global vad_model
     if vad_model is None:
-        logger.info("Loading Silero VAD model...")
-        vad_model, _ = torch.hub.load(
-            repo_or_dir='snakers4/silero-vad',
-            model='silero_vad',
-            force_reload=False,
-            onnx=True
-        )
+        logger.info(f"Loading Silero VAD model from {SILERO_VAD_MODEL}...")
+        vad_model = SileroVAD(SILERO_VAD_MODEL, SAMPLE_RATE)
         logger.info("VAD model loaded successfully")
     return vad_model
 
 
-async def init_vector_store():
-    """Initialize Qdrant vector store and embedding model."""
+async def init_vector_store(database_ready: Awaitable = None):
+    """
+    Initialize Qdrant vector store and embedding model.
+
+    Args:
+        database_ready: Awaited after the embedding model is loaded and before
+            the collection is built from PostgreSQL, so the model load (the slow
+            part) overlaps with the database startup
+    """
     global qdrant_client, embedding_model, vector_store_service
     if vector_store_service is None:
         try:
@@ -98,17 +140,17 @@ async def init_vector_store():
             qdrant_client = QdrantClient(host="hotelorderbot-qdrant", port=6333)
             logger.info("Qdrant connected successfully")
 
-            logger.info("Loading multilingual embedding model 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'...")
-            if SentenceTransformer is None:
-                raise RuntimeError("sentence_transformers is not installed or failed to import")
-
-            # Using paraphrase-multilingual-MiniLM-L12-v2 - supports 50+ languages including Tamil
-            # No gated access required
-            embedding_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+            logger.info(f"Loading multilingual embedding model '{EMBEDDING_MODEL}'...")
+            # paraphrase-multilingual-MiniLM-L12-v2 - supports 50+ languages including Tamil
+            embedding_model = await asyncio.to_thread(load_embedding_model)
             logger.info("Embedding model loaded successfully")
 
-            vector_store_service = VectorStoreService(qdrant_client, embedding_model)
-            await vector_store_service.initialize_collection()
+            if database_ready is not None:
+                await database_ready
+
+            service = VectorStoreService(qdrant_client, embedding_model)
+            await service.ensure_collection()
+            vector_store_service = service
 
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
@@ -116,12 +158,12 @@ async def init_vector_store():
 
 
 def init_llm():
-    """Initialize LLM service."""
+    """Initialize LLM service (router over the configured providers)."""
     global llm_service
     if llm_service is None:
         try:
-            logger.info("Initializing Groq LLM service...")
-            llm_service = LLMService()
+            logger.info("Initializing LLM router...")
+            llm_service = create_llm_router()
             logger.info("LLM service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize LLM service: {e}")
@@ -135,7 +177,7 @@ def init_tts():
     global tts_service
     if tts_service is None:
         try:
-            logger.info("Initializing Sarvam TTS service...")
+            logger.info("Initializing TTS service...")
             tts_service = TTSService()
             logger.info("TTS service initialized successfully")
         except Exception as e:
@@ -148,7 +190,7 @@ def init_asr():
     global asr_service
     if asr_service is None:
         try:
-            logger.info("Initializing Sarvam ASR service...")
+            logger.info("Initializing ASR service...")
             asr_service = ASRService()
             logger.info("ASR service initialized successfully")
         except Exception as e:
@@ -156,6 +198,68 @@ def init_asr():
     return asr_service
 
 
+async def init_session_store():
+    """Initialize the session store (falls back to in-memory if the shared backend fails)."""
+    global session_store
+    if session_store is None:
+        session_store = create_session_store()
+        try:
+            await session_store.initialize()
+        except Exception as e:
+            logger.error(f"Failed to initialize session store, using in-memory store: {e}")
+            session_store = InMemorySessionStore()
+    return session_store
+
+
+async def save_session(client_state: dict):
+    """Persist the client's durable session fields (errors are logged, not raised)."""
+    if session_store is None or not client_state.get("session_id"):
+        return
+    try:
+        await session_store.save(client_state["session_id"], client_state)
+    except Exception as e:
+        logger.error(f"Failed to save session {client_state['session_id']}: {e}")
+
+
+async def resume_session(client_state: dict, websocket: WebSocket):
+    """
+    Restore a saved session into a new connection's state (reconnect, restart
+    or a different worker) and tell the client what was restored.
+
+    Args:
+        client_state: Fresh per-connection state (session_id already set)
+        websocket: WebSocket connection
+    """
+    if session_store is None:
+        return
+    try:
+        saved = await session_store.load(client_state["session_id"])
+    except Exception as e:
+        logger.error(f"Failed to load session {client_state['session_id']}: {e}")
+        return
+    if not saved:
+        return
+
+    client_state.update(saved)
+
+    if client_state.get("order_status") == "completed":
+        # Previous order went through - the kiosk reconnects to start the next one
+        client_state["current_order"] = []
+        client_state["conversation_history"] = []
+    # Never resume with ASR paused (e.g. the worker died mid-confirmation)
+    client_state["asr_active"] = True
+    client_state["order_status"] = "active"
+
+    logger.info(f"Resumed session {client_state['session_id']} with {len(client_state['current_order'])} cart item(s)")
+    await websocket.send_json({
+        "type": "session_resumed",
+        "session_id": client_state["session_id"],
+        "current_order": client_state["current_order"],
+        "total": sum(item.get("price", 0) * item.get("quantity", 0) for item in client_state["current_order"]),
+        "order_count": client_state.get("order_count", 0)
+    })
+
+
 def filter_price_mentions(user_query: str, bot_response: str) -> str:
     """
     Filter out price mentions from bot response if user didn't ask for price.
@@ -240,13 +344,13 @@ def filter_price_mentions(user_query: str, bot_response: str) -> str:
     return filtered_response if filtered_response else bot_response
 
 
-async def process_audio_chunk(audio_data: bytes, client_id: str) -> bool:
+async def process_audio_chunk(audio_data: bytes, client_state: dict) -> bool:
     """
     Process audio chunk through VAD to detect speech.
 
     Args:
         audio_data: Raw audio bytes
-        client_id: Unique client identifier
+        client_state: Connection state (holds this client's VAD stream state)
 
     Returns:
         True if speech detected, False otherwise
@@ -257,8 +361,10 @@ async def process_audio_chunk(audio_data: bytes, client_id: str) -> bool:
         if len(audio_np) != CHUNK_SIZE:
             return False
 
-        audio_tensor = torch.from_numpy(audio_np)
-        speech_prob = vad_model(audio_tensor, SAMPLE_RATE).item()
+        vad_state = client_state.get("vad_state")
+        if vad_state is None:
+            vad_state = client_state["vad_state"] = vad_model.new_state()
+        speech_prob = vad_model.speech_probability(audio_np, vad_state)
 
         return speech_prob > VAD_THRESHOLD
     except Exception as e:
@@ -266,13 +372,98 @@ async def process_audio_chunk(audio_data: bytes, client_id: str) -> bool:
         return False
 
 
-async def send_to_asr(audio_buffer: bytes, language: str = "ta-IN") -> str:
+def estimate_audio_duration(audio_bytes: bytes) -> float:
+    """
+    Estimate playback duration of a WAV clip from its header.
+
+    Args:
+        audio_bytes: WAV audio bytes (as returned by TTS)
+
+    Returns:
+        Duration in seconds (0.0 if the header can't be read)
+    """
+    try:
+        with wave.open(io.BytesIO(audio_bytes), 'rb') as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except Exception:
+        return 0.0
+
+
+async def send_bot_audio(websocket: WebSocket, client_state: dict, audio_bytes: bytes):
+    """
+    Send bot audio to the client and extend the estimated playback window,
+    so barge-in keeps working while the client is still playing it.
+    Clients that negotiated Opus get Ogg Opus instead of WAV.
+
+    Args:
+        websocket: WebSocket connection
+        client_state: Client state (playback_until is updated)
+        audio_bytes: WAV audio to send
+    """
+    payload = audio_bytes
+    if client_state.get("downlink_codec") == CODEC_OPUS:
+        encoded = await asyncio.to_thread(encode_wav_to_ogg_opus, audio_bytes)
+        if encoded:
+            payload = encoded
+
+    await websocket.send_bytes(payload)
+    trace = client_state.get("trace", NULL_TRACE)
+    trace.event("first_audio_byte", once=True)
+    trace.set_event("last_audio_byte")
+    client_state["turn_committed"] = True
+    now = time.monotonic()
+    client_state["playback_until"] = max(now, client_state.get("playback_until", 0.0)) + estimate_audio_duration(audio_bytes)
+
+
+def is_bot_speaking(client_state: dict) -> bool:
+    """True while a turn is being processed or bot audio is still playing on the client."""
+    turn_task = client_state.get("turn_task")
+    if turn_task is not None and not turn_task.done():
+        return True
+    return time.monotonic() < client_state.get("playback_until", 0.0)
+
+
+async def barge_in(client_id: str, client_state: dict, websocket: WebSocket):
+    """
+    Customer started talking over the bot: cancel the in-flight LLM request and
+    pending TTS work, and tell the client to stop playback. The customer's speech
+    keeps being buffered and becomes the next turn.
+
+    If the interrupted turn had not said or done anything yet, the endpoint was
+    premature (the customer only paused), so the previous utterance is glued back
+    in front of the new speech instead of being lost.
+
+    Args:
+        client_id: Unique client identifier
+        client_state: Client state
+        websocket: WebSocket connection
+    """
+    logger.info(f"Client {client_id}: 🗣️ Barge-in detected, stopping bot")
+
+    turn_task = client_state.get("turn_task")
+    if turn_task is not None and not turn_task.done():
+        # Cancels the awaited LLM call and any TTS tasks gathered inside the turn
+        turn_task.cancel()
+        if not client_state.get("turn_committed", True):
+            logger.info(f"Client {client_id}: Turn had no output yet, merging previous utterance")
+            client_state["speech_buffer"][:0] = client_state.get("last_utterance_audio", b"")
+    client_state["turn_task"] = None
+    client_state["playback_until"] = 0.0
+
+    await websocket.send_json({
+        "type": "stop_playback",
+        "reason": "barge_in"
+    })
+
+
+async def send_to_asr(audio_buffer: bytes, language: str = "ta-IN", deadline: float = None) -> str:
     """
     Send audio to Sarvam ASR API for transcription.
 
     Args:
         audio_buffer: Complete audio buffer (raw PCM)
         language: Language code (default: "ta-IN" for Tamil)
+        deadline: Turn deadline (time.monotonic() timestamp), None for speculative ASR
 
     Returns:
         Transcribed text
@@ -296,7 +487,7 @@ async def send_to_asr(audio_buffer: bytes, language: str = "ta-IN") -> str:
         wav_bytes = wav_buffer.getvalue()
         
         # Send to ASR
-        transcription = await asr_service.transcribe(wav_bytes, language)
+        transcription = await asr_service.transcribe(wav_bytes, language, deadline=deadline)
         
         logger.info(f"ASR Transcription ({language}): {transcription}")
         return transcription
@@ -325,6 +516,33 @@ def detect_order_confirmation(user_input: str) -> bool:
     return any(keyword in user_lower for keyword in confirmation_keywords)
 
 
+def split_sentences(text: str) -> list:
+    """
+    Split text into sentences for TTS, keeping each sentence's punctuation.
+
+    Args:
+        text: Full response text
+
+    Returns:
+        List of non-empty sentences
+    """
+    # Split on periods, question marks, exclamation marks
+    sentences = SENTENCE_END.split(text)
+
+    # Recombine sentence with its punctuation
+    combined_sentences = []
+    for i in range(0, len(sentences) - 1, 2):
+        sentence = sentences[i].strip()
+        if sentence:
+            combined_sentences.append(sentence + sentences[i + 1])
+
+    # Add last sentence if it doesn't have punctuation
+    if len(sentences) % 2 == 1 and sentences[-1].strip():
+        combined_sentences.append(sentences[-1].strip())
+
+    return combined_sentences
+
+
 async def stream_tts_by_sentence(text: str, websocket: WebSocket, client_state: dict):
     """
     Stream TTS audio by splitting text into sentences and processing each immediately.
@@ -339,21 +557,7 @@ async def stream_tts_by_sentence(text: str, websocket: WebSocket, client_state:
         return
 
     try:
-        # Split text by sentences (split on periods, question marks, exclamation marks)
-        import re
-        sentences = re.split(r'([.!?]+)', text)
-
-        # Recombine sentence with its punctuation
-        combined_sentences = []
-        for i in range(0, len(sentences) - 1, 2):
-            sentence = sentences[i].strip()
-            punct = sentences[i + 1] if i + 1 < len(sentences) else ''
-            if sentence:
-                combined_sentences.append(sentence + punct)
-
-        # Add last sentence if it doesn't have punctuation
-        if len(sentences) % 2 == 1 and sentences[-1].strip():
-            combined_sentences.append(sentences[-1].strip())
+        combined_sentences = split_sentences(text)
 
         if not combined_sentences:
             logger.warning("No sentences found in text")
@@ -381,10 +585,11 @@ async def stream_tts_by_sentence(text: str, websocket: WebSocket, client_state:
             })
 
             # Synthesize TTS audio for this sentence
-            audio_bytes = await tts_service.synthesize(sentence, language)
+            with client_state.get("trace", NULL_TRACE).span("tts", sentence_index=sentence_idx, chars=len(sentence)):
+                audio_bytes = await tts_service.synthesize(sentence, language, deadline=client_state.get("turn_deadline"))
 
             if audio_bytes:
-                await websocket.send_bytes(audio_bytes)
+                await send_bot_audio(websocket, client_state, audio_bytes)
                 logger.info(f"Sentence {sentence_idx + 1} sent {len(audio_bytes)} bytes of audio")
             else:
                 logger.warning(f"No audio generated for sentence {sentence_idx + 1}")
@@ -464,10 +669,11 @@ async def send_sentence_to_tts(sentence: str, sentence_idx: int, websocket: WebS
         })
 
         # Synthesize TTS audio for this sentence
-        audio_bytes = await tts_service.synthesize(sentence, language)
+        with client_state.get("trace", NULL_TRACE).span("tts", sentence_index=sentence_idx, chars=len(sentence)):
+            audio_bytes = await tts_service.synthesize(sentence, language, deadline=client_state.get("turn_deadline"))
 
         if audio_bytes:
-            await websocket.send_bytes(audio_bytes)
+            await send_bot_audio(websocket, client_state, audio_bytes)
             logger.info(f"✅ Sentence {sentence_idx} TTS complete: {len(audio_bytes)} bytes")
         else:
             logger.warning(f"⚠️ No audio generated for sentence {sentence_idx}")
@@ -502,20 +708,24 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
     Returns:
         None (streams responses via websocket)
     """
+    trace = client_state.get("trace", NULL_TRACE)
+
     try:
         # Get current hour for meal period filtering
         current_hour = datetime.now().hour
 
         # Search menu with retriever - get ALL items (26 items is tiny for 131K context)
         logger.info(f"Searching menu for: {user_input}")
-        results = vector_store_service.search_menu(
-            user_input,
-            current_hour=current_hour,
-            top_k=50  # Get all items - menu is small, no need to limit
-        )
-
-        # Format menu context
-        menu_context = vector_store_service.format_menu_context(results)
+        with trace.span("retrieval") as span:
+            results = vector_store_service.search_menu(
+                user_input,
+                current_hour=current_hour,
+                top_k=50  # Get all items - menu is small, no need to limit
+            )
+
+            # Format menu context
+            menu_context = vector_store_service.format_menu_context(results)
+            span.set_attribute("menu.items", len(results))
         logger.info(f"Retrieved {len(results)} menu items")
 
         # Build system prompt with menu context
@@ -571,12 +781,14 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
                 # Call Groq API (non-streaming)
                 # Using max_tokens=1000 for complete responses
                 # Enable tools for order management
-                response = await llm_service.chat(
-                    messages,
-                    temperature=0.3,  # Lower temp for reliable tool calling (Groq recommendation: 0.0-0.5)
-                    max_tokens=1000,
-                    tools=TOOLS  # Enable function calling
-                )
+                with trace.span("llm", iteration=iteration, tools=True) as span:
+                    response = await llm_service.chat(
+                        messages,
+                        temperature=0.3,  # Lower temp for reliable tool calling (Groq recommendation: 0.0-0.5)
+                        max_tokens=1000,
+                        tools=TOOLS  # Enable function calling
+                    )
+                    span.set_attribute("llm.provider", response.get("provider"))
 
             except Exception as llm_error:
                 error_msg = str(llm_error)
@@ -588,12 +800,14 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
 
                     # Retry WITHOUT tools - force text response
                     try:
-                        response = await llm_service.chat(
-                            messages,
-                            temperature=0.3,
-                            max_tokens=1000,
-                            tools=None  # Disable tools to force text response
-                        )
+                        with trace.span("llm", iteration=iteration, tools=False, retry=True) as span:
+                            response = await llm_service.chat(
+                                messages,
+                                temperature=0.3,
+                                max_tokens=1000,
+                                tools=None  # Disable tools to force text response
+                            )
+                            span.set_attribute("llm.provider", response.get("provider"))
                     except Exception as retry_error:
                         logger.error(f"❌ Retry also failed: {retry_error}")
                         raise
@@ -615,8 +829,15 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
 
                     logger.info(f"🔧 Executing tool: {tool_name} with args: {arguments}")
 
-                    # Execute the tool
-                    result = await tool_executor.execute_tool(tool_name, arguments)
+                    # Execute the tool (barge-in is held off so cart/DB updates aren't cut in half)
+                    client_state["tool_in_progress"] = True
+                    client_state["turn_committed"] = True
+                    try:
+                        with trace.span("tool", tool=tool_name) as span:
+                            result = await tool_executor.execute_tool(tool_name, arguments)
+                            span.set_attribute("tool.success", bool(result.get("success", "error" not in result)))
+                    finally:
+                        client_state["tool_in_progress"] = False
                     logger.info(f"✅ Tool {tool_name} result: {result}")
 
                     # Send real-time updates to frontend
@@ -648,7 +869,8 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
                             await websocket.send_json({
                                 "type": "order_failed",
                                 "error": result.get("error", "Unknown error"),
-                                "order_details": result.get("order_details", [])
+                                "order_details": result.get("order_details", []),
+                                "shortfalls": result.get("shortfalls", [])
                             })
 
                     # Add tool result to messages for LLM
@@ -661,12 +883,14 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
 
                 # Get LLM's final response after tool execution
                 logger.info("📤 Getting LLM's response after tool execution...")
-                final_response = await llm_service.chat(
-                    messages,
-                    temperature=0.3,
-                    max_tokens=1000,
-                    tools=TOOLS
-                )
+                with trace.span("llm", iteration=iteration, tools=True, after_tools=True) as span:
+                    final_response = await llm_service.chat(
+                        messages,
+                        temperature=0.3,
+                        max_tokens=1000,
+                        tools=TOOLS
+                    )
+                    span.set_attribute("llm.provider", final_response.get("provider"))
 
                 # Handle response - could be text or another tool call
                 if final_response.get("type") == "text":
@@ -782,17 +1006,113 @@ async def chat_with_llm_stream(user_input: str, client_state: dict, websocket: W
         })
 
 
+async def process_turn(transcription: str, client_state: dict, websocket: WebSocket):
+    """
+    Run one conversational turn for a finished utterance: LLM + tools + TTS,
+    followed by the order-confirmation sequence if an order was placed.
+
+    Runs as a task (client_state["turn_task"]) so the receive loop keeps running
+    VAD while the bot is thinking and speaking, which is what allows barge-in.
+
+    Args:
+        transcription: The customer's transcribed utterance
+        client_state: Client conversation state
+        websocket: WebSocket connection for streaming responses
+    """
+    try:
+        # Send transcription to frontend
+        await websocket.send_json({
+            "type": "transcription",
+            "text": transcription
+        })
+
+        # Get LLM response with RAG (streaming)
+        await chat_with_llm_stream(transcription, client_state, websocket)
+
+        # Check if order was confirmed
+        last_tool_result = client_state.get("last_tool_result", {})
+
+        if last_tool_result.get("ask_for_more"):
+            # Order confirmed successfully!
+            logger.info(f"✅ Order {last_tool_result['order_id']} confirmed")
+
+            # Pause ASR temporarily
+            await websocket.send_json({
+                "type": "asr_pause",
+                "reason": "order_processing"
+            })
+
+            # Send order confirmation to frontend
+            await websocket.send_json({
+                "type": "order_confirmed",
+                "order_id": last_tool_result["order_id"],
+                "total": last_tool_result["total"],
+                "items": last_tool_result["items"],
+                "message": f"ஆர்டர் #{last_tool_result['order_id']} கன்ஃபர்ம் ஆச்சு!"
+            })
+
+            # Generate confirmation TTS
+            if tts_service:
+                confirmation_text = f"ஆர்டர் #{last_tool_result['order_id']} கன்ஃபர்ம் ஆச்சு! பில் கிச்சனுக்கு போயிடுச்சு."
+                with client_state.get("trace", NULL_TRACE).span("tts", kind="confirmation"):
+                    audio_bytes = await tts_service.synthesize(confirmation_text, deadline=client_state.get("turn_deadline"))
+                if audio_bytes:
+                    await websocket.send_json({
+                        "type": "confirmation_audio_start",
+                        "size": len(audio_bytes)
+                    })
+                    await send_bot_audio(websocket, client_state, audio_bytes)
+
+            # Wait 2 seconds
+            await asyncio.sleep(2)
+
+            # Resume ASR for next order
+            await websocket.send_json({
+                "type": "asr_resume",
+                "reason": "ready_for_more"
+            })
+
+            # Ask if they want more
+            await websocket.send_json({
+                "type": "ask_for_more",
+                "message": "வேற எதாவது வேணுமா?"
+            })
+
+            # Generate "want more?" TTS
+            if tts_service:
+                more_text = "வேற எதாவது வேணுமா?"
+                with client_state.get("trace", NULL_TRACE).span("tts", kind="ask_for_more"):
+                    audio_bytes = await tts_service.synthesize(more_text, deadline=client_state.get("turn_deadline"))
+                if audio_bytes:
+                    await send_bot_audio(websocket, client_state, audio_bytes)
+
+    except asyncio.CancelledError:
+        logger.info("🛑 Turn cancelled (barge-in)")
+        raise
+    except WebSocketDisconnect:
+        logger.warning("WebSocket disconnected during turn processing")
+    except Exception as e:
+        logger.error(f"Turn processing error: {e}")
+    finally:
+        await save_session(client_state)
+
+
 async def sync_qdrant_task():
     """Background task to sync Qdrant from PostgreSQL every 5 seconds"""
     await asyncio.sleep(60)  # Wait 1 minute before first sync (let everything initialize)
 
     while True:
         try:
-            logger.debug("Background sync: Syncing Qdrant from PostgreSQL...")
-            if vector_store_service:
-                await vector_store_service.sync_from_database()
-            else:
-                logger.warning("Vector store service not initialized, skipping sync")
+            if await menu_catalog.refresh():
+                endpointer.set_dish_names(menu_catalog.names())
+
+            # Every worker keeps its own catalog; Qdrant is shared, so only the leader syncs it
+            if leader.is_leader:
+                logger.debug("Background sync: Syncing Qdrant from PostgreSQL...")
+                if vector_store_service:
+                    await vector_store_service.sync_from_database()
+                else:
+                    logger.warning("Vector store service not initialized, skipping sync")
         except Exception as e:
             logger.error(f"Background sync error: {e}")
 
@@ -800,67 +1120,502 @@ async def sync_qdrant_task():
         await asyncio.sleep(5)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize all services on application startup."""
+async def expire_reservations_task():
+    """Background task to purge expired stock holds every minute"""
+    while True:
+        await asyncio.sleep(60)
+        if not reservation_service.enabled or not leader.is_leader:
+            continue
+        try:
+            await reservation_service.purge_expired()
+        except Exception as e:
+            logger.error(f"Reservation expiry error: {e}")
+
+
+async def init_database():
+    """Connect the database pool (retrying while PostgreSQL comes up), then the services that need it."""
     logger.info("Initializing database connection pool...")
-    await db_service.initialize()
+    for attempt in range(1, DB_CONNECT_ATTEMPTS + 1):
+        try:
+            await db_service.initialize()
+            break
+        except Exception:
+            if attempt == DB_CONNECT_ATTEMPTS:
+                raise
+            await asyncio.sleep(min(2 ** attempt, 10))
+    await init_session_store()
 
-    init_vad()
-    await init_vector_store()
-    init_llm()
-    init_tts()
-    init_asr()
+    try:
+        await reservation_service.initialize()
+    except Exception as e:
+        logger.error(f"Stock reservations disabled: {e}")
+
+    try:
+        await print_worker.initialize()
+        if PRINT_WORKER_MODE == "embedded":
+            # Runs on the leader worker only - one process drives the printer
+            leader.on_elected.append(start_print_worker)
+            leader.on_demoted.append(print_worker.stop)
+        else:
+            logger.info("Print worker not embedded (PRINT_WORKER=off), expecting an external worker")
+    except Exception as e:
+        logger.error(f"Failed to initialize print outbox: {e}")
+
+    try:
+        await menu_catalog.refresh(force=True)
+        endpointer.set_dish_names(menu_catalog.names())
+    except Exception as e:
+        logger.warning(f"Could not load menu catalog: {e}")
+
+    await leader.start()
+    return db_service.pool
+
+
+async def start_print_worker():
+    print_worker.start()
+
+
+async def init_component(name: str, init: Callable[[], Awaitable]):
+    """
+    Run one service initializer and record its state and duration in startup_status.
+
+    Args:
+        name: Service name (as listed in REQUIRED_SERVICES)
+        init: Coroutine function returning the service (None means it failed)
+    """
+    startup_status[name] = {"state": "starting"}
+    start = time.perf_counter()
+    try:
+        ready = await init() is not None
+        error = None if ready else "initializer returned nothing (see log)"
+    except Exception as e:
+        logger.error(f"Failed to initialize {name}: {e}")
+        ready, error = False, str(e)
+
+    startup_status[name] = {"state": "ready" if ready else "failed", "seconds": round(time.perf_counter() - start, 2)}
+    if error:
+        startup_status[name]["error"] = error
+    logger.info(f"{'✅' if ready else '❌'} {name} {startup_status[name]['state']} in {startup_status[name]['seconds']}s")
+
+
+async def initialize_services():
+    """
+    Bring all services up concurrently: model loads run in threads, the API
+    clients don't wait for the database, and the vector store only waits for
+    it after its embedding model is loaded.
+    """
+    start = time.perf_counter()
+    for name in REQUIRED_SERVICES:
+        startup_status[name] = {"state": "starting"}
+
+    database = asyncio.create_task(init_component("database", init_database))
+    try:
+        await asyncio.gather(
+            database,
+            init_component("vad", lambda: asyncio.to_thread(init_vad)),
+            init_component("vector_store", lambda: init_vector_store(asyncio.shield(database))),
+            init_component("llm", lambda: asyncio.to_thread(init_llm)),
+            init_component("tts", lambda: asyncio.to_thread(init_tts)),
+            init_component("asr", lambda: asyncio.to_thread(init_asr)),
+        )
+    finally:
+        startup_complete.set()
 
     logger.info("Starting background Qdrant sync task (every 5 seconds)...")
     asyncio.create_task(sync_qdrant_task())
+    asyncio.create_task(expire_reservations_task())
+
+    failed = [name for name in REQUIRED_SERVICES if startup_status[name]["state"] != "ready"]
+    if failed:
+        logger.error(f"Startup finished in {time.perf_counter() - start:.1f}s with failed services: {', '.join(failed)}")
+    else:
+        logger.info(f"All services initialized successfully in {time.perf_counter() - start:.1f}s!")
 
-    logger.info("All services initialized successfully!")
+
+def is_ready() -> bool:
+    """True once every required service initialized successfully."""
+    return all(startup_status.get(name, {}).get("state") == "ready" for name in REQUIRED_SERVICES)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start service initialization in the background so the server answers /livez right away."""
+    global startup_task
+    if leader.workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        logger.warning(f"{leader.workers} workers without PROMETHEUS_MULTIPROC_DIR: /metrics only shows the worker that answers the scrape")
+    startup_task = asyncio.create_task(initialize_services())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on application shutdown."""
     logger.info("Shutting down application...")
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+    await print_worker.stop()
+    await leader.stop()
     await db_service.close()
 
 
+@app.get("/livez")
+async def livez():
+    """Liveness: the process is up and serving (restart only if this fails)."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: every required service is initialized (send kiosks here only when 200)."""
+    ready = is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else ("starting" if not startup_complete.is_set() else "unavailable"),
+            "services": startup_status,
+        }
+    )
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint."""
     return {
         "status": "healthy",
+        "ready": is_ready(),
+        "startup": startup_status,
         "vad_loaded": vad_model is not None,
         "vector_store_ready": vector_store_service is not None,
         "llm_ready": llm_service is not None,
         "tts_ready": tts_service is not None,
         "asr_ready": asr_service is not None,
-        "database_ready": db_service.pool is not None
+        "database_ready": db_service.pool is not None,
+        "endpointing": endpointer.get_stats(),
+        "database_queries": db_service.get_query_stats(),
+        "print_worker": await print_worker.get_status() if db_service.pool else None,
+        "leader": leader.get_status(),
+        "tracing": tracer.get_stats(),
+        "llm": llm_service.get_stats() if hasattr(llm_service, "get_stats") else None,
+        "speech_api": {
+            name: service.get_stats() if hasattr(service, "get_stats") else None
+            for name, service in (("asr", asr_service), ("tts", tts_service))
+        }
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (latency histograms, counters, gauges)."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+async def process_utterance(audio_bytes: bytes, speculative_task, client_state: dict, websocket: WebSocket):
+    """
+    Transcribe a finished utterance and run the turn for it.
+
+    Args:
+        audio_bytes: Complete utterance audio (raw PCM)
+        speculative_task: Speculative ASR task started by the endpointer (or None)
+        client_state: Client conversation state
+        websocket: WebSocket connection for streaming responses
+    """
+    trace = client_state.get("trace", NULL_TRACE)
+    deadline = client_state.get("turn_deadline")
+    status = "completed"
+
+    try:
+        # Reuse the speculative transcript - only silence followed it
+        with trace.span("asr", speculative=speculative_task is not None) as span:
+            if speculative_task is not None:
+                transcription = await speculative_task
+            else:
+                transcription = await send_to_asr(audio_bytes, client_state["language"], deadline)
+            span.set_attribute("transcript.chars", len(transcription))
+        trace.event("asr_done")
+
+        if transcription:
+            await process_turn(transcription, client_state, websocket)
+        else:
+            status = "empty_transcript"
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        trace.finish(status)
+        # A barge-in may already have started the next turn with its own deadline
+        if client_state.get("turn_deadline") == deadline:
+            client_state["turn_deadline"] = None
+
+
+def enqueue_audio_frame(audio_queue: asyncio.Queue, audio_chunk: bytes, client_id: str):
+    """
+    Queue an audio frame for VAD. When the processor falls behind and the queue
+    is full, the oldest frame is dropped - stale audio is worth less than fresh audio.
+
+    Args:
+        audio_queue: Bounded per-connection frame queue
+        audio_chunk: Raw audio frame
+        client_id: Unique client identifier
+    """
+    if audio_queue.full():
+        audio_queue.get_nowait()
+        client_state = connections[client_id]
+        client_state["dropped_frames"] += 1
+        DROPPED_FRAMES.inc()
+        if client_state["dropped_frames"] % 50 == 1:
+            logger.warning(f"Client {client_id}: audio queue full, dropped {client_state['dropped_frames']} stale frame(s)")
+    audio_queue.put_nowait(audio_chunk)
+
+
+async def handle_control_message(websocket: WebSocket, client_id: str, message: dict):
+    """
+    Apply a JSON control message from the client.
+
+    Args:
+        websocket: WebSocket connection (for acknowledgements)
+        client_id: Unique client identifier
+        message: Parsed JSON message
+    """
+    if message.get("type") == "config":
+        if "language" in message:
+            connections[client_id]["language"] = message["language"]
+            logger.info(f"Client {client_id}: Language set to {message.get('language')}")
+
+        if "audio_codec" in message:
+            codec = negotiate_codec(message.get("audio_codec"))
+            client_state = connections[client_id]
+            client_state["uplink_codec"] = codec
+            client_state["downlink_codec"] = codec
+            client_state["opus_decoder"] = OpusFrameDecoder(SAMPLE_RATE, CHUNK_SIZE) if codec == CODEC_OPUS else None
+            logger.info(f"Client {client_id}: Audio codec set to {codec}")
+
+            await websocket.send_json({
+                "type": "config_ack",
+                "uplink_codec": codec,
+                "downlink_codec": codec,
+                "opus_available": OPUS_AVAILABLE
+            })
+    elif message.get("type") == "reset":
+        connections[client_id]["conversation_history"].clear()
+        logger.info(f"Client {client_id}: Conversation reset")
+    elif message.get("type") == "start_ordering":
+        # Clear order state for new ordering session
+        connections[client_id]["current_order"] = []
+        if reservation_service.enabled:
+            try:
+                await reservation_service.release(connections[client_id]["session_id"])
+            except Exception as e:
+                logger.error(f"Failed to release stock holds: {e}")
+        connections[client_id]["asr_active"] = True
+        connections[client_id]["order_status"] = "active"
+        logger.info(f"Client {client_id}: New ordering session started, cart cleared")
+
+    if message.get("type") in ("config", "reset", "start_ordering"):
+        await save_session(connections[client_id])
+
+
+async def receive_messages(websocket: WebSocket, client_id: str, audio_queue: asyncio.Queue):
+    """
+    Receiver task: read frames off the socket as fast as they arrive.
+    Audio goes to the bounded queue; control messages are applied immediately
+    so they never wait behind audio or a running turn.
+
+    Args:
+        websocket: WebSocket connection
+        client_id: Unique client identifier
+        audio_queue: Bounded per-connection frame queue
+    """
+    while True:
+        data = await websocket.receive()
+
+        if data.get("type") == "websocket.disconnect":
+            raise WebSocketDisconnect(data.get("code", 1000))
+
+        if "bytes" in data:
+            client_state = connections[client_id]
+            # ASR paused during order processing - don't even queue the audio
+            if not client_state.get("asr_active", True):
+                continue
+
+            if client_state["uplink_codec"] == CODEC_OPUS:
+                # Opus packets (20 ms) are decoded and re-cut into VAD-sized frames
+                for audio_chunk in client_state["opus_decoder"].decode(data["bytes"]):
+                    enqueue_audio_frame(audio_queue, audio_chunk, client_id)
+            else:
+                enqueue_audio_frame(audio_queue, data["bytes"], client_id)
+
+        elif "text" in data:
+            try:
+                await handle_control_message(websocket, client_id, json.loads(data["text"]))
+            except WebSocketDisconnect:
+                raise
+            except:
+                pass
+
+
+async def process_audio_frames(websocket: WebSocket, client_id: str, audio_queue: asyncio.Queue):
+    """
+    Processor task: run VAD and endpointing on queued frames. Finished
+    utterances are handed to a turn task, so this loop never blocks on
+    ASR, the LLM or TTS and keeps up with real time (needed for barge-in).
+
+    Args:
+        websocket: WebSocket connection
+        client_id: Unique client identifier
+        audio_queue: Bounded per-connection frame queue
+    """
+    client_state = connections[client_id]
+    tracker = client_state["endpoint_tracker"]
+
+    while True:
+        audio_chunk = await audio_queue.get()
+
+        # Check if ASR is active
+        if not client_state.get("asr_active", True):
+            # ASR paused during order processing - ignore audio
+            continue
+
+        # Run VAD on chunk
+        is_speech = await process_audio_chunk(audio_chunk, client_state)
+        VAD_FRAMES.labels("speech" if is_speech else "silence").inc()
+
+        if is_speech:
+            # Speech detected
+            if not client_state["is_speaking"]:
+                logger.info(f"Client {client_id}: Speech started")
+                client_state["is_speaking"] = True
+                endpointer.on_speech_start(tracker)
+                for pre_chunk in client_state["pre_roll_buffer"]:
+                    client_state["speech_buffer"].extend(pre_chunk)
+
+            # Speech resumed - the speculative transcript is stale
+            if client_state["speculative_asr"] is not None:
+                client_state["speculative_asr"].cancel()
+                client_state["speculative_asr"] = None
+
+            tracker.on_speech_chunk(audio_chunk, client_state["silence_chunks"], endpointer.pause_ms)
+            client_state["speech_buffer"].extend(audio_chunk)
+            client_state["silence_chunks"] = 0
+
+            # Sustained speech over the bot's audio -> barge-in
+            if BARGE_IN_ENABLED and is_bot_speaking(client_state) and not client_state["tool_in_progress"]:
+                client_state["barge_in_chunks"] += 1
+                if client_state["barge_in_chunks"] * CHUNK_SIZE / SAMPLE_RATE * 1000 >= BARGE_IN_MIN_SPEECH_MS:
+                    client_state["barge_in_chunks"] = 0
+                    await barge_in(client_id, client_state, websocket)
+            else:
+                client_state["barge_in_chunks"] = 0
+
+        else:
+            # Silence detected
+            client_state["barge_in_chunks"] = 0
+            if client_state["is_speaking"]:
+                client_state["speech_buffer"].extend(audio_chunk)
+                client_state["silence_chunks"] += 1
+
+                silence_duration_ms = (client_state["silence_chunks"] * CHUNK_SIZE / SAMPLE_RATE) * 1000
+
+                # Start transcribing early so the transcript can shorten the wait
+                if (endpointer.speculative_asr
+                        and client_state["speculative_asr"] is None
+                        and silence_duration_ms >= endpointer.min_silence_ms):
+                    client_state["speculative_asr"] = asyncio.create_task(send_to_asr(
+                        bytes(client_state["speech_buffer"]),
+                        client_state["language"]
+                    ))
+
+                speculative_task = client_state["speculative_asr"]
+                if speculative_task is not None and speculative_task.done() and tracker.transcript_hint is None:
+                    tracker.transcript_hint = endpointer.classify_transcript(speculative_task.result())
+
+                if silence_duration_ms >= endpointer.required_silence_ms(tracker):
+                    logger.info(f"Client {client_id}: Speech ended after {silence_duration_ms:.0f}ms silence, processing...")
+                    endpointer.record_endpoint(tracker, silence_duration_ms)
+                    client_state["speculative_asr"] = None
+                    utterance_audio = bytes(client_state["speech_buffer"])
+
+                    if is_bot_speaking(client_state):
+                        # Short utterance over the bot's own audio that never reached
+                        # the barge-in threshold - most likely echo or noise
+                        logger.info(f"Client {client_id}: Ignoring utterance while bot is speaking")
+                        if speculative_task is not None:
+                            speculative_task.cancel()
+                    else:
+                        client_state["last_utterance_audio"] = utterance_audio
+                        client_state["turn_committed"] = False
+                        client_state["turn_count"] += 1
+                        client_state["turn_deadline"] = deadline_after(TURN_DEADLINE_S)
+                        client_state["trace"] = tracer.start_turn(
+                            client_id,
+                            client_state["turn_count"],
+                            **{"endpoint.silence_ms": round(silence_duration_ms), "audio.bytes": len(utterance_audio)}
+                        )
+                        client_state["turn_task"] = asyncio.create_task(
+                            process_utterance(utterance_audio, speculative_task, client_state, websocket)
+                        )
+
+                    # Reset state
+                    client_state["is_speaking"] = False
+                    client_state["speech_buffer"].clear()
+                    client_state["silence_chunks"] = 0
+            else:
+                tracker.on_idle_chunk()
+                client_state["pre_roll_buffer"].append(audio_chunk)
+
+
 @app.websocket("/ws/audio")
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time audio processing.
 
-    Handles:
-    - Audio streaming
-    - VAD detection
-    - ASR transcription
-    - LLM chat responses
+    Each connection runs two tasks joined by a bounded frame queue:
+    - receiver: socket reads + control messages
+    - processor: VAD detection and endpointing
+    Each finished utterance then runs as its own turn task (ASR transcription,
+    LLM chat responses, TTS), so a long turn never stalls socket reads.
     """
+    # Kiosks that reconnect while the container is still starting wait for it
+    if not startup_complete.is_set():
+        try:
+            await asyncio.wait_for(startup_complete.wait(), timeout=STARTUP_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            await websocket.close(code=1013)  # Try again later
+            return
+
     await websocket.accept()
     client_id = id(websocket)
 
-    logger.info(f"Client {client_id} connected")
+    # Kiosks pass their session_id back on reconnect to resume their cart
+    session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+    session_id = session_id[:64]
+
+    logger.info(f"Client {client_id} connected (session {session_id})")
 
     # Initialize client state
     connections[client_id] = {
+        "session_id": session_id,
         "pre_roll_buffer": deque(maxlen=int(PRE_ROLL_MS / 1000 * SAMPLE_RATE / CHUNK_SIZE)),
         "speech_buffer": bytearray(),
         "is_speaking": False,
         "silence_chunks": 0,
+        "endpoint_tracker": endpointer.new_tracker(),
+        "speculative_asr": None,
+        "turn_task": None,
+        "turn_deadline": None,
+        "turn_committed": False,
+        "last_utterance_audio": b"",
+        "playback_until": 0.0,
+        "barge_in_chunks": 0,
+        "tool_in_progress": False,
+        "dropped_frames": 0,
+        "turn_count": 0,
+        "trace": NULL_TRACE,
+        "uplink_codec": CODEC_PCM,
+        "downlink_codec": CODEC_PCM,
+        "opus_decoder": None,
         "language": "ta-IN",
         "conversation_history": [],
         "current_order": [],
@@ -871,163 +1626,36 @@ async def websocket_endpoint(websocket: WebSocket):
         "completed_orders": []
     }
 
-    try:
-        await websocket.send_json({"type": "status", "message": "connected"})
-
-        while True:
-            data = await websocket.receive()
-
-            if "bytes" in data:
-                audio_chunk = data["bytes"]
-                client_state = connections[client_id]
-
-                # Check if ASR is active
-                if not client_state.get("asr_active", True):
-                    # ASR paused during order processing - ignore audio
-                    continue
-
-                # Run VAD on chunk
-                is_speech = await process_audio_chunk(audio_chunk, client_id)
-
-                if is_speech:
-                    # Speech detected
-                    if not client_state["is_speaking"]:
-                        logger.info(f"Client {client_id}: Speech started")
-                        client_state["is_speaking"] = True
-                        for pre_chunk in client_state["pre_roll_buffer"]:
-                            client_state["speech_buffer"].extend(pre_chunk)
-
-                    client_state["speech_buffer"].extend(audio_chunk)
-                    client_state["silence_chunks"] = 0
-
-                else:
-                    # Silence detected
-                    if client_state["is_speaking"]:
-                        client_state["speech_buffer"].extend(audio_chunk)
-                        client_state["silence_chunks"] += 1
-
-                        silence_duration_ms = (client_state["silence_chunks"] * CHUNK_SIZE / SAMPLE_RATE) * 1000
+    audio_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIO_QUEUE_MAX_FRAMES)
+    tasks = []
 
-                        if silence_duration_ms >= MIN_SILENCE_MS:
-                            logger.info(f"Client {client_id}: Speech ended, processing...")
+    try:
+        await websocket.send_json({"type": "status", "message": "connected", "session_id": session_id})
+        await resume_session(connections[client_id], websocket)
 
-                            # Send to ASR
-                            transcription = await send_to_asr(
-                                bytes(client_state["speech_buffer"]),
-                                client_state["language"]
-                            )
+        tasks = [
+            asyncio.create_task(receive_messages(websocket, client_id, audio_queue)),
+            asyncio.create_task(process_audio_frames(websocket, client_id, audio_queue)),
+        ]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
 
-                            if transcription:
-                                # Send transcription to frontend
-                                await websocket.send_json({
-                                    "type": "transcription",
-                                    "text": transcription
-                                })
-
-                                # Get LLM response with RAG (streaming)
-                                await chat_with_llm_stream(transcription, client_state, websocket)
-
-                                # Check if order was confirmed
-                                last_tool_result = client_state.get("last_tool_result", {})
-
-                                if last_tool_result.get("ask_for_more"):
-                                    # Order confirmed successfully!
-                                    logger.info(f"✅ Order {last_tool_result['order_id']} confirmed")
-
-                                    # Pause ASR temporarily
-                                    await websocket.send_json({
-                                        "type": "asr_pause",
-                                        "reason": "order_processing"
-                                    })
-
-                                    # Send order confirmation to frontend
-                                    await websocket.send_json({
-                                        "type": "order_confirmed",
-                                        "order_id": last_tool_result["order_id"],
-                                        "total": last_tool_result["total"],
-                                        "items": last_tool_result["items"],
-                                        "message": f"ஆர்டர் #{last_tool_result['order_id']} கன்ஃபர்ம் ஆச்சு!"
-                                    })
-
-                                    # Generate confirmation TTS
-                                    if tts_service:
-                                        confirmation_text = f"ஆர்டர் #{last_tool_result['order_id']} கன்ஃபர்ம் ஆச்சு! பில் கிச்சனுக்கு போயிடுச்சு."
-                                        audio_bytes = await tts_service.synthesize(confirmation_text)
-                                        if audio_bytes:
-                                            await websocket.send_json({
-                                                "type": "confirmation_audio_start",
-                                                "size": len(audio_bytes)
-                                            })
-                                            await websocket.send_bytes(audio_bytes)
-
-                                    # Wait 2 seconds
-                                    await asyncio.sleep(2)
-
-                                    # Resume ASR for next order
-                                    await websocket.send_json({
-                                        "type": "asr_resume",
-                                        "reason": "ready_for_more"
-                                    })
-
-                                    # Ask if they want more
-                                    await websocket.send_json({
-                                        "type": "ask_for_more",
-                                        "message": "வேற எதாவது வேணுமா?"
-                                    })
-
-                                    # Generate "want more?" TTS
-                                    if tts_service:
-                                        more_text = "வேற எதாவது வேணுமா?"
-                                        audio_bytes = await tts_service.synthesize(more_text)
-                                        if audio_bytes:
-                                            await websocket.send_bytes(audio_bytes)
-
-                                elif last_tool_result.get("resume_asr"):
-                                    # Print failed, resume ASR
-                                    logger.warning("Print failed, resuming ASR")
-
-                                    await websocket.send_json({
-                                        "type": "order_failed",
-                                        "error": last_tool_result.get("error"),
-                                        "message": "பிரிண்டர் பிரச்சனை. மறுபடியும் try பண்ணுங்க."
-                                    })
-
-                                    await websocket.send_json({
-                                        "type": "asr_resume"
-                                    })
-
-                            # Reset state
-                            client_state["is_speaking"] = False
-                            client_state["speech_buffer"].clear()
-                            client_state["silence_chunks"] = 0
-                    else:
-                        client_state["pre_roll_buffer"].append(audio_chunk)
-
-            elif "text" in data:
-                import json
-                try:
-                    message = json.loads(data["text"])
-                    if message.get("type") == "config":
-                        connections[client_id]["language"] = message.get("language", "ta")
-                        logger.info(f"Client {client_id}: Language set to {message.get('language')}")
-                    elif message.get("type") == "reset":
-                        connections[client_id]["conversation_history"].clear()
-                        logger.info(f"Client {client_id}: Conversation reset")
-                    elif message.get("type") == "start_ordering":
-                        # Clear order state for new ordering session
-                        connections[client_id]["current_order"] = []
-                        connections[client_id]["asr_active"] = True
-                        connections[client_id]["order_status"] = "active"
-                        logger.info(f"Client {client_id}: New ordering session started, cart cleared")
-                except:
-                    pass
+        # Surface whatever ended the connection (disconnect or error)
+        for task in done:
+            task.result()
 
     except WebSocketDisconnect:
         logger.info(f"Client {client_id} disconnected")
     except Exception as e:
         logger.error(f"Error handling client {client_id}: {e}")
     finally:
+        for task in tasks:
+            task.cancel()
         if client_id in connections:
+            for task_key in ("speculative_asr", "turn_task"):
+                task = connections[client_id].get(task_key)
+                if task is not None:
+                    task.cancel()
+            await save_session(connections[client_id])
             del connections[client_id]
 
 
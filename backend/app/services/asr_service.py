@@ -1,70 +1,261 @@
 """
-ASR Service for speech-to-text using Sarvam AI SDK
+ASR Service for speech-to-text using Sarvam AI SDK, with an optional local
+CPU engine (faster-whisper) as fallback or primary backend.
+
+ASR_BACKEND picks the primary engine ("sarvam" or "local") and ASR_FALLBACK
+the one used when the primary fails, times out, or has failed repeatedly
+(circuit open - the primary is retried after a cooldown). The local engine
+needs faster-whisper (requirements-local-asr.txt); without it the service
+runs without a fallback.
 """
+import asyncio
+import io
 import logging
+import math
 import os
-import io
+import threading
+import time
+import wave
 from typing import Optional
-from sarvamai import SarvamAI
+
+import numpy as np
+from sarvamai import AsyncSarvamAI
+
+from app.services.hedging_service import (
+    CircuitBreaker,
+    DeadlineExceeded,
+    DeadlinePassed,
+    HedgedCaller,
+    is_client_error,
+    time_left,
+)
+from app.services.metrics_service import SPEECH_BACKEND_LATENCY, SPEECH_FALLBACKS
 
 logger = logging.getLogger(__name__)
 
+ASR_BACKEND = os.getenv("ASR_BACKEND", "sarvam").lower()
+ASR_FALLBACK = os.getenv("ASR_FALLBACK", "local").lower()  # "none" disables
+
+# Primary taken out of use after this many consecutive failures, retried after the cooldown
+ASR_BREAKER_FAILURES = int(os.getenv("ASR_BREAKER_FAILURES", "3"))
+ASR_BREAKER_COOLDOWN_S = float(os.getenv("ASR_BREAKER_COOLDOWN_S", "30"))
+
+# faster-whisper model: size name ("small", "medium", ...) or path to a CTranslate2 model directory
+LOCAL_ASR_MODEL = os.getenv("LOCAL_ASR_MODEL", "small")
+LOCAL_ASR_COMPUTE_TYPE = os.getenv("LOCAL_ASR_COMPUTE_TYPE", "int8")
+LOCAL_ASR_THREADS = int(os.getenv("LOCAL_ASR_THREADS", "4"))
+LOCAL_ASR_BEAM_SIZE = int(os.getenv("LOCAL_ASR_BEAM_SIZE", "1"))
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+def wav_to_float32(audio_bytes: bytes) -> np.ndarray:
+    """Decode 16-bit mono WAV to float32 samples at 16 kHz (linear resampling if needed)."""
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as wav_file:
+        sample_rate = wav_file.getframerate()
+        channels = wav_file.getnchannels()
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+    audio = pcm.astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if sample_rate != WHISPER_SAMPLE_RATE and len(audio):
+        target = np.arange(0, len(audio), sample_rate / WHISPER_SAMPLE_RATE)
+        audio = np.interp(target, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+class SarvamASRBackend:
+    """Sarvam saarika:v2 over HTTP, with deadlines and hedging."""
+
+    name = "sarvam"
 
-class ASRService:
     def __init__(self, api_key: str = None):
+        if api_key is None:
+            api_key = os.getenv("SARVAM_API_KEY")
+            if not api_key:
+                raise ValueError("SARVAM_API_KEY environment variable not set")
+
+        self.client = AsyncSarvamAI(api_subscription_key=api_key)
+        # Deadline + hedging (ASR_TIMEOUT_S, ASR_HEDGING_ENABLED, ASR_HEDGE_*_MS)
+        self.caller = HedgedCaller("asr", timeout_s=8.0, hedge_min_ms=600, hedge_max_ms=3000, hedge_default_ms=1500)
+
+    async def _request(self, audio_bytes: bytes, language: str, timeout: float):
+        """One Sarvam transcription request (its own file object, so hedged requests don't share it)."""
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = "audio.wav"  # Required by the SDK
+        return await self.client.speech_to_text.transcribe(
+            file=audio_file,
+            language_code=language,
+            model="saarika:v2",
+            request_options={"timeout_in_seconds": max(1, math.ceil(timeout)), "max_retries": 0}
+        )
+
+    async def transcribe(self, audio_bytes: bytes, language: str, deadline: Optional[float] = None) -> str:
+        response = await self.caller.call(
+            lambda timeout: self._request(audio_bytes, language, timeout),
+            deadline
+        )
+        return response.transcript if hasattr(response, 'transcript') else ""
+
+    def get_stats(self) -> dict:
+        return self.caller.get_stats()
+
+
+class LocalASRBackend:
+    """faster-whisper (CTranslate2, int8 on CPU); works without internet once the model is on disk."""
+
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_ASR_MODEL):
+        from faster_whisper import WhisperModel
+
+        logger.info(f"Loading local ASR model faster-whisper '{model}' ({LOCAL_ASR_COMPUTE_TYPE}, {LOCAL_ASR_THREADS} threads)...")
+        self.model = WhisperModel(model, device="cpu", compute_type=LOCAL_ASR_COMPUTE_TYPE, cpu_threads=LOCAL_ASR_THREADS)
+        self.model_name = model
+        # One decode at a time - a second one would only halve the speed of both
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.abandoned = 0
+
+    def _transcribe_sync(self, audio: np.ndarray, language: str) -> str:
+        with self._lock:
+            segments, _ = self.model.transcribe(
+                audio,
+                language=language.split("-")[0],
+                beam_size=LOCAL_ASR_BEAM_SIZE,
+                condition_on_previous_text=False,
+                vad_filter=False  # Utterances are already cut by Silero
+            )
+            return " ".join(segment.text.strip() for segment in segments).strip()
+
+    async def transcribe(self, audio_bytes: bytes, language: str, deadline: Optional[float] = None) -> str:
+        remaining = time_left(deadline)
+        if remaining is not None and remaining <= 0:
+            raise DeadlinePassed("local asr: turn deadline already passed")
+
+        self.calls += 1
+        audio = wav_to_float32(audio_bytes)
+        try:
+            # The decode thread can't be interrupted; past the deadline its result is dropped
+            return await asyncio.wait_for(asyncio.to_thread(self._transcribe_sync, audio, language), remaining)
+        except asyncio.TimeoutError:
+            self.abandoned += 1
+            raise DeadlineExceeded(f"local asr: no transcript within {remaining:.1f}s")
+
+    def get_stats(self) -> dict:
+        return {"model": self.model_name, "calls": self.calls, "abandoned": self.abandoned}
+
+
+def create_asr_backend(name: str, api_key: str = None):
+    """Create an ASR backend by name ("sarvam" or "local")."""
+    if name == "sarvam":
+        return SarvamASRBackend(api_key=api_key)
+    if name == "local":
+        return LocalASRBackend()
+    raise ValueError(f"Unknown ASR backend '{name}'")
+
+
+class ASRService:
+    def __init__(self, api_key: str = None, backend: str = ASR_BACKEND, fallback: str = ASR_FALLBACK):
         """
-        Initialize ASR service with Sarvam AI SDK
+        Initialize ASR service with its primary backend and optional fallback
 
         Args:
             api_key: Sarvam AI API key
+            backend: Primary backend ("sarvam" or "local")
+            fallback: Fallback backend ("local", "sarvam" or "none")
         """
-        if api_key is None:
-            api_key = os.getenv("SARVAM_API_KEY")
-            if not api_key:
-                raise ValueError("SARVAM_API_KEY environment variable not set")
+        self.primary = create_asr_backend(backend, api_key)
+
+        self.fallback = None
+        if fallback not in ("", "none", backend):
+            try:
+                self.fallback = create_asr_backend(fallback, api_key)
+            except Exception as e:
+                logger.warning(f"ASR fallback '{fallback}' not available, running without it: {e}")
+
+        self.breaker = CircuitBreaker(ASR_BREAKER_FAILURES, ASR_BREAKER_COOLDOWN_S)
+        self.fallback_uses = 0
+        logger.info(f"ASR service initialized: {self.primary.name}"
+                    + (f" (fallback: {self.fallback.name})" if self.fallback else ""))
 
-        self.client = SarvamAI(api_subscription_key=api_key)
-        logger.info("ASR service initialized with Sarvam AI SDK")
+    async def _run(self, backend, audio_bytes: bytes, language: str, deadline: Optional[float]) -> str:
+        start = time.perf_counter()
+        transcription = await backend.transcribe(audio_bytes, language, deadline)
+        SPEECH_BACKEND_LATENCY.labels("asr", backend.name).observe(time.perf_counter() - start)
+        logger.info(f"ASR Transcription ({backend.name}): {transcription}")
+        return transcription
 
-    async def transcribe(self, audio_bytes: bytes, language: str = "ta-IN") -> str:
+    async def transcribe(self, audio_bytes: bytes, language: str = "ta-IN", deadline: Optional[float] = None) -> str:
         """
-        Transcribe audio to text using Sarvam AI SDK
+        Transcribe audio to text (primary backend, fallback on failure)
 
         Args:
             audio_bytes: Raw audio bytes (WAV format)
             language: Language code (default: ta-IN for Tamil)
+            deadline: Turn deadline (time.monotonic() timestamp); the request is cut off there
 
         Returns:
-            Complete transcribed text
+            Complete transcribed text ("" if every backend failed)
         """
         if not audio_bytes:
             logger.warning("Empty audio provided for ASR")
             return ""
 
-        try:
-            logger.info(f"Transcribing audio ({len(audio_bytes)} bytes) in language: {language}")
-
-            # Create a file-like object from audio bytes
-            audio_file = io.BytesIO(audio_bytes)
-            audio_file.name = "audio.wav"  # Required by the SDK
-
-            # Use Sarvam AI SDK for transcription
-            response = self.client.speech_to_text.transcribe(
-                file=audio_file,
-                language_code=language,
-                model="saarika:v2"
-            )
+        logger.info(f"Transcribing audio ({len(audio_bytes)} bytes) in language: {language}")
 
-            transcription = response.transcript if hasattr(response, 'transcript') else ""
-            logger.info(f"ASR Transcription: {transcription}")
-            return transcription
+        if self.fallback is None or self.breaker.available():
+            self.breaker.on_attempt()
+            try:
+                transcription = await self._run(self.primary, audio_bytes, language, deadline)
+                self.breaker.on_success()
+                return transcription
+            except asyncio.CancelledError:
+                self.breaker.on_cancel()
+                raise
+            except DeadlinePassed as e:
+                # Nothing was sent, so the backend isn't at fault - and no time is left for a fallback
+                self.breaker.on_cancel()
+                logger.warning(f"ASR skipped: {e}")
+                return ""
+            except DeadlineExceeded as e:
+                logger.error(f"ASR transcription timed out: {e}")
+                reason = "timeout"
+                if self.breaker.on_failure():
+                    logger.error(f"🔌 ASR backend {self.primary.name} taken out of use for {ASR_BREAKER_COOLDOWN_S:.0f}s")
+            except Exception as e:
+                logger.error(f"ASR transcription failed: {e}")
+                reason = "error"
+                if is_client_error(e):
+                    self.breaker.on_success()
+                elif self.breaker.on_failure():
+                    logger.error(f"🔌 ASR backend {self.primary.name} taken out of use for {ASR_BREAKER_COOLDOWN_S:.0f}s")
+            if self.fallback is None:
+                return ""
+        else:
+            reason = "circuit_open"
 
+        self.fallback_uses += 1
+        SPEECH_FALLBACKS.labels("asr", reason).inc()
+        logger.warning(f"🔁 ASR falling back to {self.fallback.name} ({reason})")
+        try:
+            return await self._run(self.fallback, audio_bytes, language, deadline)
         except Exception as e:
-            logger.error(f"ASR transcription failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"ASR fallback {self.fallback.name} failed: {e}")
             return ""
 
+    def get_stats(self) -> dict:
+        """Backends, primary health and fallback use (for /health)."""
+        return {
+            "backend": self.primary.name,
+            "fallback": self.fallback.name if self.fallback else None,
+            "primary_state": self.breaker.state,
+            "fallback_uses": self.fallback_uses,
+            self.primary.name: self.primary.get_stats(),
+            **({self.fallback.name: self.fallback.get_stats()} if self.fallback else {}),
+        }
+
     async def close(self):
         """Clean up resources"""
         pass
@@ -0,0 +1,133 @@
+"""
+On-disk cache of synthesized speech.
+
+Entries are WAV files named by a hash of (engine, voice, language, text), so
+the same sentence from a different engine or speaker is a different entry.
+Fixed phrases ("வேற எதாவது வேணுமா?", confirmations) and common replies are
+served from disk without a network call once they have been spoken once.
+
+The cache is bounded by TTS_CACHE_MAX_MB; the least recently used entries are
+evicted (file mtime is refreshed on every hit).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/app/cache/tts")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))  # 0 disables the cache
+
+
+class AudioCache:
+    """LRU-bounded directory of synthesized WAV files."""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_mb: float = TTS_CACHE_MAX_MB):
+        """
+        Args:
+            directory: Cache directory (created if missing)
+            max_mb: Size budget in megabytes (0 = disabled)
+        """
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = self.max_bytes > 0
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Writes run in worker threads; keeps size accounting and eviction consistent
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self.size_bytes = sum(path.stat().st_size for path in self.directory.glob("*.wav"))
+                logger.info(f"TTS cache at {self.directory} ({self.size_bytes / 1e6:.1f} MB of {max_mb:.0f} MB)")
+            except OSError as e:
+                logger.warning(f"TTS cache disabled, {self.directory} not usable: {e}")
+                self.enabled = False
+
+    @staticmethod
+    def key(engine: str, voice: str, language: str, text: str) -> str:
+        return hashlib.sha256(f"{engine}\x1f{voice}\x1f{language}\x1f{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.wav"
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+            os.utime(path)  # Recently used
+            return audio
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(audio)
+        with self._lock:
+            # The same phrase cached twice (e.g. by two turns at once) replaces the entry
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)  # Readers never see a partial file
+            self.size_bytes += len(audio) - replaced
+            if self.size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries down to 90% of the budget."""
+        entries = sorted(self.directory.glob("*.wav"), key=lambda path: path.stat().st_mtime)
+        self.size_bytes = sum(path.stat().st_size for path in entries)
+        target = self.max_bytes * 0.9
+        for path in entries:
+            if self.size_bytes <= target:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self.size_bytes -= size
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Cached audio for the key, or None."""
+        if not self.enabled:
+            return None
+        try:
+            audio = await asyncio.to_thread(self._read, key)
+        except OSError as e:
+            logger.warning(f"TTS cache read failed: {e}")
+            audio = None
+        if audio is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return audio
+
+    async def put(self, key: str, audio: bytes):
+        """Store audio under the key (errors are logged, never raised)."""
+        if not self.enabled or not audio:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, audio)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size_mb": round(self.size_bytes / 1e6, 1),
+            "max_mb": round(self.max_bytes / 1e6, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,217 @@
+"""
+Opus audio transport for the kiosk WebSocket.
+
+Uplink: the browser sends raw Opus packets (16 kHz mono, 20 ms frames); they are
+decoded and re-cut into the 512-sample int16 frames VAD expects.
+Downlink: TTS WAV output is encoded to Ogg Opus so the browser can play each
+sentence straight from a Blob, just like the WAV it replaces.
+
+opuslib (and the system libopus) is optional - without it every client is
+negotiated down to raw PCM/WAV.
+"""
+import io
+import logging
+import struct
+import wave
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import opuslib
+except Exception:
+    # libopus or the bindings are missing - Opus transport is disabled
+    opuslib = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_PCM = "pcm"
+CODEC_OPUS = "opus"
+
+OPUS_AVAILABLE = opuslib is not None
+
+# Opus only runs at these rates; TTS audio is resampled to the nearest one above
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_FRAME_MS = 20
+OPUS_PRE_SKIP = 312            # Encoder lookahead, in 48 kHz samples (RFC 7845)
+OPUS_MAX_DECODE_SAMPLES = 1920  # 120 ms at 16 kHz, the largest Opus packet
+DOWNLINK_BITRATE = 24000
+PACKETS_PER_OGG_PAGE = 50      # ~1 s of audio per page
+
+
+def negotiate_codec(requested: Optional[str]) -> str:
+    """
+    Pick the codec for a client given what it asked for in its config message.
+
+    Args:
+        requested: Codec requested by the client ("opus" or "pcm")
+
+    Returns:
+        CODEC_OPUS if requested and supported here, otherwise CODEC_PCM
+    """
+    if requested == CODEC_OPUS:
+        if OPUS_AVAILABLE:
+            return CODEC_OPUS
+        logger.warning("Client requested Opus but opuslib is not installed, falling back to PCM")
+    return CODEC_PCM
+
+
+class OpusFrameDecoder:
+    """Decodes uplink Opus packets and re-frames them into fixed-size PCM chunks."""
+
+    def __init__(self, sample_rate: int = 16000, chunk_size: int = 512):
+        if not OPUS_AVAILABLE:
+            raise RuntimeError("opuslib is not installed")
+        self.decoder = opuslib.Decoder(sample_rate, 1)
+        self.chunk_bytes = chunk_size * 2
+        self.pending = bytearray()
+
+    def decode(self, packet: bytes) -> List[bytes]:
+        """
+        Decode one Opus packet.
+
+        Args:
+            packet: Raw Opus packet from the client
+
+        Returns:
+            Zero or more complete int16 PCM chunks of chunk_size samples
+        """
+        try:
+            self.pending.extend(self.decoder.decode(packet, OPUS_MAX_DECODE_SAMPLES))
+        except Exception as e:
+            logger.warning(f"Dropping undecodable Opus packet ({len(packet)} bytes): {e}")
+            return []
+
+        chunks = []
+        while len(self.pending) >= self.chunk_bytes:
+            chunks.append(bytes(self.pending[:self.chunk_bytes]))
+            del self.pending[:self.chunk_bytes]
+        return chunks
+
+
+def _ogg_crc_table() -> List[int]:
+    """CRC-32 table for Ogg (poly 0x04C11DB7, unreflected)."""
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE = _ogg_crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC_TABLE[((crc >> 24) & 0xFF) ^ byte]
+    return crc
+
+
+def _ogg_page(packets: List[bytes], granule: int, serial: int, sequence: int, header_type: int) -> bytes:
+    """Build one Ogg page holding complete packets."""
+    segments = bytearray()
+    for packet in packets:
+        length = len(packet)
+        segments.extend(b'\xff' * (length // 255))
+        segments.append(length % 255)
+
+    header = struct.pack(
+        '<4sBBqIIIB', b'OggS', 0, header_type, granule, serial, sequence, 0, len(segments)
+    ) + bytes(segments)
+    page = bytearray(header + b''.join(packets))
+    struct.pack_into('<I', page, 22, _ogg_crc(page))
+    return bytes(page)
+
+
+def _read_wav_mono(wav_bytes: bytes) -> Optional[tuple]:
+    """Read 16-bit WAV bytes as (float32 mono samples, sample_rate)."""
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2:
+            return None
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+    samples = samples.astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def encode_wav_to_ogg_opus(wav_bytes: bytes, serial: int = 0x48424F54) -> Optional[bytes]:
+    """
+    Encode TTS WAV output as an Ogg Opus file.
+
+    Args:
+        wav_bytes: 16-bit PCM WAV audio
+        serial: Ogg stream serial number
+
+    Returns:
+        Ogg Opus bytes, or None if the audio can't be encoded (caller sends WAV)
+    """
+    if not OPUS_AVAILABLE:
+        return None
+
+    try:
+        decoded = _read_wav_mono(wav_bytes)
+        if decoded is None:
+            return None
+        samples, source_rate = decoded
+
+        # Resample to the nearest Opus rate at or above the source rate
+        opus_rate = next((rate for rate in OPUS_SAMPLE_RATES if rate >= source_rate), 48000)
+        if opus_rate != source_rate and len(samples):
+            target_len = int(round(len(samples) * opus_rate / source_rate))
+            samples = np.interp(
+                np.linspace(0, len(samples) - 1, target_len),
+                np.arange(len(samples)),
+                samples
+            )
+        pcm = np.clip(samples, -32768, 32767).astype(np.int16)
+
+        frame_size = opus_rate * OPUS_FRAME_MS // 1000
+        total_samples = len(pcm)
+        if total_samples == 0:
+            return None
+        padding = (-total_samples) % frame_size
+        if padding:
+            pcm = np.concatenate([pcm, np.zeros(padding, dtype=np.int16)])
+
+        encoder = opuslib.Encoder(opus_rate, 1, opuslib.APPLICATION_VOIP)
+        encoder.bitrate = DOWNLINK_BITRATE
+
+        opus_head = struct.pack('<8sBBHIhB', b'OpusHead', 1, 1, OPUS_PRE_SKIP, opus_rate, 0, 0)
+        vendor = b'HotelOrderBot'
+        opus_tags = struct.pack('<8sI', b'OpusTags', len(vendor)) + vendor + struct.pack('<I', 0)
+
+        pages = [
+            _ogg_page([opus_head], 0, serial, 0, 0x02),
+            _ogg_page([opus_tags], 0, serial, 1, 0x00),
+        ]
+
+        # Granule positions are always in 48 kHz samples
+        scale = 48000 // opus_rate
+        end_granule = total_samples * scale + OPUS_PRE_SKIP
+        frame_count = len(pcm) // frame_size
+        sequence = 2
+        batch = []
+
+        for index in range(frame_count):
+            frame = pcm[index * frame_size:(index + 1) * frame_size]
+            batch.append(encoder.encode(frame.tobytes(), frame_size))
+
+            is_last = index == frame_count - 1
+            if len(batch) == PACKETS_PER_OGG_PAGE or is_last:
+                granule = end_granule if is_last else (index + 1) * frame_size * scale + OPUS_PRE_SKIP
+                pages.append(_ogg_page(batch, granule, serial, sequence, 0x04 if is_last else 0x00))
+                sequence += 1
+                batch = []
+
+        return b''.join(pages)
+
+    except Exception as e:
+        logger.error(f"Opus encoding failed, sending WAV instead: {e}")
+        return None
@@ -1,13 +1,126 @@
 """
 Database service for PostgreSQL operations
 Handles menu item queries, inventory management, and order processing
+
+All SQL lives in the QUERIES registry. The statements in HOT_QUERIES are
+prepared once per pooled connection (pool `init` hook), every query is timed,
+and rows are returned as asyncpg Records (read like dicts, no copy).
 """
 
 import asyncpg
 import os
+import time
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
+from app.services.metrics_service import observe_db_query
+
+
+# Column list shared by every query that returns full menu items
+MENU_COLUMNS = '''
+    dish_id, name, description, category, price,
+    quantity, dietary_tags, meal_period, popularity_score,
+    availability_status, image
+'''
+
+QUERIES = {
+    'all_menu_items': f'''
+        SELECT {MENU_COLUMNS}
+        FROM menu_items
+        ORDER BY category, popularity_score DESC
+    ''',
+    'available_menu_items': f'''
+        SELECT {MENU_COLUMNS}
+        FROM menu_items
+        WHERE availability_status = 'available' AND quantity > 0
+        ORDER BY category, popularity_score DESC
+    ''',
+    'item_by_dish_id': f'''
+        SELECT {MENU_COLUMNS}
+        FROM menu_items
+        WHERE dish_id = $1
+    ''',
+    'item_availability': '''
+        SELECT availability_status, quantity
+        FROM menu_items
+        WHERE dish_id = $1
+    ''',
+    'item_quantity': '''
+        SELECT quantity FROM menu_items WHERE dish_id = $1
+    ''',
+    'decrement_quantity': '''
+        UPDATE menu_items
+        SET quantity = quantity - $1
+        WHERE dish_id = $2
+        RETURNING quantity
+    ''',
+    'set_quantity': '''
+        UPDATE menu_items
+        SET quantity = $1
+        WHERE dish_id = $2
+    ''',
+    'items_by_category': f'''
+        SELECT {MENU_COLUMNS}
+        FROM menu_items
+        WHERE category = $1 AND availability_status = 'available'
+        ORDER BY popularity_score DESC
+    ''',
+    # Fuzzy search with LIKE - case insensitive
+    'item_by_name': f'''
+        SELECT {MENU_COLUMNS}
+        FROM menu_items
+        WHERE LOWER(name) LIKE LOWER($1)
+        AND availability_status = 'available'
+        ORDER BY popularity_score DESC
+        LIMIT 1
+    ''',
+    # % and LIKE both use the idx_menu_items_name_trgm GIN index
+    'search_items_by_name': f'''
+        SELECT {MENU_COLUMNS},
+            similarity(LOWER(name), LOWER($1)) AS score
+        FROM menu_items
+        WHERE (LOWER(name) % LOWER($1) OR LOWER(name) LIKE '%' || LOWER($1) || '%')
+        AND availability_status = 'available'
+        ORDER BY score DESC, popularity_score DESC
+        LIMIT $2
+    ''',
+    # Menu content only: stock changes (quantity, updated_at on every order) don't count
+    'menu_version': '''
+        SELECT COUNT(*) as item_count,
+            md5(string_agg(
+                concat_ws('|', dish_id, name, description, category, price, dietary_tags::text,
+                          meal_period, popularity_score, availability_status, image),
+                ',' ORDER BY dish_id
+            )) as content_hash
+        FROM menu_items
+    ''',
+    'database_stats': '''
+        SELECT
+            COUNT(*) as total_items,
+            COUNT(*) FILTER (WHERE availability_status = 'available' AND quantity > 0) as available_items,
+            COUNT(*) FILTER (WHERE availability_status = 'unavailable' OR quantity = 0) as unavailable_items,
+            COUNT(DISTINCT category) as total_categories,
+            SUM(quantity) as total_stock
+        FROM menu_items
+    ''',
+}
+
+# Statements on the ordering hot path, prepared on every new pooled connection
+HOT_QUERIES = (
+    'item_by_dish_id',
+    'item_availability',
+    'search_items_by_name',
+    'menu_version',
+)
+
+
+class PreparedConnection(asyncpg.Connection):
+    """asyncpg connection that carries its prepared hot statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Dict[str, Any] = {}
+
 
 class DatabaseService:
     """Service for PostgreSQL database operations"""
@@ -24,17 +137,26 @@ class DatabaseService:
             'max_size': 20,
             'command_timeout': 60
         }
+        # Per-query timing: name -> {"calls", "total_ms", "max_ms"}
+        self.query_stats: Dict[str, Dict[str, float]] = {}
+        # Hot statement prepares by the pool init hook: name -> {"ok", "failed"} (connections)
+        self.prepare_stats: Dict[str, Dict[str, int]] = {}
 
     async def initialize(self):
         """Initialize database connection pool"""
         try:
-            self.pool = await asyncpg.create_pool(**self.db_config)
+            self.pool = await asyncpg.create_pool(
+                **self.db_config,
+                connection_class=PreparedConnection,
+                init=self._init_connection
+            )
             print(f"✓ Database pool created: {self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}")
 
             # Test connection
             async with self.pool.acquire() as conn:
                 version = await conn.fetchval('SELECT version()')
                 print(f"✓ PostgreSQL version: {version.split(',')[0]}")
+                print(f"✓ Prepared statements per connection: {len(conn.prepared)}/{len(HOT_QUERIES)}")
 
                 # Check if menu_items table exists and has data
                 count = await conn.fetchval('SELECT COUNT(*) FROM menu_items')
@@ -44,52 +166,95 @@ class DatabaseService:
             print(f"✗ Database initialization failed: {e}")
             raise
 
+    async def _init_connection(self, conn: PreparedConnection):
+        """Pool init hook: prepare the hot statements on a new connection."""
+        for name in HOT_QUERIES:
+            stats = self.prepare_stats.setdefault(name, {"ok": 0, "failed": 0})
+            try:
+                conn.prepared[name] = await conn.prepare(QUERIES[name])
+                stats["ok"] += 1
+            except Exception as e:
+                # e.g. pg_trgm missing - the query still runs unprepared (and fails there)
+                stats["failed"] += 1
+                print(f"✗ Could not prepare '{name}': {e}")
+
     async def close(self):
         """Close database connection pool"""
         if self.pool:
             await self.pool.close()
             print("✓ Database pool closed")
 
-    async def get_all_menu_items(self) -> List[Dict[str, Any]]:
+    async def _run(self, conn, method: str, name: str, *args):
+        """
+        Run a registry query with its prepared statement if the connection has one
+
+        Args:
+            conn: Pooled connection
+            method: 'fetch', 'fetchrow', 'fetchval' or 'execute'
+            name: QUERIES key
+            *args: Query parameters
+
+        Returns:
+            Result of the asyncpg call
+        """
+        statement = getattr(conn, 'prepared', {}).get(name)
+        start = time.perf_counter()
+        try:
+            if statement is not None and method != 'execute':
+                return await getattr(statement, method)(*args)
+            return await getattr(conn, method)(QUERIES[name], *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            elapsed_ms = elapsed * 1000
+            observe_db_query(name, elapsed)
+            stats = self.query_stats.setdefault(name, {"calls": 0, "prepared_calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            if statement is not None and method != 'execute':
+                stats["prepared_calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def get_query_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get per-query timing
+
+        Returns:
+            Dict of query name -> calls, average and max latency (ms), calls that
+            ran as a prepared statement, and for hot queries the connections the
+            init hook prepared it on (or failed to)
+        """
+        return {
+            name: {
+                "calls": s["calls"],
+                "avg_ms": round(s["total_ms"] / s["calls"], 2) if s["calls"] else 0.0,
+                "max_ms": round(s["max_ms"], 2),
+                "prepared_calls": s["prepared_calls"],
+                **({"prepared_connections": self.prepare_stats[name]} if name in self.prepare_stats else {}),
+            }
+            for name, s in sorted(self.query_stats.items())
+        }
+
+    async def get_all_menu_items(self) -> List[asyncpg.Record]:
         """
         Get all menu items from database
 
         Returns:
-            List of menu items with all fields
+            List of menu item records with all fields
         """
         async with self.pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT
-                    dish_id, name, description, category, price,
-                    quantity, dietary_tags, meal_period, popularity_score,
-                    availability_status, image
-                FROM menu_items
-                ORDER BY category, popularity_score DESC
-            ''')
-
-            return [dict(row) for row in rows]
-
-    async def get_available_menu_items(self) -> List[Dict[str, Any]]:
+            return await self._run(conn, 'fetch', 'all_menu_items')
+
+    async def get_available_menu_items(self) -> List[asyncpg.Record]:
         """
         Get only available menu items (quantity > 0)
 
         Returns:
-            List of available menu items
+            List of available menu item records
         """
         async with self.pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT
-                    dish_id, name, description, category, price,
-                    quantity, dietary_tags, meal_period, popularity_score,
-                    availability_status, image
-                FROM menu_items
-                WHERE availability_status = 'available' AND quantity > 0
-                ORDER BY category, popularity_score DESC
-            ''')
-
-            return [dict(row) for row in rows]
-
-    async def get_item_by_dish_id(self, dish_id: str) -> Optional[Dict[str, Any]]:
+            return await self._run(conn, 'fetch', 'available_menu_items')
+
+    async def get_item_by_dish_id(self, dish_id: str) -> Optional[asyncpg.Record]:
         """
         Get a specific menu item by dish_id
 
@@ -97,19 +262,10 @@ class DatabaseService:
             dish_id: The dish ID to look up
 
         Returns:
-            Menu item dict or None if not found
+            Menu item record or None if not found
         """
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                SELECT
-                    dish_id, name, description, category, price,
-                    quantity, dietary_tags, meal_period, popularity_score,
-                    availability_status, image
-                FROM menu_items
-                WHERE dish_id = $1
-            ''', dish_id)
-
-            return dict(row) if row else None
+            return await self._run(conn, 'fetchrow', 'item_by_dish_id', dish_id)
 
     async def check_item_availability(self, dish_id: str) -> tuple[bool, int]:
         """
@@ -122,11 +278,7 @@ class DatabaseService:
             Tuple of (is_available, quantity)
         """
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                SELECT availability_status, quantity
-                FROM menu_items
-                WHERE dish_id = $1
-            ''', dish_id)
+            row = await self._run(conn, 'fetchrow', 'item_availability', dish_id)
 
             if not row:
                 return False, 0
@@ -148,10 +300,7 @@ class DatabaseService:
         """
         async with self.pool.acquire() as conn:
             # Check current quantity
-            current_qty = await conn.fetchval(
-                'SELECT quantity FROM menu_items WHERE dish_id = $1',
-                dish_id
-            )
+            current_qty = await self._run(conn, 'fetchval', 'item_quantity', dish_id)
 
             if current_qty is None:
                 print(f"✗ Item {dish_id} not found")
@@ -162,12 +311,7 @@ class DatabaseService:
                 return False
 
             # Update quantity (trigger will auto-update availability_status)
-            new_qty = await conn.fetchval('''
-                UPDATE menu_items
-                SET quantity = quantity - $1
-                WHERE dish_id = $2
-                RETURNING quantity
-            ''', quantity, dish_id)
+            new_qty = await self._run(conn, 'fetchval', 'decrement_quantity', quantity, dish_id)
 
             print(f"✓ Updated {dish_id}: quantity {current_qty} → {new_qty}")
 
@@ -186,11 +330,7 @@ class DatabaseService:
             True if successful, False if item not found
         """
         async with self.pool.acquire() as conn:
-            result = await conn.execute('''
-                UPDATE menu_items
-                SET quantity = $1
-                WHERE dish_id = $2
-            ''', new_quantity, dish_id)
+            result = await self._run(conn, 'execute', 'set_quantity', new_quantity, dish_id)
 
             if result == "UPDATE 0":
                 return False
@@ -198,7 +338,7 @@ class DatabaseService:
             print(f"✓ Updated {dish_id} quantity to {new_quantity}")
             return True
 
-    async def get_items_by_category(self, category: str) -> List[Dict[str, Any]]:
+    async def get_items_by_category(self, category: str) -> List[asyncpg.Record]:
         """
         Get menu items by category
 
@@ -206,22 +346,12 @@ class DatabaseService:
             category: Category name
 
         Returns:
-            List of menu items in that category
+            List of menu item records in that category
         """
         async with self.pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT
-                    dish_id, name, description, category, price,
-                    quantity, dietary_tags, meal_period, popularity_score,
-                    availability_status, image
-                FROM menu_items
-                WHERE category = $1 AND availability_status = 'available'
-                ORDER BY popularity_score DESC
-            ''', category)
-
-            return [dict(row) for row in rows]
-
-    async def get_item_by_name(self, dish_name: str) -> Optional[Dict[str, Any]]:
+            return await self._run(conn, 'fetch', 'items_by_category', category)
+
+    async def get_item_by_name(self, dish_name: str) -> Optional[asyncpg.Record]:
         """
         Find menu item by name (fuzzy match using LIKE)
 
@@ -229,30 +359,47 @@ class DatabaseService:
             dish_name: Dish name to search (e.g., "Idli", "Coffee")
 
         Returns:
-            Menu item dict with all fields or None if not found
+            Menu item record with all fields or None if not found
         """
         if not self.pool:
             raise RuntimeError("Database pool not initialized")
 
         async with self.pool.acquire() as conn:
-            # Fuzzy search with LIKE - case insensitive
-            row = await conn.fetchrow('''
-                SELECT
-                    dish_id, name, description, category, price,
-                    quantity, dietary_tags, meal_period, popularity_score,
-                    availability_status, image
-                FROM menu_items
-                WHERE LOWER(name) LIKE LOWER($1)
-                AND availability_status = 'available'
-                ORDER BY popularity_score DESC
-                LIMIT 1
-            ''', f'%{dish_name}%')
-
-            if row:
-                return dict(row)
-            else:
+            row = await self._run(conn, 'fetchrow', 'item_by_name', f'%{dish_name}%')
+
+            if row is None:
                 print(f"✗ Item not found: {dish_name}")
-                return None
+            return row
+
+    async def search_items_by_name(self, dish_name: str, limit: int = 5) -> List[asyncpg.Record]:
+        """
+        Rank available menu items by trigram similarity to a dish name (pg_trgm)
+
+        Args:
+            dish_name: Dish name to search (misspellings allowed)
+            limit: Maximum number of candidates
+
+        Returns:
+            List of menu item records with an added 'score' (0-1), best first
+        """
+        if not self.pool:
+            raise RuntimeError("Database pool not initialized")
+
+        async with self.pool.acquire() as conn:
+            return await self._run(conn, 'fetch', 'search_items_by_name', dish_name, limit)
+
+    async def get_menu_version(self) -> tuple:
+        """
+        Get a cheap fingerprint of the menu content, used to detect menu changes
+        (stock levels are read live, so quantity changes don't alter it)
+
+        Returns:
+            Tuple of (item count, hash of the menu content columns)
+        """
+        async with self.pool.acquire() as conn:
+            row = await self._run(conn, 'fetchrow', 'menu_version')
+
+            return (row['item_count'], row['content_hash'])
 
     async def get_database_stats(self) -> Dict[str, Any]:
         """
@@ -262,15 +409,7 @@ class DatabaseService:
             Dict with total items, available items, unavailable items, categories
         """
         async with self.pool.acquire() as conn:
-            stats = await conn.fetchrow('''
-                SELECT
-                    COUNT(*) as total_items,
-                    COUNT(*) FILTER (WHERE availability_status = 'available' AND quantity > 0) as available_items,
-                    COUNT(*) FILTER (WHERE availability_status = 'unavailable' OR quantity = 0) as unavailable_items,
-                    COUNT(DISTINCT category) as total_categories,
-                    SUM(quantity) as total_stock
-                FROM menu_items
-            ''')
+            stats = await self._run(conn, 'fetchrow', 'database_stats')
 
             return dict(stats)
 
@@ -0,0 +1,129 @@
+"""
+Menu embedding model without PyTorch.
+
+The default backend runs the ONNX export of the sentence-transformers model
+(the same weights, published under onnx/ in the model repo) with ONNX Runtime
+and the Rust `tokenizers` library, and applies the model's mean pooling in
+NumPy. Vectors match SentenceTransformer.encode to float precision, so an
+existing Qdrant collection stays valid.
+
+EMBEDDING_BACKEND=torch loads sentence-transformers instead (needs the
+packages from requirements-torch.txt).
+"""
+import logging
+import os
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx").lower()
+
+# ONNX file inside the model repo (e.g. onnx/model_qint8_avx512.onnx for the quantized export)
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+
+# Local copy of the model repo (offline boxes); empty = download to the Hugging Face cache
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "")
+
+# paraphrase-multilingual-MiniLM-L12-v2 max_seq_length
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "128"))
+
+
+class OnnxEmbeddingModel:
+    """SentenceTransformer-compatible encode() on ONNX Runtime with mean pooling."""
+
+    def __init__(self, onnx_path: Path, tokenizer_path: Path, max_tokens: int = EMBEDDING_MAX_TOKENS):
+        """
+        Args:
+            onnx_path: Transformer ONNX file (outputs token embeddings)
+            tokenizer_path: tokenizer.json of the same model
+            max_tokens: Truncation length
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        pad_token = "<pad>" if self.tokenizer.token_to_id("<pad>") is not None else "[PAD]"
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = int(os.getenv("EMBEDDING_THREADS", "2"))
+        self.session = onnxruntime.InferenceSession(str(onnx_path), sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.dimension = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dimension is None:
+            self.dimension = int(self.encode("dimension").shape[-1])
+        return self.dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed one sentence (returns a 1-D vector) or a list (returns one row per sentence).
+
+        Extra SentenceTransformer keyword arguments (show_progress_bar, ...) are ignored.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def _load_sentence_transformer():
+    """sentence-transformers backend (imports torch)."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    encode = model.encode
+
+    # Progress bars flood the logs on every query
+    def encode_no_progress(*args, **kwargs):
+        kwargs['show_progress_bar'] = False
+        return encode(*args, **kwargs)
+
+    model.encode = encode_no_progress
+    return model
+
+
+def load_embedding_model():
+    """
+    Load the menu embedding model for the configured backend.
+
+    Returns:
+        Object with encode() and get_sentence_embedding_dimension()
+    """
+    if EMBEDDING_BACKEND == "torch":
+        logger.info(f"Loading embedding model {EMBEDDING_MODEL} (sentence-transformers)")
+        return _load_sentence_transformer()
+
+    if EMBEDDING_MODEL_DIR:
+        model_dir = Path(EMBEDDING_MODEL_DIR)
+    else:
+        from huggingface_hub import snapshot_download
+
+        model_dir = Path(snapshot_download(EMBEDDING_MODEL, allow_patterns=[EMBEDDING_ONNX_FILE, "tokenizer.json"]))
+
+    logger.info(f"Loading embedding model {EMBEDDING_MODEL} (ONNX Runtime, {EMBEDDING_ONNX_FILE})")
+    return OnnxEmbeddingModel(model_dir / EMBEDDING_ONNX_FILE, model_dir / "tokenizer.json")
@@ -0,0 +1,255 @@
+"""
+Adaptive endpointing for the audio WebSocket.
+
+Decides how much trailing silence to wait for before an utterance is sent
+to ASR. Instead of a fixed MIN_SILENCE_MS after every utterance, the wait is
+shortened when the (speculative) transcript or prosody says the customer has
+finished a command, and lengthened when the speech sounds hesitant.
+"""
+import logging
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Transcript hints
+HINT_COMPLETE = "complete"
+HINT_INCOMPLETE = "incomplete"
+
+# Endpoint decisions (used as metric labels)
+DECISION_SHORT = "short"
+DECISION_BASE = "base"
+DECISION_LONG = "long"
+
+# Words that end a command on their own ("confirm", "that's enough", ...)
+COMMAND_KEYWORDS = [
+    'confirm', 'கன்ஃபர்ம்', 'கன்பர்ம்', 'கண்ஃபார்ம்', 'உறுதி',
+    'போதும்', 'வேண்டாம்', 'அவ்வளவு தான்', 'அவ்வளவுதான்', "that's all", 'enough',
+    'ஓகே', 'okay', 'ok', 'சரி', 'ஆமா', 'yes', 'no', 'இல்ல',
+]
+
+# Quantity words - a dish plus one of these is a complete order line
+QUANTITY_WORDS = [
+    'ஒரு', 'ஒண்ணு', 'ஒன்னு', 'ரெண்டு', 'இரண்டு', 'மூணு', 'மூன்று', 'நாலு', 'நான்கு',
+    'அஞ்சு', 'ஐந்து', 'ஆறு', 'ஏழு', 'எட்டு', 'ஒன்பது', 'பத்து',
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+    'ஒன்', 'டூ', 'த்ரீ', 'ஃபோர்', 'ஃபைவ்', 'plate', 'ப்ளேட்',
+]
+
+# Common dish words as the ASR writes them in Tamil script
+TAMIL_DISH_WORDS = [
+    'சிக்கன்', 'பிரியாணி', 'பிரியாணீ', 'ரைஸ்', 'ஃப்ரைட்', 'ஃப்ரை', 'நூடுல்ஸ்', 'மீல்ஸ்',
+    'மட்டன்', 'ஃபிஷ்', 'மீன்', 'கறி', 'முட்டை', 'எக்', 'கோபி', 'பன்னீர்', 'பனீர்',
+    'ஆம்லெட்', 'ஆம்லெட்டு', 'குடல்', 'லெக்', 'ஷெஸ்வான்', 'செஸ்வான்', 'வெஜ்',
+]
+
+# Trailing words that mean the customer is still going ("and...", "then...")
+HESITATION_WORDS = [
+    'அப்புறம்', 'அப்பறம்', 'அப்றம்', 'அப்புறமா', 'அது', 'வந்து', 'அப்படியே', 'அண்ட்', 'மற்றும்',
+    'இன்னும்', 'ம்ம்', 'உம்', 'ஆ', 'and', 'then', 'also', 'um', 'uh', 'umm', 'hmm',
+]
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer tuning value from the environment."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float tuning value from the environment."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+class EndpointTracker:
+    """Per-client utterance state used by the endpointer."""
+
+    def __init__(self, chunk_ms: float):
+        self.chunk_ms = chunk_ms
+        self.speech_energies = deque(maxlen=400)
+        self.pause_count = 0
+        self.transcript_hint: Optional[str] = None
+        self.last_decision: Optional[str] = None
+        self.chunks_since_endpoint: Optional[int] = None
+
+    def reset(self):
+        """Clear utterance state (called when a new utterance starts)."""
+        self.speech_energies.clear()
+        self.pause_count = 0
+        self.transcript_hint = None
+
+    def on_speech_chunk(self, audio_chunk: bytes, silence_chunks: int, pause_ms: int):
+        """
+        Record a voiced chunk.
+
+        Args:
+            audio_chunk: Raw 16-bit PCM chunk
+            silence_chunks: Silent chunks seen since the previous voiced chunk
+            pause_ms: Minimum gap that counts as a hesitation pause
+        """
+        if silence_chunks * self.chunk_ms >= pause_ms:
+            self.pause_count += 1
+        # Speech resumed - any speculative transcript no longer covers the utterance
+        self.transcript_hint = None
+
+        samples = np.frombuffer(audio_chunk, dtype=np.int16).astype(np.float32)
+        if len(samples):
+            self.speech_energies.append(float(np.sqrt(np.mean(samples * samples))))
+
+    def on_idle_chunk(self):
+        """Record a chunk received while the customer is not speaking."""
+        if self.chunks_since_endpoint is not None:
+            self.chunks_since_endpoint += 1
+
+    def falling_energy(self, tail_chunks: int, ratio: float) -> bool:
+        """True if the last voiced chunks are much quieter than the utterance (falling contour)."""
+        if len(self.speech_energies) < tail_chunks * 2:
+            return False
+        energies = list(self.speech_energies)
+        tail = energies[-tail_chunks:]
+        utterance_mean = sum(energies) / len(energies)
+        if utterance_mean <= 0:
+            return False
+        return (sum(tail) / len(tail)) < utterance_mean * ratio
+
+
+class AdaptiveEndpointer:
+    """
+    Chooses the trailing-silence threshold for each utterance and keeps
+    metrics on how often the choice cut a customer off.
+
+    All thresholds can be tuned per deployment with ENDPOINT_* environment
+    variables.
+    """
+
+    def __init__(self, sample_rate: int = 16000, chunk_size: int = 512, base_silence_ms: int = 500):
+        self.chunk_ms = chunk_size / sample_rate * 1000
+
+        self.min_silence_ms = _env_int("ENDPOINT_MIN_SILENCE_MS", 250)
+        self.base_silence_ms = _env_int("ENDPOINT_BASE_SILENCE_MS", base_silence_ms)
+        self.max_silence_ms = _env_int("ENDPOINT_MAX_SILENCE_MS", 900)
+        self.pause_ms = _env_int("ENDPOINT_PAUSE_MS", 150)
+        self.hesitation_pauses = _env_int("ENDPOINT_HESITATION_PAUSES", 2)
+        self.prosody_bonus_ms = _env_int("ENDPOINT_PROSODY_BONUS_MS", 150)
+        self.prosody_tail_chunks = _env_int("ENDPOINT_PROSODY_TAIL_CHUNKS", 4)
+        self.prosody_fall_ratio = _env_float("ENDPOINT_PROSODY_FALL_RATIO", 0.5)
+        self.false_cut_window_ms = _env_int("ENDPOINT_FALSE_CUT_WINDOW_MS", 1000)
+        self.speculative_asr = os.getenv("ENDPOINT_SPECULATIVE_ASR", "true").lower() in ("1", "true", "yes")
+
+        self.dish_words = set(w.lower() for w in TAMIL_DISH_WORDS)
+
+        self.stats: Dict[str, Dict[str, float]] = {
+            decision: {"endpoints": 0, "false_cuts": 0, "silence_ms_total": 0.0}
+            for decision in (DECISION_SHORT, DECISION_BASE, DECISION_LONG)
+        }
+
+        logger.info(
+            f"Adaptive endpointer: min={self.min_silence_ms}ms base={self.base_silence_ms}ms "
+            f"max={self.max_silence_ms}ms speculative_asr={self.speculative_asr}"
+        )
+
+    def new_tracker(self) -> EndpointTracker:
+        """Create per-client endpointing state."""
+        return EndpointTracker(self.chunk_ms)
+
+    def set_dish_names(self, names: Iterable[str]):
+        """Add menu dish names (English) to the vocabulary used to spot complete orders."""
+        for name in names:
+            for word in re.split(r'\s+', name.lower()):
+                if len(word) > 2:
+                    self.dish_words.add(word)
+
+    def classify_transcript(self, text: str) -> Optional[str]:
+        """
+        Classify a (speculative) transcript.
+
+        Returns:
+            HINT_COMPLETE for a finished command (confirmation, dish + quantity),
+            HINT_INCOMPLETE when it trails off on a hesitation word, else None
+        """
+        if not text or not text.strip():
+            return None
+
+        words = re.findall(r"[\w\u0b80-\u0bff']+", text.lower())
+        if not words:
+            return None
+
+        if words[-1] in HESITATION_WORDS:
+            return HINT_INCOMPLETE
+
+        # Match whole words so "no" does not fire on "noodles"
+        text_lower = ' '.join(words)
+        if any(
+            (keyword in text_lower) if ' ' in keyword else (keyword in words)
+            for keyword in COMMAND_KEYWORDS
+        ):
+            return HINT_COMPLETE
+
+        has_dish = any(word in self.dish_words for word in words)
+        has_quantity = any(word in QUANTITY_WORDS or word.isdigit() for word in words)
+        if has_dish and has_quantity:
+            return HINT_COMPLETE
+
+        return None
+
+    def _decide(self, tracker: EndpointTracker) -> tuple[str, float]:
+        """Pick the decision bucket and silence threshold for the current utterance."""
+        if tracker.transcript_hint == HINT_COMPLETE:
+            return DECISION_SHORT, self.min_silence_ms
+
+        if tracker.transcript_hint == HINT_INCOMPLETE or tracker.pause_count >= self.hesitation_pauses:
+            return DECISION_LONG, self.max_silence_ms
+
+        if tracker.falling_energy(self.prosody_tail_chunks, self.prosody_fall_ratio):
+            return DECISION_SHORT, max(self.min_silence_ms, self.base_silence_ms - self.prosody_bonus_ms)
+
+        return DECISION_BASE, self.base_silence_ms
+
+    def required_silence_ms(self, tracker: EndpointTracker) -> float:
+        """Trailing silence (ms) needed before this utterance is considered finished."""
+        return self._decide(tracker)[1]
+
+    def record_endpoint(self, tracker: EndpointTracker, silence_ms: float):
+        """Record that an utterance was ended after silence_ms of trailing silence."""
+        decision, _ = self._decide(tracker)
+        self.stats[decision]["endpoints"] += 1
+        self.stats[decision]["silence_ms_total"] += silence_ms
+        tracker.last_decision = decision
+        tracker.chunks_since_endpoint = 0
+        logger.debug(f"Endpoint ({decision}) after {silence_ms:.0f}ms silence, pauses={tracker.pause_count}")
+
+    def on_speech_start(self, tracker: EndpointTracker):
+        """
+        Called when a new utterance starts. If it starts within the false-cut
+        window of the previous endpoint, the previous endpoint cut the customer off.
+        """
+        if tracker.chunks_since_endpoint is not None and tracker.last_decision:
+            gap_ms = tracker.chunks_since_endpoint * self.chunk_ms
+            if gap_ms <= self.false_cut_window_ms:
+                self.stats[tracker.last_decision]["false_cuts"] += 1
+                logger.info(f"Possible false cut ({tracker.last_decision}): speech resumed after {gap_ms:.0f}ms")
+        tracker.chunks_since_endpoint = None
+        tracker.reset()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Endpoint counts, false cuts and average wait per decision."""
+        return {
+            decision: {
+                "endpoints": s["endpoints"],
+                "false_cuts": s["false_cuts"],
+                "false_cut_rate": round(s["false_cuts"] / s["endpoints"], 3) if s["endpoints"] else 0.0,
+                "avg_silence_ms": round(s["silence_ms_total"] / s["endpoints"], 1) if s["endpoints"] else 0.0,
+            }
+            for decision, s in self.stats.items()
+        }
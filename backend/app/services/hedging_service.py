@@ -0,0 +1,282 @@
+"""
+Deadlines and hedged requests for the remote speech APIs (Sarvam ASR / TTS).
+
+Every call gets a timeout: the per-call limit (<NAME>_TIMEOUT_S), cut down to
+what is left of the turn's deadline when the caller passes one. A call whose
+turn is already out of time is not sent at all.
+
+With hedging on, a call that hasn't answered after the service's recent p95
+latency (clamped to <NAME>_HEDGE_MIN_MS..<NAME>_HEDGE_MAX_MS) is sent a second
+time; the first answer wins and the other request is cancelled. A call that
+fails before the hedge fires is retried right away if time allows. p95-based
+delays keep the extra load to roughly 5% of calls.
+
+Deadlines are time.monotonic() timestamps (see deadline_after()).
+
+CircuitBreaker is the closed / open / half-open breaker shared by the speech
+services and the LLM router.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import numpy as np
+
+from app.services.metrics_service import SPEECH_API_CALLS, SPEECH_API_HEDGE_WINS, SPEECH_API_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Successful call latencies kept for the p95, and how many are needed before it's used
+STATS_WINDOW = 200
+MIN_SAMPLES = 20
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The call (or the turn it belongs to) ran out of time."""
+
+
+class DeadlinePassed(DeadlineExceeded):
+    """The turn was out of time before the call was sent - nothing was asked of the backend."""
+
+
+def is_client_error(error: Exception) -> bool:
+    """True when the API rejected the request itself (HTTP 4xx other than 408/429), not a backend fault."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def deadline_after(seconds: float) -> float:
+    """Deadline timestamp `seconds` from now."""
+    return time.monotonic() + seconds
+
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until the deadline (None = no deadline)."""
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class HedgedCaller:
+    """Deadline and hedging policy for one remote call type ("asr", "tts")."""
+
+    def __init__(self, name: str, timeout_s: float = 8.0, hedge_min_ms: float = 500,
+                 hedge_max_ms: float = 3000, hedge_default_ms: float = 1500):
+        """
+        Args:
+            name: Service name (metric label and env var prefix, e.g. ASR_TIMEOUT_S)
+            timeout_s: Default per-call timeout
+            hedge_min_ms / hedge_max_ms: Bounds of the hedge delay
+            hedge_default_ms: Hedge delay until enough latencies are recorded
+        """
+        prefix = name.upper()
+        self.name = name
+        self.timeout_s = float(os.getenv(f"{prefix}_TIMEOUT_S", timeout_s))
+        self.hedging = os.getenv(f"{prefix}_HEDGING_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.hedge_min_ms = float(os.getenv(f"{prefix}_HEDGE_MIN_MS", hedge_min_ms))
+        self.hedge_max_ms = float(os.getenv(f"{prefix}_HEDGE_MAX_MS", hedge_max_ms))
+        self.hedge_default_ms = float(os.getenv(f"{prefix}_HEDGE_DEFAULT_MS", hedge_default_ms))
+
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile of successful calls in seconds (None until MIN_SAMPLES)."""
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        return float(np.percentile(self.latencies, q))
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait before sending the duplicate request."""
+        p95 = self.percentile(95)
+        delay_ms = self.hedge_default_ms if p95 is None else p95 * 1000
+        return min(max(delay_ms, self.hedge_min_ms), self.hedge_max_ms) / 1000
+
+    def budget(self, deadline: Optional[float] = None) -> float:
+        """Time this call may take: the per-call timeout, capped by the turn deadline."""
+        remaining = time_left(deadline)
+        return self.timeout_s if remaining is None else min(self.timeout_s, remaining)
+
+    def _result(self, result: str):
+        SPEECH_API_CALLS.labels(self.name, result).inc()
+
+    async def call(self, make_request: Callable[[float], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """
+        Run a request under the deadline, hedging it if it is slow.
+
+        Args:
+            make_request: Starts one request; gets the seconds it may take
+                (for the client's own timeout). Called again for the hedge,
+                so it must not share per-request state such as file objects.
+            deadline: Turn deadline (time.monotonic() timestamp) or None
+
+        Returns:
+            The first successful response
+
+        Raises:
+            DeadlineExceeded: No answer within the budget
+            Exception: The request's own error when every attempt failed
+        """
+        budget = self.budget(deadline)
+        if budget <= 0:
+            self.skipped += 1
+            self._result("skipped")
+            raise DeadlinePassed(f"{self.name}: turn deadline already passed")
+
+        self.calls += 1
+        start = time.monotonic()
+        end = start + budget
+        first = asyncio.create_task(make_request(budget))
+        attempts = [first]
+        hedged = False
+        last_error = None
+
+        try:
+            while attempts:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                wait = remaining
+                if self.hedging and not hedged:
+                    wait = min(remaining, max(0.0, start + self.hedge_delay() - time.monotonic()))
+
+                done, _ = await asyncio.wait(attempts, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    attempts.remove(task)
+                    if task.exception() is None:
+                        self.latencies.append(time.monotonic() - start)
+                        if task is not first:
+                            self.hedge_wins += 1
+                            SPEECH_API_HEDGE_WINS.labels(self.name).inc()
+                        self._result("ok")
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"⚠️ {self.name} request failed: {last_error}")
+
+                # Hedge when the first request is slow, or retry at once when it failed
+                if self.hedging and not hedged and (not done or not attempts):
+                    remaining = end - time.monotonic()
+                    if remaining > 0:
+                        hedged = True
+                        self.hedges += 1
+                        SPEECH_API_HEDGES.labels(self.name).inc()
+                        if not done:
+                            logger.info(f"⏳ {self.name} slower than {self.hedge_delay() * 1000:.0f}ms, sending hedged request")
+                        attempts.append(asyncio.create_task(make_request(remaining)))
+        finally:
+            for task in attempts:
+                task.cancel()
+
+        if last_error is not None and time.monotonic() < end:
+            self.errors += 1
+            self._result("error")
+            raise last_error
+
+        self.timeouts += 1
+        self._result("timeout")
+        raise DeadlineExceeded(f"{self.name}: no answer within {budget:.1f}s")
+
+    def get_stats(self) -> dict:
+        """Call, hedge and timeout counts and latency percentiles (for /health)."""
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "timeout_s": self.timeout_s,
+            "hedging": self.hedging,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 3) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000),
+        }
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial after the cooldown."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown_s: float = 30.0,
+                 error_rate: Optional[float] = None, min_calls: int = 10):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            cooldown_s: Seconds open before a trial call is let through
+            error_rate: Also open above this error rate (None = consecutive failures only)
+            min_calls: Calls in the caller's window before the error rate counts
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    def available(self) -> bool:
+        """Whether a call may be sent now (moves open -> half-open once the cooldown is over)."""
+        if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self.state = BREAKER_HALF_OPEN
+            self.trial_in_flight = False
+        return self.state == BREAKER_CLOSED or (self.state == BREAKER_HALF_OPEN and not self.trial_in_flight)
+
+    def on_attempt(self):
+        if self.state == BREAKER_HALF_OPEN:
+            self.trial_in_flight = True
+
+    def on_success(self):
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def on_failure(self, error_rate: float = 0.0, window_calls: int = 0) -> bool:
+        """
+        Record a failed call.
+
+        Args:
+            error_rate: Caller's recent error rate (used when the breaker has one)
+            window_calls: Calls that rate is over
+
+        Returns:
+            True if this failure opened the breaker
+        """
+        self.consecutive_failures += 1
+        tripped = (
+            self.state == BREAKER_HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+            or (self.error_rate is not None and window_calls >= self.min_calls and error_rate > self.error_rate)
+        )
+        if tripped and self.state != BREAKER_OPEN:
+            self.state = BREAKER_OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+            self.times_opened += 1
+            return True
+        return False
+
+    def on_cancel(self):
+        """A call was abandoned (lost a hedge race) - it says nothing about health."""
+        self.trial_in_flight = False
@@ -0,0 +1,126 @@
+"""
+Leader election between uvicorn workers (UVICORN_WORKERS > 1).
+
+Every worker process runs its own copy of the app, but some jobs must run once
+per deployment: the embedded print worker (it keeps the printer connection
+open), the Qdrant sync and the reservation expiry. The worker holding a
+PostgreSQL advisory lock is the leader and runs them. The lock lives on a
+dedicated pooled connection, so it is released when the leader dies and
+another worker takes over at its next attempt.
+
+A single worker is always the leader; no lock is taken.
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS", "1"))
+LEADER_LOCK_KEY = int(os.getenv("LEADER_LOCK_KEY", "7262001"))  # pg advisory lock key, shared by all workers
+LEADER_RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "10"))
+
+
+class LeaderElection:
+    """Holds (or keeps trying to get) the deployment-wide leader lock."""
+
+    def __init__(self, workers: int = UVICORN_WORKERS):
+        """
+        Args:
+            workers: Number of uvicorn workers (1 = always leader)
+        """
+        self.workers = workers
+        self.is_leader = workers <= 1
+        self.conn = None
+        self.task: Optional[asyncio.Task] = None
+        # Coroutines run when this worker becomes / stops being the leader
+        self.on_elected: List[Callable[[], Awaitable]] = []
+        self.on_demoted: List[Callable[[], Awaitable]] = []
+
+    async def start(self):
+        """Run the elected callbacks (single worker) or start campaigning for the lock."""
+        if self.workers <= 1:
+            await self._notify(self.on_elected)
+        elif self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop campaigning and give the lock up."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self._release()
+
+    async def run(self):
+        """Try for the lock every LEADER_RETRY_SECONDS; while holding it, check the connection is alive."""
+        while True:
+            try:
+                if self.conn is None:
+                    await self._campaign()
+                else:
+                    await self.conn.fetchval("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Lost the lock connection - the lock went with it
+                if self.is_leader:
+                    logger.error(f"👑 Lost leader lock: {e}")
+                    self.is_leader = False
+                    await self._release()
+                    await self._notify(self.on_demoted)
+                else:
+                    logger.warning(f"Leader election failed: {e}")
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+
+    async def _campaign(self):
+        if not db_service.pool:
+            return
+        conn = await db_service.pool.acquire()
+        try:
+            acquired = await conn.fetchval("SELECT pg_try_advisory_lock($1)", LEADER_LOCK_KEY)
+        except Exception:
+            await db_service.pool.release(conn)
+            raise
+        if not acquired:
+            await db_service.pool.release(conn)
+            return
+
+        self.conn = conn
+        self.is_leader = True
+        logger.info(f"👑 Worker {os.getpid()} elected leader, running background jobs")
+        await self._notify(self.on_elected)
+
+    async def _release(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        try:
+            await conn.execute("SELECT pg_advisory_unlock($1)", LEADER_LOCK_KEY)
+        except Exception:
+            pass
+        try:
+            await db_service.pool.release(conn)
+        except Exception:
+            pass
+
+    async def _notify(self, callbacks: List[Callable[[], Awaitable]]):
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Leader callback failed: {e}")
+
+    def get_status(self) -> dict:
+        """Leader state of this worker (for /health)."""
+        return {"workers": self.workers, "pid": os.getpid(), "is_leader": self.is_leader}
+
+
+# Global leader election instance
+leader = LeaderElection()
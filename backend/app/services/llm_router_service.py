@@ -0,0 +1,389 @@
+"""
+Latency-aware routing across LLM providers.
+
+LLMRouter has the same chat() / chat_stream() interface as LLMService and
+sends each request to the configured providers in priority order
+(LLM_PROVIDERS, default "groq,groq_backup,gemini"):
+
+- Rolling stats: latency (p50/p95) and error rate over each provider's last
+  LLM_STATS_WINDOW calls.
+- Hedging: if a provider hasn't answered after its own p95 latency (clamped to
+  LLM_HEDGE_MIN_MS..LLM_HEDGE_MAX_MS), the same request also goes to the next
+  provider; the first good answer wins and the other call is cancelled.
+- Failover: an error, or no answer within LLM_CALL_TIMEOUT_S, moves on to the
+  next provider straight away.
+- Circuit breaker: LLM_BREAKER_FAILURES consecutive failures (or an error rate
+  above LLM_BREAKER_ERROR_RATE) take a provider out of rotation for
+  LLM_BREAKER_COOLDOWN_S; then a single trial call decides whether it's back.
+
+Requests with tools (or tool results in the history) only go to providers
+that support function calling - the Gemini backend doesn't. Errors caused by
+the request itself (HTTP 400/413/422, e.g. Groq's "tool call validation
+failed") are raised unchanged, without failover or breaker penalty, so the
+caller's retry-without-tools still applies.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.hedging_service import CircuitBreaker
+from app.services.metrics_service import (
+    LLM_BREAKER_OPEN,
+    LLM_FAILOVERS,
+    LLM_HEDGES,
+    LLM_PROVIDER_ERRORS,
+    LLM_PROVIDER_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDERS = [name.strip() for name in os.getenv("LLM_PROVIDERS", "groq,groq_backup,gemini").split(",") if name.strip()]
+
+# Hedging: wait the provider's p95 (within these bounds) before asking the next one
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "800"))
+LLM_HEDGE_MAX_MS = float(os.getenv("LLM_HEDGE_MAX_MS", "4000"))
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "2500"))  # until enough samples
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Hard limit for one provider call (counts as a failure)
+LLM_CALL_TIMEOUT_S = float(os.getenv("LLM_CALL_TIMEOUT_S", "12"))
+
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "100"))
+
+# Circuit breaker
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_MIN_CALLS = 10
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+# Status codes that mean the request was bad, not the provider
+REQUEST_ERROR_STATUS = {400, 413, 422}
+
+
+def is_request_error(error: Exception) -> bool:
+    """True when the provider rejected the request itself (retrying elsewhere won't help)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in REQUEST_ERROR_STATUS or "tool call validation failed" in str(error)
+
+
+class ProviderStats:
+    """Rolling latency and outcome window of one provider."""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.latencies = deque(maxlen=window)  # Seconds, successful calls only
+        self.outcomes = deque(maxlen=window)   # True = success
+        self.calls = 0
+        self.errors = 0
+        self.hedges = 0    # Times this provider was called as a hedge
+        self.failovers = 0 # Times this provider was called after another one failed
+
+    def record_success(self, seconds: float):
+        self.calls += 1
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        self.calls += 1
+        self.errors += 1
+        self.outcomes.append(False)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile in seconds (None until there are enough samples)."""
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return float(np.percentile(self.latencies, q))
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+
+class LLMProvider:
+    """One LLM backend with its stats and circuit breaker."""
+
+    def __init__(self, name: str, service, supports_tools: bool = True):
+        """
+        Args:
+            name: Provider name (metric label, LLM_PROVIDERS entry)
+            service: Object with chat() / chat_stream() (an LLMService)
+            supports_tools: Whether the backend handles function calling
+        """
+        self.name = name
+        self.service = service
+        self.supports_tools = supports_tools
+        self.stats = ProviderStats()
+        self.breaker = CircuitBreaker(
+            LLM_BREAKER_FAILURES,
+            LLM_BREAKER_COOLDOWN_S,
+            error_rate=LLM_BREAKER_ERROR_RATE,
+            min_calls=LLM_BREAKER_MIN_CALLS
+        )
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for this provider before hedging to the next one."""
+        p95 = self.stats.percentile(95)
+        delay_ms = LLM_HEDGE_DEFAULT_MS if p95 is None else p95 * 1000
+        return min(max(delay_ms, LLM_HEDGE_MIN_MS), LLM_HEDGE_MAX_MS) / 1000
+
+    def get_stats(self) -> dict:
+        p50 = self.stats.percentile(50)
+        p95 = self.stats.percentile(95)
+        return {
+            "name": self.name,
+            "model": getattr(self.service, "model_name", None),
+            "supports_tools": self.supports_tools,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "calls": self.stats.calls,
+            "errors": self.stats.errors,
+            "error_rate": round(self.stats.error_rate, 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000),
+            "hedges": self.stats.hedges,
+            "failovers": self.stats.failovers,
+        }
+
+
+class LLMRouter:
+    """Routes chat requests over several LLM providers with hedging, failover and circuit breaking."""
+
+    def __init__(self, providers: List[LLMProvider], hedging: bool = LLM_HEDGING_ENABLED):
+        if not providers:
+            raise ValueError("No LLM provider could be initialized")
+        self.providers = providers
+        self.hedging = hedging
+        self.model_name = getattr(providers[0].service, "model_name", None)
+        for provider in providers:
+            LLM_BREAKER_OPEN.labels(provider.name).set(0)
+        logger.info(f"LLM router: {' -> '.join(p.name for p in providers)} (hedging {'on' if hedging else 'off'})")
+
+    def _candidates(self, messages: list, tools: list) -> List[LLMProvider]:
+        """Providers to try, in priority order."""
+        needs_tools = bool(tools) or any(m.get("role") == "tool" or m.get("tool_calls") for m in messages)
+        eligible = [p for p in self.providers if p.supports_tools or not needs_tools]
+        available = [p for p in eligible if p.breaker.available()]
+        # Every breaker open: still try rather than fail the turn without a call
+        return available or eligible
+
+    def _record_success(self, provider: LLMProvider, seconds: float):
+        provider.stats.record_success(seconds)
+        provider.breaker.on_success()
+        LLM_PROVIDER_LATENCY.labels(provider.name).observe(seconds)
+        LLM_BREAKER_OPEN.labels(provider.name).set(0)
+
+    def _record_failure(self, provider: LLMProvider, error: Exception):
+        provider.stats.record_failure()
+        LLM_PROVIDER_ERRORS.labels(provider.name).inc()
+        if provider.breaker.on_failure(provider.stats.error_rate, len(provider.stats.outcomes)):
+            LLM_BREAKER_OPEN.labels(provider.name).set(1)
+            logger.error(
+                f"🔌 LLM provider {provider.name} taken out of rotation for {provider.breaker.cooldown_s:.0f}s "
+                f"({provider.breaker.consecutive_failures} consecutive failures, error rate {provider.stats.error_rate:.0%})"
+            )
+
+    async def _attempt(self, provider: LLMProvider, call: Callable[[LLMProvider], Awaitable]) -> Tuple[object, Optional[Exception]]:
+        """Run one provider call; returns (result, None) or (None, error) and records the outcome."""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(provider), LLM_CALL_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"{provider.name} did not answer within {LLM_CALL_TIMEOUT_S:.0f}s")
+            self._record_failure(provider, error)
+            return None, error
+        except Exception as e:
+            if is_request_error(e):
+                # The provider is fine, the request isn't
+                provider.breaker.on_success()
+            else:
+                self._record_failure(provider, e)
+            return None, e
+        self._record_success(provider, time.perf_counter() - start)
+        return result, None
+
+    async def _route(
+        self,
+        candidates: List[LLMProvider],
+        call: Callable[[LLMProvider], Awaitable],
+        discard: Callable[[object], None] = None
+    ) -> Tuple[LLMProvider, object]:
+        """
+        Run call() on the candidates with hedging and failover.
+
+        Args:
+            candidates: Providers in priority order
+            call: Makes the request on one provider
+            discard: Releases the result of a call that finished but lost the race
+
+        Returns:
+            (provider, result) of the first successful call
+        """
+        queue = list(candidates)
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        last_launched = None
+        last_error = None
+
+        def launch() -> LLMProvider:
+            provider = queue.pop(0)
+            provider.breaker.on_attempt()
+            pending[asyncio.create_task(self._attempt(provider, call))] = provider
+            return provider
+
+        last_launched = launch()
+        try:
+            while pending:
+                timeout = last_launched.hedge_delay() if self.hedging and queue else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    slow = last_launched
+                    last_launched = launch()
+                    last_launched.stats.hedges += 1
+                    LLM_HEDGES.labels(last_launched.name).inc()
+                    logger.warning(f"⏳ LLM {slow.name} slower than {timeout * 1000:.0f}ms, hedging to {last_launched.name}")
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    result, error = task.result()
+                    if error is None:
+                        if provider is not candidates[0]:
+                            logger.info(f"🔀 LLM answered by {provider.name}")
+                        return provider, result
+                    if is_request_error(error):
+                        raise error
+                    last_error = error
+                    logger.warning(f"⚠️ LLM provider {provider.name} failed: {error}")
+
+                if not pending and queue:
+                    last_launched = launch()
+                    last_launched.stats.failovers += 1
+                    LLM_FAILOVERS.labels(last_launched.name).inc()
+                    logger.warning(f"🔀 Failing over to LLM provider {last_launched.name}")
+
+            raise last_error
+        finally:
+            for task, provider in pending.items():
+                if task.done():
+                    result, error = task.result()
+                    if error is None and discard is not None:
+                        discard(result)
+                else:
+                    task.cancel()
+                provider.breaker.on_cancel()
+
+    async def chat(
+        self,
+        messages: list,
+        temperature: float = 0.7,
+        max_tokens: int = 512,
+        tools: list = None,
+        tool_choice: str = None
+    ) -> dict:
+        """
+        Chat completion on the fastest healthy provider (same contract as LLMService.chat).
+
+        Returns:
+            dict with 'type' ('text' or 'tool_call'), 'content' / 'tool_calls',
+            and 'provider' (name of the provider that answered)
+        """
+        kwargs = {"temperature": temperature, "max_tokens": max_tokens, "tools": tools}
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+
+        provider, response = await self._route(
+            self._candidates(messages, tools),
+            lambda p: p.service.chat(messages, **kwargs)
+        )
+        response["provider"] = provider.name
+        return response
+
+    async def chat_stream(
+        self,
+        messages: list,
+        temperature: float = 0.7,
+        max_tokens: int = 512,
+        tools: list = None
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Streaming chat completion (same chunks as LLMService.chat_stream).
+
+        Hedging and failover apply until the first chunk arrives; after that the
+        stream stays on its provider and a mid-stream error is raised.
+        """
+        async def first_chunk(provider: LLMProvider):
+            stream = provider.service.chat_stream(messages, temperature=temperature, max_tokens=max_tokens, tools=tools)
+            try:
+                return stream, await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        def discard(result):
+            asyncio.create_task(result[0].aclose())
+
+        provider, (stream, chunk) = await self._route(self._candidates(messages, tools), first_chunk, discard)
+        try:
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            self._record_failure(provider, e)
+            raise
+        finally:
+            await stream.aclose()
+
+    def get_stats(self) -> dict:
+        """Per-provider latency, errors, breaker state and hedge counts (for /health)."""
+        return {
+            "hedging": self.hedging,
+            "providers": [provider.get_stats() for provider in self.providers],
+        }
+
+
+def _build_provider(name: str) -> LLMProvider:
+    """Create one provider from its LLM_PROVIDERS name."""
+    if name == "groq":
+        from app.services.llm_service import LLMService
+        return LLMProvider(name, LLMService())
+
+    if name == "groq_backup":
+        # Separate key and/or model, so Groq rate limits and model outages don't hit both
+        from app.services.llm_service import LLMService
+        return LLMProvider(name, LLMService(
+            api_key=os.getenv("GROQ_BACKUP_API_KEY") or os.getenv("GROQ_API_KEY"),
+            model=os.getenv("GROQ_BACKUP_MODEL", "llama-3.1-8b-instant")
+        ))
+
+    if name == "gemini":
+        from app.services.llm_service_gemini_backup import LLMService as GeminiLLMService
+        return LLMProvider(name, GeminiLLMService(), supports_tools=False)
+
+    raise ValueError(f"Unknown LLM provider '{name}'")
+
+
+def create_llm_router(names: List[str] = None) -> LLMRouter:
+    """
+    Build the router from LLM_PROVIDERS; providers that can't start (no API key,
+    SDK missing) are left out.
+
+    Args:
+        names: Provider names in priority order (default: LLM_PROVIDERS)
+    """
+    providers = []
+    for name in names or LLM_PROVIDERS:
+        try:
+            providers.append(_build_provider(name))
+        except Exception as e:
+            logger.warning(f"LLM provider '{name}' not available: {e}")
+    return LLMRouter(providers)
@@ -0,0 +1,309 @@
+"""
+In-process menu catalog for tool-call lookups.
+
+Holds every menu item keyed by dish_id plus an index of normalized names and
+aliases (English, Tamil script, common transliterations), so resolving the
+dish name the LLM passes to a tool is a dict lookup instead of a
+`LIKE '%x%'` scan. Live stock is still read from PostgreSQL by dish_id.
+
+Names that aren't an exact alias go through a character-trigram index that
+returns ranked candidates with scores, so misspellings still match and
+generic names ("chicken") can be sent back for disambiguation.
+"""
+import functools
+import itertools
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+# Spoken / written variants per English menu word. Aliases for a dish are the
+# combinations of its words' variants, so "Chicken Fried Rice" also indexes
+# "சிக்கன் ஃப்ரைடு ரைஸ்", "chicken fried rice" and so on.
+WORD_VARIANTS = {
+    'chicken': ['சிக்கன்'],
+    'biryani': ['biriyani', 'briyani', 'பிரியாணி', 'பிரியானி'],
+    'fried': ['ஃப்ரைடு', 'ஃப்ரைட்', 'பிரைடு', 'fry'],
+    'rice': ['ரைஸ்', 'சாதம்'],
+    'noodles': ['noodle', 'நூடுல்ஸ்', 'நூடுல்'],
+    'veg': ['vegetable', 'வெஜ்', 'வெஜிடபுல்', 'வெஜிடபிள்'],
+    'egg': ['எக்', 'முட்டை'],
+    'gobi': ['gobhi', 'கோபி'],
+    'paneer': ['panner', 'பன்னீர்', 'பனீர்'],
+    'schezwan': ['schewzan', 'szechuan', 'sezwan', 'செஸ்வான்', 'ஷெஸ்வான்'],
+    'fry': ['ஃப்ரை', 'பிரை', 'வறுவல்'],
+    'leg': ['லெக்'],
+    'fish': ['ஃபிஷ்', 'மீன்'],
+    'curry': ['கறி', 'குழம்பு'],
+    'kudal': ['குடல்'],
+    'meals': ['meal', 'மீல்ஸ்', 'சாப்பாடு'],
+    'mutton': ['மட்டன்'],
+    'palipalayam': ['pallipalayam', 'பாலிப்பாளையம்', 'பள்ளிப்பாளையம்'],
+    'omelette': ['omelet', 'omlet', 'ஆம்லெட்', 'ஓம்லெட்'],
+}
+
+# Upper bound on generated aliases per dish (combinations grow quickly)
+MAX_ALIASES_PER_DISH = 200
+
+# Fuzzy matching: minimum trigram similarity for a candidate, and how close the
+# runner-up must be for the name to count as ambiguous
+MATCH_MIN_SCORE = float(os.getenv("MENU_MATCH_MIN_SCORE", "0.35"))
+MATCH_AMBIGUITY_MARGIN = float(os.getenv("MENU_MATCH_AMBIGUITY_MARGIN", "0.08"))
+# A clear winner is only taken without asking when it scores at least this, or
+# when every word of the name is a word of the dish ("fish fry" is not Fish Curry)
+MATCH_ACCEPT_SCORE = float(os.getenv("MENU_MATCH_ACCEPT_SCORE", "0.75"))
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalize a dish name for lookup: lowercase, punctuation stripped,
+    whitespace collapsed. Tamil script is kept as-is.
+
+    Args:
+        text: Raw dish name
+
+    Returns:
+        Normalized name
+    """
+    text = re.sub(r"[^\w\u0b80-\u0bff\s]", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def generate_aliases(name: str) -> List[str]:
+    """
+    Generate normalized aliases for a dish name from WORD_VARIANTS.
+
+    Args:
+        name: English dish name (e.g. "Chicken Fried Rice")
+
+    Returns:
+        List of normalized aliases, including the name itself
+    """
+    words = normalize_name(name).split()
+    if not words:
+        return []
+
+    options = [[word] + WORD_VARIANTS.get(word, []) for word in words]
+    aliases = []
+    for combo in itertools.islice(itertools.product(*options), MAX_ALIASES_PER_DISH):
+        aliases.append(normalize_name(' '.join(combo)))
+    return aliases
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of a normalized string, padded so word starts/ends count
+    (same scheme as PostgreSQL pg_trgm).
+
+    Args:
+        text: Normalized text
+
+    Returns:
+        Set of trigrams
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+@functools.lru_cache(maxsize=1024)
+def name_words(name: str) -> frozenset:
+    """Every word of a dish name's aliases (English, Tamil, transliterations)."""
+    return frozenset(word for alias in generate_aliases(name) for word in alias.split())
+
+
+def pick_match(candidates: List[Tuple[Dict[str, Any], float]], dish_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Pick the winner from ranked candidates, refusing to guess when the
+    runner-up scores within MATCH_AMBIGUITY_MARGIN of the top, or when the
+    top is a weak match (below MATCH_ACCEPT_SCORE and some word of the name
+    isn't in the dish).
+
+    Args:
+        candidates: (item, score) pairs, best first
+        dish_name: Dish name the candidates were ranked for
+
+    Returns:
+        Winning item, or None if there are no candidates or the customer should be asked
+    """
+    if not candidates:
+        return None
+    if len(candidates) > 1 and candidates[0][1] - candidates[1][1] < MATCH_AMBIGUITY_MARGIN:
+        return None
+    item, score = candidates[0]
+    if score < MATCH_ACCEPT_SCORE and not set(normalize_name(dish_name).split()) <= name_words(item['name']):
+        return None
+    return item
+
+
+class TrigramIndex:
+    """Inverted trigram index over strings, scored with the Dice coefficient."""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str]] = []   # (text, key)
+        self.entry_sizes: List[int] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+    def add(self, text: str, key: str):
+        """
+        Index a string.
+
+        Args:
+            text: Normalized text to index
+            key: Value returned for matches (e.g. dish_id)
+        """
+        grams = trigrams(text)
+        entry_id = len(self.entries)
+        self.entries.append((text, key))
+        self.entry_sizes.append(len(grams))
+        for gram in grams:
+            self.postings[gram].append(entry_id)
+
+    def search(self, query: str) -> Dict[str, float]:
+        """
+        Score every indexed key against the query.
+
+        Args:
+            query: Normalized query text
+
+        Returns:
+            Dict of key -> best similarity (0-1) over that key's strings
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return {}
+
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for entry_id in self.postings.get(gram, ()):
+                shared[entry_id] += 1
+
+        scores: Dict[str, float] = {}
+        for entry_id, count in shared.items():
+            key = self.entries[entry_id][1]
+            score = 2.0 * count / (len(query_grams) + self.entry_sizes[entry_id])
+            if score > scores.get(key, 0.0):
+                scores[key] = score
+        return scores
+
+
+class MenuCatalog:
+    """In-memory menu items with a name/alias index."""
+
+    def __init__(self):
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.alias_index: Dict[str, str] = {}
+        self.trigram_index = TrigramIndex()
+        self.version = None
+
+    def load(self, menu_items: List[Dict[str, Any]]):
+        """
+        Replace the catalog contents.
+
+        Args:
+            menu_items: Menu item dicts (as returned by DatabaseService)
+        """
+        items = {}
+        alias_index = {}
+        trigram_index = TrigramIndex()
+
+        # Most popular first so a shared alias resolves to the popular dish
+        for item in sorted(menu_items, key=lambda x: x.get('popularity_score') or 0, reverse=True):
+            items[item['dish_id']] = item
+            for alias in generate_aliases(item['name']):
+                if alias not in alias_index:
+                    alias_index[alias] = item['dish_id']
+                    trigram_index.add(alias, item['dish_id'])
+
+        # Swap in one step so concurrent lookups never see a half-built index
+        self.items = items
+        self.alias_index = alias_index
+        self.trigram_index = trigram_index
+        logger.info(f"Menu catalog loaded: {len(items)} items, {len(alias_index)} aliases")
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Reload from PostgreSQL if the menu changed since the last load.
+
+        Args:
+            force: Reload even if the menu version is unchanged
+
+        Returns:
+            True if the catalog was reloaded
+        """
+        version = await db_service.get_menu_version()
+        if not force and version == self.version and self.items:
+            return False
+
+        self.load(await db_service.get_all_menu_items())
+        self.version = version
+        return True
+
+    def get(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        """Get a catalog item by dish_id."""
+        return self.items.get(dish_id)
+
+    def match(self, dish_name: str, limit: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Rank menu items against a dish name.
+
+        Args:
+            dish_name: Dish name as given by the LLM / customer
+            limit: Maximum number of candidates
+
+        Returns:
+            List of (item, score) pairs, best first. An exact alias hit is the
+            only candidate, with score 1.0.
+        """
+        query = normalize_name(dish_name)
+        if not query:
+            return []
+
+        dish_id = self.alias_index.get(query)
+        if dish_id:
+            return [(self.items[dish_id], 1.0)]
+
+        scores = self.trigram_index.search(query)
+        ranked = sorted(
+            (
+                (self.items[d], score) for d, score in scores.items()
+                if score >= MATCH_MIN_SCORE
+            ),
+            key=lambda pair: (
+                round(pair[1], 3),
+                pair[0].get('availability_status') == 'available',
+                pair[0].get('popularity_score') or 0
+            ),
+            reverse=True
+        )
+        return ranked[:limit]
+
+    def resolve(self, dish_name: str) -> Tuple[Optional[Dict[str, Any]], List[Tuple[Dict[str, Any], float]]]:
+        """
+        Resolve a dish name, refusing to guess when the top candidates are too close.
+
+        Args:
+            dish_name: Dish name as given by the LLM / customer
+
+        Returns:
+            (item, candidates): item is the match, or None if nothing matched or
+            the name is ambiguous; candidates are the ranked matches
+        """
+        candidates = self.match(dish_name)
+        return pick_match(candidates, dish_name), candidates
+
+    def names(self) -> List[str]:
+        """English names of all catalog items."""
+        return [item['name'] for item in self.items.values()]
+
+
+# Global menu catalog instance
+menu_catalog = MenuCatalog()
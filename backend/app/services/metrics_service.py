@@ -0,0 +1,174 @@
+"""
+Prometheus metrics for the audio service (served on /metrics).
+
+Stage latencies, tool calls, LLM retries, orders and turns are taken from the
+per-turn traces (tracing_service listeners), so every instrumented span is
+measured once and shows up both in the trace file and here. DB query latency
+is observed by database_service, VAD frames by the audio processor, and the
+connection / pool gauges read live state when Prometheus scrapes.
+
+With several uvicorn workers each process has its own registry. Set
+PROMETHEUS_MULTIPROC_DIR (an empty directory shared by the workers) and
+/metrics aggregates all of them; the live gauges are not written to that
+directory, so in this mode they only exist per worker (see /health).
+
+Useful queries:
+    histogram_quantile(0.95, rate(hotelbot_time_to_first_audio_seconds_bucket[5m]))
+    rate(hotelbot_vad_frames_total[1m])          # VAD frames/sec (31.25 per live kiosk)
+    hotelbot_db_pool_utilization > 0.8
+    rate(hotelbot_speech_api_hedges_total[5m]) / sum without (result) (rate(hotelbot_speech_api_calls_total[5m]))
+    sum(rate(hotelbot_llm_hedges_total[5m])) / rate(hotelbot_llm_calls_total[5m])   # LLM hedge rate
+"""
+import logging
+import os
+from typing import Callable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+from app.services.tracing_service import Span, TurnTrace, tracer
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; external API calls (ASR/LLM/TTS) take 0.2-5 s, retrieval and tools are faster
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+STAGE_LATENCY = {
+    stage: Histogram(f"hotelbot_{stage}_latency_seconds", description, buckets=LATENCY_BUCKETS)
+    for stage, description in (
+        ("asr", "ASR transcription latency (from end-of-speech wait for speculative ASR)"),
+        ("retrieval", "Menu retrieval (vector search + context formatting) latency"),
+        ("llm", "LLM call latency, per call"),
+        ("tts", "TTS synthesis latency, per sentence"),
+    )
+}
+TOOL_LATENCY = Histogram("hotelbot_tool_latency_seconds", "Tool execution latency", ["tool"], buckets=LATENCY_BUCKETS)
+DB_QUERY_LATENCY = Histogram("hotelbot_db_query_latency_seconds", "Database query latency", ["query"], buckets=DB_BUCKETS)
+TIME_TO_FIRST_AUDIO = Histogram(
+    "hotelbot_time_to_first_audio_seconds",
+    "End-of-speech to first bot audio byte, per turn",
+    buckets=LATENCY_BUCKETS
+)
+
+TURNS = Counter("hotelbot_turns_total", "Conversational turns", ["status"])
+TOOL_CALLS = Counter("hotelbot_tool_calls_total", "Tool calls", ["tool"])
+TOOL_ERRORS = Counter("hotelbot_tool_errors_total", "Tool calls that raised or returned an error", ["tool"])
+LLM_CALLS = Counter("hotelbot_llm_calls_total", "LLM calls")
+LLM_ERRORS = Counter("hotelbot_llm_errors_total", "LLM calls that raised")
+LLM_RETRIES = Counter("hotelbot_llm_retries_total", "LLM calls retried (e.g. without tools after a tool validation error)")
+LLM_PROVIDER_LATENCY = Histogram(
+    "hotelbot_llm_provider_latency_seconds",
+    "Successful LLM call latency per provider (streams: time to first chunk)",
+    ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_PROVIDER_ERRORS = Counter("hotelbot_llm_provider_errors_total", "LLM provider failures (errors and timeouts)", ["provider"])
+LLM_HEDGES = Counter("hotelbot_llm_hedges_total", "LLM requests also sent to this provider because the previous one was slow", ["provider"])
+LLM_FAILOVERS = Counter("hotelbot_llm_failovers_total", "LLM requests sent to this provider after the previous one failed", ["provider"])
+SPEECH_API_CALLS = Counter(
+    "hotelbot_speech_api_calls_total",
+    "Sarvam ASR/TTS calls by result (ok, error, timeout, skipped = turn deadline already passed)",
+    ["service", "result"]
+)
+SPEECH_API_HEDGES = Counter("hotelbot_speech_api_hedges_total", "ASR/TTS calls that sent a hedged (duplicate) request", ["service"])
+SPEECH_API_HEDGE_WINS = Counter("hotelbot_speech_api_hedge_wins_total", "ASR/TTS calls answered by the hedged request", ["service"])
+SPEECH_BACKEND_LATENCY = Histogram(
+    "hotelbot_speech_backend_latency_seconds",
+    "Successful ASR/TTS latency per backend (sarvam vs local)",
+    ["service", "backend"],
+    buckets=LATENCY_BUCKETS
+)
+SPEECH_FALLBACKS = Counter(
+    "hotelbot_speech_fallbacks_total",
+    "ASR/TTS requests served by the fallback backend, by reason (error, timeout, circuit_open)",
+    ["service", "reason"]
+)
+TTS_CACHE_LOOKUPS = Counter("hotelbot_tts_cache_lookups_total", "TTS audio cache lookups", ["result"])
+ORDERS = Counter("hotelbot_orders_total", "Order confirmations", ["result"])
+VAD_FRAMES = Counter("hotelbot_vad_frames_total", "Audio frames run through VAD", ["result"])
+DROPPED_FRAMES = Counter("hotelbot_audio_frames_dropped_total", "Stale audio frames dropped from full queues")
+
+ACTIVE_CONNECTIONS = Gauge("hotelbot_active_connections", "Open audio WebSocket connections")
+DB_POOL_SIZE = Gauge("hotelbot_db_pool_size", "Open database pool connections")
+DB_POOL_IN_USE = Gauge("hotelbot_db_pool_in_use", "Database pool connections checked out")
+DB_POOL_MAX = Gauge("hotelbot_db_pool_max_size", "Database pool maximum size")
+LLM_BREAKER_OPEN = Gauge("hotelbot_llm_circuit_open", "1 while the provider's circuit breaker is open", ["provider"])
+DB_POOL_UTILIZATION = Gauge("hotelbot_db_pool_utilization", "Checked-out connections / pool maximum (0-1)")
+
+
+def observe_span(span: Span):
+    """Span listener: stage histograms and tool/LLM counters."""
+    seconds = span.duration_ms / 1000
+    failed = span.attributes.get("error.type") is not None
+
+    if span.name in STAGE_LATENCY:
+        STAGE_LATENCY[span.name].observe(seconds)
+
+    if span.name == "llm":
+        LLM_CALLS.inc()
+        if failed:
+            LLM_ERRORS.inc()
+        if span.attributes.get("retry"):
+            LLM_RETRIES.inc()
+
+    elif span.name == "tool":
+        tool = span.attributes.get("tool", "unknown")
+        succeeded = not failed and span.attributes.get("tool.success", True)
+        TOOL_LATENCY.labels(tool).observe(seconds)
+        TOOL_CALLS.labels(tool).inc()
+        if not succeeded:
+            TOOL_ERRORS.labels(tool).inc()
+        if tool == "confirm_and_save_order":
+            ORDERS.labels("confirmed" if succeeded else "failed").inc()
+
+
+def observe_turn(trace: TurnTrace):
+    """Turn listener: turn count by status and time to first audio."""
+    TURNS.labels(trace.root.attributes.get("turn.status", "completed")).inc()
+    first_audio_ms = trace.event_offset_ms("first_audio_byte")
+    if first_audio_ms is not None:
+        TIME_TO_FIRST_AUDIO.observe(first_audio_ms / 1000)
+
+
+def observe_db_query(name: str, seconds: float):
+    """Record one database query (called by database_service)."""
+    DB_QUERY_LATENCY.labels(name).observe(seconds)
+
+
+def register_live_gauges(count_connections: Callable[[], int], get_pool: Callable):
+    """
+    Wire the gauges that read live state on every scrape.
+
+    Args:
+        count_connections: Returns the number of open audio connections
+        get_pool: Returns the asyncpg pool (or None before the database is up)
+    """
+    def pool_stat(stat: Callable) -> Callable[[], float]:
+        def read() -> float:
+            pool = get_pool()
+            return stat(pool) if pool is not None else 0
+        return read
+
+    ACTIVE_CONNECTIONS.set_function(count_connections)
+    DB_POOL_SIZE.set_function(pool_stat(lambda pool: pool.get_size()))
+    DB_POOL_IN_USE.set_function(pool_stat(lambda pool: pool.get_size() - pool.get_idle_size()))
+    DB_POOL_MAX.set_function(pool_stat(lambda pool: pool.get_max_size()))
+    DB_POOL_UTILIZATION.set_function(pool_stat(
+        lambda pool: (pool.get_size() - pool.get_idle_size()) / pool.get_max_size()
+    ))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Sum of every worker's metric files
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+tracer.span_listeners.append(observe_span)
+tracer.turn_listeners.append(observe_turn)
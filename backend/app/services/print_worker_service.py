@@ -0,0 +1,402 @@
+"""
+Kitchen printing through an order event outbox.
+
+Order confirmation writes an `order_events` row in the same transaction as the
+order itself and returns as soon as that commits. The PrintWorker drains the
+outbox off the request path: it claims pending events, prints each ticket in a
+worker thread (USB discovery, retries and device resets never block the event
+loop), then marks the event done - or schedules a retry with backoff.
+
+Events that arrive within PRINT_BATCH_WINDOW_MS of each other are printed in
+one printer session, and each order's lines are routed to kitchen stations by
+menu category (KITCHEN_STATIONS). A station that printed is remembered on the
+event, so a retry only reprints the stations that failed.
+
+The worker runs inside the backend by default (PRINT_WORKER=embedded). On a
+deployment where only the host can reach the USB printer, set PRINT_WORKER=off
+and run it there as a separate process:
+
+    python -m app.services.print_worker_service
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+EVENT_ORDER_CONFIRMED = "order_confirmed"
+NOTIFY_CHANNEL = "order_events"
+
+PRINT_WORKER_MODE = os.getenv("PRINT_WORKER", "embedded").lower()
+PRINT_POLL_SECONDS = float(os.getenv("PRINT_POLL_SECONDS", "2"))
+PRINT_MAX_ATTEMPTS = int(os.getenv("PRINT_MAX_ATTEMPTS", "5"))
+PRINT_RETRY_BASE_SECONDS = float(os.getenv("PRINT_RETRY_BASE_SECONDS", "2"))
+# Events stuck in 'processing' this long (worker crashed mid-print) are retried
+PRINT_STALE_SECONDS = int(os.getenv("PRINT_STALE_SECONDS", "120"))
+# Tickets confirmed within this window share one printer session
+PRINT_BATCH_WINDOW_MS = int(os.getenv("PRINT_BATCH_WINDOW_MS", "250"))
+PRINT_BATCH_MAX = int(os.getenv("PRINT_BATCH_MAX", "20"))
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS order_events (
+        event_id BIGSERIAL PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        event_type VARCHAR(50) NOT NULL,
+        payload JSONB NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        processed_at TIMESTAMP,
+        printed_stations TEXT[] NOT NULL DEFAULT '{}'
+    )
+'''
+
+CREATE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_order_events_pending
+    ON order_events(next_attempt_at) WHERE status IN ('pending', 'processing')
+'''
+
+
+async def enqueue_order_event(conn, order_id: int, payload: Dict[str, Any],
+                              event_type: str = EVENT_ORDER_CONFIRMED) -> int:
+    """
+    Add an event to the outbox. Call on the connection that holds the order
+    transaction so the event commits (or rolls back) with the order.
+
+    Args:
+        conn: asyncpg connection inside the order transaction
+        order_id: Order the event belongs to
+        payload: Ticket data (table_number, order_number, items)
+        event_type: Event type
+
+    Returns:
+        event_id of the new outbox row
+    """
+    event_id = await conn.fetchval('''
+        INSERT INTO order_events (order_id, event_type, payload)
+        VALUES ($1, $2, $3::jsonb)
+        RETURNING event_id
+    ''', order_id, event_type, json.dumps(payload, default=str))
+
+    # Delivered on commit - wakes the worker without waiting for the next poll
+    await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, str(event_id))
+    return event_id
+
+
+def _load_json_env(name: str, default):
+    """Read a JSON setting from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        logger.warning(f"Invalid JSON in {name}, using default")
+        return default
+
+
+# Kitchen stations: station -> menu categories it cooks ("*" = everything else),
+# e.g. {"chinese": ["Rice", "Noodles"], "grill": ["*"]}
+KITCHEN_STATIONS: Dict[str, List[str]] = _load_json_env("KITCHEN_STATIONS", {"kitchen": ["*"]})
+# Optional printer per station, e.g. {"chinese": {"backend": "network", "host": "10.0.0.21"}};
+# stations without one share the default printer
+KITCHEN_STATION_PRINTERS: Dict[str, Dict[str, Any]] = _load_json_env("KITCHEN_STATION_PRINTERS", {})
+
+
+def route_items(items: List[Dict[str, Any]], stations: Dict[str, List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split order lines across kitchen stations by menu category.
+
+    Args:
+        items: Order lines (with 'category')
+        stations: Station -> categories ("*" catches everything else)
+
+    Returns:
+        Station -> order lines, in station order
+    """
+    stations = stations or KITCHEN_STATIONS
+    by_category = {
+        category.lower(): station
+        for station, categories in stations.items()
+        for category in categories if category != "*"
+    }
+    fallback = next((s for s, categories in stations.items() if "*" in categories), next(iter(stations)))
+
+    routed: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        station = by_category.get((item.get("category") or "").lower(), fallback)
+        routed.setdefault(station, []).append(item)
+    return routed
+
+
+def _print_station_batch(tickets: List[Dict[str, Any]], station: str) -> Dict[str, Any]:
+    """Print one station's tickets in a single printer session (blocking - runs in a worker thread)."""
+    from printing.print_bill import print_station_tickets
+
+    return print_station_tickets(tickets, station, KITCHEN_STATION_PRINTERS.get(station))
+
+
+class PrintWorker:
+    """Drains the order_events outbox and prints kitchen tickets."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+        self.listen_conn = None
+        self.stats = {"printed": 0, "retried": 0, "failed": 0, "batches": 0, "last_error": None}
+        self.station_stats: Dict[str, Dict[str, Any]] = {}
+
+    async def initialize(self):
+        """Create the outbox table if needed."""
+        if not db_service.pool:
+            raise RuntimeError("Database pool not initialized")
+
+        async with db_service.pool.acquire() as conn:
+            await conn.execute(CREATE_TABLE_SQL)
+            await conn.execute(CREATE_INDEX_SQL)
+            # Outboxes created before station routing
+            await conn.execute(
+                "ALTER TABLE order_events ADD COLUMN IF NOT EXISTS printed_stations TEXT[] NOT NULL DEFAULT '{}'"
+            )
+
+    def start(self):
+        """Start draining the outbox in the background."""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the worker (events in flight are retried by the next worker)."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self):
+        """Worker loop: wait for a notification or the poll interval, then drain."""
+        try:
+            from printing.print_bill import print_station_tickets  # noqa: F401
+        except ImportError as e:
+            # Leave events pending for a worker that can reach the printer
+            logger.warning(f"⚠️ Printer module not available, print worker idle: {e}")
+            return
+
+        await self._listen()
+        logger.info(f"🖨️  Print worker started (stations: {', '.join(KITCHEN_STATIONS)})")
+
+        try:
+            while True:
+                try:
+                    while await self.drain_batch():
+                        pass
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Print worker error: {e}")
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=PRINT_POLL_SECONDS)
+                    # Let orders confirmed at the same moment share one printer session
+                    await asyncio.sleep(PRINT_BATCH_WINDOW_MS / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+        finally:
+            if self.listen_conn is not None:
+                await db_service.pool.release(self.listen_conn)
+                self.listen_conn = None
+
+    async def _listen(self):
+        """LISTEN for new outbox events on a dedicated connection (best effort)."""
+        try:
+            self.listen_conn = await db_service.pool.acquire()
+            await self.listen_conn.add_listener(NOTIFY_CHANNEL, lambda *args: self.wakeup.set())
+        except Exception as e:
+            logger.warning(f"LISTEN {NOTIFY_CHANNEL} failed, polling only: {e}")
+            if self.listen_conn is not None:
+                await db_service.pool.release(self.listen_conn)
+                self.listen_conn = None
+
+    async def drain_batch(self) -> bool:
+        """
+        Claim the due events (up to PRINT_BATCH_MAX), route their lines to
+        kitchen stations and print each station's tickets in one session.
+
+        Returns:
+            True if events were processed (more may be waiting)
+        """
+        async with db_service.pool.acquire() as conn:
+            events = await conn.fetch('''
+                UPDATE order_events
+                SET status = 'processing', attempts = attempts + 1, next_attempt_at = NOW()
+                WHERE event_id IN (
+                    SELECT event_id FROM order_events
+                    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                    OR (status = 'processing' AND next_attempt_at < NOW() - make_interval(secs => $1))
+                    ORDER BY event_id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT $2
+                )
+                RETURNING event_id, order_id, payload, attempts, printed_stations
+            ''', float(PRINT_STALE_SECONDS), PRINT_BATCH_MAX)
+
+        if not events:
+            return False
+
+        events = sorted(events, key=lambda e: e["event_id"])
+        show_station = len(KITCHEN_STATIONS) > 1
+
+        # station -> [(event_id, ticket)], skipping stations that already printed on a previous attempt
+        batches: Dict[str, List[tuple]] = {}
+        needed: Dict[int, set] = {}
+        for event in events:
+            payload = json.loads(event["payload"])
+            routed = route_items(payload["items"])
+            needed[event["event_id"]] = set(routed)
+            for station, items in routed.items():
+                if station in event["printed_stations"]:
+                    continue
+                batches.setdefault(station, []).append((event["event_id"], {
+                    "items": items,
+                    "table_no": payload.get("table_number", "1"),
+                    "order_id": payload.get("order_id", event["order_id"]),
+                    "station": station if show_station else None,
+                }))
+
+        # Stations with separate printers print in parallel
+        stations = list(batches)
+        errors = await asyncio.gather(*(self._print_station(s, batches[s]) for s in stations))
+        station_errors = dict(zip(stations, errors))
+
+        self.stats["batches"] += 1
+        for event in events:
+            printed = set(event["printed_stations"]) | {
+                station for station, entries in batches.items()
+                if station_errors[station] is None and any(eid == event["event_id"] for eid, _ in entries)
+            }
+            missing = needed[event["event_id"]] - printed
+            error = "; ".join(f"{s}: {station_errors[s]}" for s in sorted(missing) if station_errors.get(s)) or None
+            await self._finish(event, sorted(printed), error if missing else None)
+        return True
+
+    async def _print_station(self, station: str, entries: List[tuple]) -> Optional[str]:
+        """Print one station's batch; returns the error or None."""
+        tickets = [ticket for _, ticket in entries]
+        start = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(_print_station_batch, tickets, station)
+            error = None if result and result.get("success") else (result or {}).get("error", "Printer not responding")
+        except Exception as e:
+            error = str(e)
+
+        stats = self.station_stats.setdefault(station, {
+            "tickets": 0, "items": 0, "sessions": 0, "errors": 0,
+            "session_ms_total": 0.0, "recent": deque(maxlen=1000)
+        })
+        stats["sessions"] += 1
+        stats["session_ms_total"] += (time.perf_counter() - start) * 1000
+        if error is None:
+            stats["tickets"] += len(tickets)
+            stats["items"] += sum(item.get("quantity", 1) for ticket in tickets for item in ticket["items"])
+            stats["recent"].extend([time.monotonic()] * len(tickets))
+        else:
+            stats["errors"] += 1
+        return error
+
+    async def _finish(self, event, printed_stations: List[str], error: Optional[str]):
+        """Mark an event done, or schedule a retry / give up."""
+        async with db_service.pool.acquire() as conn:
+            if error is None:
+                await conn.execute('''
+                    UPDATE order_events
+                    SET status = 'done', last_error = NULL, processed_at = NOW(), printed_stations = $2
+                    WHERE event_id = $1
+                ''', event["event_id"], printed_stations)
+                self.stats["printed"] += 1
+                logger.info(f"✅ Kitchen ticket printed for order #{event['order_id']}")
+                return
+
+            self.stats["last_error"] = error
+            if event["attempts"] >= PRINT_MAX_ATTEMPTS:
+                await conn.execute('''
+                    UPDATE order_events
+                    SET status = 'failed', last_error = $2, processed_at = NOW(), printed_stations = $3
+                    WHERE event_id = $1
+                ''', event["event_id"], error, printed_stations)
+                self.stats["failed"] += 1
+                logger.error(f"❌ Giving up printing order #{event['order_id']} after {event['attempts']} attempts: {error}")
+                return
+
+            backoff = PRINT_RETRY_BASE_SECONDS * (2 ** (event["attempts"] - 1))
+            await conn.execute('''
+                UPDATE order_events
+                SET status = 'pending', last_error = $2, printed_stations = $4,
+                    next_attempt_at = NOW() + make_interval(secs => $3)
+                WHERE event_id = $1
+            ''', event["event_id"], error, float(backoff), printed_stations)
+            self.stats["retried"] += 1
+            logger.warning(f"⚠️ Print failed for order #{event['order_id']}, retry in {backoff:.0f}s: {error}")
+
+    def get_station_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-station throughput: tickets, items, sessions, errors, tickets in the last minute."""
+        now = time.monotonic()
+        return {
+            station: {
+                "tickets": s["tickets"],
+                "items": s["items"],
+                "sessions": s["sessions"],
+                "errors": s["errors"],
+                "tickets_per_session": round(s["tickets"] / s["sessions"], 2) if s["sessions"] else 0.0,
+                "avg_session_ms": round(s["session_ms_total"] / s["sessions"], 1) if s["sessions"] else 0.0,
+                "tickets_last_minute": sum(1 for t in s["recent"] if now - t <= 60),
+            }
+            for station, s in self.station_stats.items()
+        }
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Worker counters plus outbox backlog by status."""
+        status = dict(self.stats, running=self.task is not None and not self.task.done())
+        status["stations"] = self.get_station_stats()
+        if status["running"]:
+            from printing.printer_manager import get_all_printer_status
+            status["printers"] = get_all_printer_status()
+        try:
+            async with db_service.pool.acquire() as conn:
+                rows = await conn.fetch('''
+                    SELECT status, COUNT(*) AS count FROM order_events
+                    WHERE status <> 'done'
+                    GROUP BY status
+                ''')
+            status["outbox"] = {row["status"]: row["count"] for row in rows}
+        except Exception as e:
+            status["outbox_error"] = str(e)
+        return status
+
+
+# Global print worker instance
+print_worker = PrintWorker()
+
+
+async def _run_standalone():
+    """Run the print worker as its own process (PRINT_WORKER=off in the backend)."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    await db_service.initialize()
+    await print_worker.initialize()
+    try:
+        await print_worker.run()
+    finally:
+        await db_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_standalone())
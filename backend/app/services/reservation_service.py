@@ -0,0 +1,145 @@
+"""
+Stock reservations (soft holds) for items in a kiosk's cart.
+
+Adding a dish to the cart holds that many portions for the session until the
+order is confirmed, the dish is removed, or the hold expires. Availability
+seen by other tables is stock minus their active holds, so two tables can no
+longer both be promised the last portions and then fail at confirmation.
+
+Holds live in the `reservations` table, one row per (session, dish), so every
+worker sees the same holds. Expired rows are ignored by all queries and purged
+periodically.
+"""
+import logging
+import os
+from typing import Optional
+
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_TTL_SECONDS = int(os.getenv("RESERVATION_TTL_SECONDS", str(10 * 60)))
+
+# Portions held by other sessions; $1 = dish_id, $2 = session_id to exclude
+HELD_BY_OTHERS_SQL = '''
+    SELECT COALESCE(SUM(quantity), 0) FROM reservations
+    WHERE dish_id = $1 AND session_id <> $2 AND expires_at > NOW()
+'''
+
+
+class ReservationService:
+    """Creates, releases and expires per-session stock holds."""
+
+    def __init__(self, ttl_seconds: int = RESERVATION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = False
+
+    async def initialize(self):
+        """Create the reservations table if needed and drop expired holds."""
+        if not db_service.pool:
+            raise RuntimeError("Database pool not initialized")
+
+        async with db_service.pool.acquire() as conn:
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS reservations (
+                    session_id VARCHAR(64) NOT NULL,
+                    dish_id VARCHAR(50) NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (session_id, dish_id)
+                )
+            ''')
+            await conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_reservations_dish ON reservations(dish_id, expires_at)'
+            )
+        await self.purge_expired()
+        self.enabled = True
+        logger.info(f"Stock reservations enabled (hold TTL {self.ttl_seconds}s)")
+
+    async def hold(self, session_id: str, dish_id: str, quantity: int) -> tuple[bool, int]:
+        """
+        Set the session's hold on a dish to `quantity` portions (its cart total).
+
+        The menu row is locked while checking, so concurrent holds on the same
+        dish are serialized and can't over-promise stock.
+
+        Args:
+            session_id: Kiosk session holding the stock
+            dish_id: Dish to hold
+            quantity: Total portions the session wants held
+
+        Returns:
+            Tuple of (held, available) - available is what this session could
+            hold (stock minus other sessions' active holds)
+        """
+        async with db_service.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow('''
+                    SELECT availability_status, quantity FROM menu_items
+                    WHERE dish_id = $1
+                    FOR UPDATE
+                ''', dish_id)
+
+                if not row or row['availability_status'] != 'available':
+                    return False, 0
+
+                held_by_others = await conn.fetchval(HELD_BY_OTHERS_SQL, dish_id, session_id)
+                available = max(row['quantity'] - held_by_others, 0)
+                if quantity > available:
+                    return False, available
+
+                await conn.execute('''
+                    INSERT INTO reservations (session_id, dish_id, quantity, expires_at)
+                    VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))
+                    ON CONFLICT (session_id, dish_id)
+                    DO UPDATE SET quantity = EXCLUDED.quantity, expires_at = EXCLUDED.expires_at
+                ''', session_id, dish_id, quantity, float(self.ttl_seconds))
+
+                # Any cart activity keeps the rest of the session's holds alive
+                await conn.execute('''
+                    UPDATE reservations SET expires_at = NOW() + make_interval(secs => $2)
+                    WHERE session_id = $1 AND expires_at > NOW()
+                ''', session_id, float(self.ttl_seconds))
+
+                return True, available
+
+    async def release(self, session_id: str, dish_id: Optional[str] = None, conn=None):
+        """
+        Drop a session's hold on one dish, or all its holds.
+
+        Args:
+            session_id: Kiosk session
+            dish_id: Dish to release (None releases everything)
+            conn: Connection to run on (e.g. inside the confirmation transaction)
+        """
+        if conn is None:
+            async with db_service.pool.acquire() as conn:
+                await self.release(session_id, dish_id, conn)
+            return
+
+        if dish_id is None:
+            await conn.execute("DELETE FROM reservations WHERE session_id = $1", session_id)
+        else:
+            await conn.execute(
+                "DELETE FROM reservations WHERE session_id = $1 AND dish_id = $2",
+                session_id, dish_id
+            )
+
+    async def purge_expired(self) -> int:
+        """
+        Delete expired holds.
+
+        Returns:
+            Number of holds removed
+        """
+        async with db_service.pool.acquire() as conn:
+            result = await conn.execute("DELETE FROM reservations WHERE expires_at <= NOW()")
+
+        purged = int(result.split()[-1]) if result else 0
+        if purged:
+            logger.info(f"Expired {purged} stock reservation(s)")
+        return purged
+
+
+# Global reservation service instance
+reservation_service = ReservationService()
@@ -0,0 +1,207 @@
+"""
+Session store for per-table conversation state.
+
+The durable part of a client's state (cart, conversation history, order count,
+completed orders, language) is kept here rather than only in the process-local
+`connections` dict, so a reconnecting kiosk resumes its cart and several
+uvicorn workers / nodes can serve the same restaurant.
+
+Backends:
+- memory: process-local dict (single worker, lost on restart)
+- postgres: `sessions` table in the existing PostgreSQL database (shared)
+
+Selected with SESSION_STORE=memory|postgres (default: memory).
+"""
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+# client_state keys that survive a reconnect / worker change
+SESSION_FIELDS = (
+    "language",
+    "conversation_history",
+    "current_order",
+    "asr_active",
+    "order_status",
+    "order_count",
+    "completed_orders",
+)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(6 * 60 * 60)))
+
+# How often the in-memory store sweeps out expired sessions (on save)
+SESSION_PURGE_INTERVAL_SECONDS = 60
+
+
+def snapshot_session(client_state: dict) -> Dict[str, Any]:
+    """
+    Extract the persistable part of a client state.
+
+    Args:
+        client_state: Live per-connection state
+
+    Returns:
+        JSON-serializable session dict
+    """
+    return {key: client_state[key] for key in SESSION_FIELDS if key in client_state}
+
+
+class SessionStore(ABC):
+    """Base session store interface."""
+
+    async def initialize(self):
+        """Prepare the backend (create tables, etc.)."""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a session.
+
+        Args:
+            session_id: Client session identifier
+
+        Returns:
+            Session dict or None if unknown / expired
+        """
+
+    @abstractmethod
+    async def save(self, session_id: str, client_state: dict):
+        """
+        Persist the durable fields of a client state.
+
+        Args:
+            session_id: Client session identifier
+            client_state: Live per-connection state
+        """
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        """Forget a session."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store (single worker only)."""
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, tuple] = {}
+        self._last_purge = time.time()
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+
+        saved_at, data = entry
+        if time.time() - saved_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+
+        # Round-trip through JSON so callers never share mutable state with the store
+        return json.loads(data)
+
+    async def save(self, session_id: str, client_state: dict):
+        now = time.time()
+        self._sessions[session_id] = (now, json.dumps(snapshot_session(client_state), default=str))
+        # Every kiosk tab gets a new session id, so expired ones are never loaded again
+        if now - self._last_purge >= SESSION_PURGE_INTERVAL_SECONDS:
+            self.purge_expired(now)
+
+    def purge_expired(self, now: float = None) -> int:
+        """
+        Drop sessions idle for longer than the TTL.
+
+        Args:
+            now: Current time.time() (default: now)
+
+        Returns:
+            Number of sessions removed
+        """
+        now = now or time.time()
+        self._last_purge = now
+        expired = [sid for sid, (saved_at, _) in self._sessions.items() if now - saved_at > self.ttl_seconds]
+        for sid in expired:
+            del self._sessions[sid]
+        if expired:
+            logger.info(f"Purged {len(expired)} expired sessions")
+        return len(expired)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+
+class PostgresSessionStore(SessionStore):
+    """Session store backed by a `sessions` table, shared by all workers/nodes."""
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    async def initialize(self):
+        if not db_service.pool:
+            raise RuntimeError("Database pool not initialized")
+
+        async with db_service.pool.acquire() as conn:
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id VARCHAR(64) PRIMARY KEY,
+                    state JSONB NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            deleted = await conn.execute(
+                "DELETE FROM sessions WHERE updated_at < NOW() - make_interval(secs => $1)",
+                float(self.ttl_seconds)
+            )
+        logger.info(f"PostgreSQL session store ready ({deleted})")
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        async with db_service.pool.acquire() as conn:
+            state = await conn.fetchval('''
+                SELECT state FROM sessions
+                WHERE session_id = $1
+                AND updated_at >= NOW() - make_interval(secs => $2)
+            ''', session_id, float(self.ttl_seconds))
+
+        return json.loads(state) if state else None
+
+    async def save(self, session_id: str, client_state: dict):
+        async with db_service.pool.acquire() as conn:
+            await conn.execute('''
+                INSERT INTO sessions (session_id, state, updated_at)
+                VALUES ($1, $2::jsonb, NOW())
+                ON CONFLICT (session_id)
+                DO UPDATE SET state = EXCLUDED.state, updated_at = NOW()
+            ''', session_id, json.dumps(snapshot_session(client_state), default=str))
+
+    async def delete(self, session_id: str):
+        async with db_service.pool.acquire() as conn:
+            await conn.execute("DELETE FROM sessions WHERE session_id = $1", session_id)
+
+
+def create_session_store(backend: str = None) -> SessionStore:
+    """
+    Create the configured session store.
+
+    Args:
+        backend: "memory" or "postgres" (default: SESSION_STORE env var, else memory)
+
+    Returns:
+        SessionStore instance
+    """
+    backend = (backend or os.getenv("SESSION_STORE", "memory")).lower()
+
+    if backend == "postgres":
+        logger.info("Using PostgreSQL session store")
+        return PostgresSessionStore()
+
+    if backend != "memory":
+        logger.warning(f"Unknown SESSION_STORE '{backend}', using in-memory store")
+    logger.info("Using in-memory session store (single worker only)")
+    return InMemorySessionStore()
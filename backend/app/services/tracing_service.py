@@ -0,0 +1,289 @@
+"""
+Per-turn latency tracing for the audio WebSocket.
+
+Every conversational turn gets a trace, keyed by client id and turn id, that
+starts at end-of-speech and records:
+- spans: ASR, retrieval, each LLM call, each tool call, each TTS synthesis
+- events: end_of_speech, asr_done, first_audio_byte, last_audio_byte
+
+Finished turns are logged as one summary line and, when TRACE_FILE is set,
+exported as JSON lines in the OpenTelemetry span layout (trace_id, span_id,
+parent_span_id, start/end unix nanos, attributes, events), so the file can be
+loaded by an OTLP/JSON collector or analysed with jq/pandas.
+
+Listeners (tracer.span_listeners / tracer.turn_listeners) see every finished
+span and turn; the Prometheus metrics are fed this way, so they keep working
+with TRACING_ENABLED=false (which only turns off the log line and export).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# JSON-lines export file (empty = summary log line only)
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+SERVICE_NAME = "hotel-order-bot"
+
+# Span status (OpenTelemetry status codes)
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+STATUS_UNSET = "STATUS_CODE_UNSET"
+
+
+def _new_id(num_bytes: int) -> str:
+    return os.urandom(num_bytes).hex()
+
+
+class Span:
+    """One timed operation inside a turn."""
+
+    def __init__(self, trace: "TurnTrace", name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.events: List[dict] = []
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        """Close the span (idempotent)."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.attributes["error.type"] = type(error).__name__
+        elif self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        if self.parent_id is not None:
+            tracer.notify(tracer.span_listeners, self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id or "",
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns or self.start_ns,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class TurnTrace:
+    """
+    Trace of one conversational turn.
+
+    The root "turn" span opens at end-of-speech and closes when the turn task
+    finishes (or is cancelled by barge-in). Child spans and events can be added
+    from any coroutine of the turn through client_state["trace"].
+    """
+
+    def __init__(self, client_id, turn_id: int, **attributes):
+        self.trace_id = _new_id(16)
+        self.client_id = str(client_id)
+        self.turn_id = turn_id
+        self.spans: List[Span] = []
+        self.finished = False
+        self.root = Span(self, "turn", None, {"client.id": self.client_id, "turn.id": turn_id, **attributes})
+        self.event("end_of_speech")
+
+    def event(self, name: str, once: bool = False, **attributes):
+        """
+        Record a point in time on the root span.
+
+        Args:
+            name: Event name (e.g. "asr_done", "first_audio_byte")
+            once: Keep only the first occurrence (later calls are ignored)
+            **attributes: Extra event attributes
+        """
+        if self.finished:
+            return
+        if once and any(e["name"] == name for e in self.root.events):
+            return
+        self.root.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    def set_event(self, name: str, **attributes):
+        """Record an event, replacing any earlier one with the same name (e.g. last_audio_byte)."""
+        if self.finished:
+            return
+        self.root.events = [e for e in self.root.events if e["name"] != name]
+        self.event(name, **attributes)
+
+    def event_offset_ms(self, name: str) -> Optional[float]:
+        """Milliseconds from end-of-speech to an event (None if it didn't happen)."""
+        for e in self.root.events:
+            if e["name"] == name:
+                return round((e["time_unix_nano"] - self.root.start_ns) / 1e6, 1)
+        return None
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """Open a child span of the turn; the caller must end() it."""
+        span = Span(self, name, self.root.span_id, attributes)
+        if not self.finished:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child span; exceptions (incl. cancellation) mark it as an error."""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        span.end()
+
+    def finish(self, status: str = "completed"):
+        """Close the turn and export it. Safe to call more than once."""
+        if self.finished:
+            return
+        self.root.set_attribute("turn.status", status)
+        for span in self.spans:
+            span.end()
+        self.root.end()
+        if status == "error":
+            self.root.status = STATUS_ERROR
+        self.finished = True
+        tracer.notify(tracer.turn_listeners, self)
+        tracer.export(self)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Per-stage totals in milliseconds (what the log line and /health show)."""
+        totals: Dict[str, float] = {}
+        counts: Dict[str, int] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+            counts[span.name] = counts.get(span.name, 0) + 1
+
+        summary = {f"{name}_ms": round(total, 1) for name, total in totals.items()}
+        summary.update({f"{name}_calls": count for name, count in counts.items() if count > 1})
+        summary["asr_done_ms"] = self.event_offset_ms("asr_done")
+        summary["first_audio_ms"] = self.event_offset_ms("first_audio_byte")
+        summary["last_audio_ms"] = self.event_offset_ms("last_audio_byte")
+        summary["total_ms"] = round(self.root.duration_ms, 1)
+        return summary
+
+
+class _NullSpan:
+    """Span stand-in used outside a turn."""
+
+    duration_ms = 0.0
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+
+class _NullTrace:
+    """No-op trace for audio sent outside a turn, so call sites never check for None."""
+
+    finished = True
+    _span = _NullSpan()
+
+    def event(self, name, once=False, **attributes):
+        pass
+
+    def set_event(self, name, **attributes):
+        pass
+
+    def start_span(self, name, **attributes):
+        return self._span
+
+    @contextmanager
+    def span(self, name, **attributes):
+        yield self._span
+
+    def finish(self, status="completed"):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """Creates turn traces and writes finished ones to the log / TRACE_FILE."""
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, trace_file: str = TRACE_FILE):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.span_listeners: List[Callable[[Span], None]] = []
+        self.turn_listeners: List[Callable[[TurnTrace], None]] = []
+        self._lock = threading.Lock()
+        self.turns_traced = 0
+        self.export_errors = 0
+        self.last_summary: Optional[dict] = None
+
+    def start_turn(self, client_id, turn_id: int, **attributes) -> TurnTrace:
+        """Start the trace for a turn at end-of-speech."""
+        return TurnTrace(client_id, turn_id, **attributes)
+
+    def notify(self, listeners: list, item):
+        """Call listeners; a failing listener never breaks the turn."""
+        for listener in listeners:
+            try:
+                listener(item)
+            except Exception as e:
+                logger.error(f"Trace listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    def export(self, trace: TurnTrace):
+        """Log the turn summary and append its spans to TRACE_FILE."""
+        if not self.enabled:
+            return
+
+        summary = trace.summary()
+        self.turns_traced += 1
+        self.last_summary = {"client_id": trace.client_id, "turn_id": trace.turn_id, **summary}
+
+        stages = ", ".join(f"{k[:-3]} {v:.0f}ms" for k, v in summary.items() if k.endswith("_ms") and v is not None)
+        logger.info(f"⏱️ Client {trace.client_id} turn {trace.turn_id} ({trace.root.attributes.get('turn.status')}): {stages}")
+
+        if not self.trace_file:
+            return
+
+        lines = [json.dumps(span.to_dict(), ensure_ascii=False) for span in [trace.root] + trace.spans]
+        try:
+            with self._lock, open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            self.export_errors += 1
+            logger.error(f"Failed to write trace file {self.trace_file}: {e}")
+
+    def get_stats(self) -> dict:
+        """Tracing counters and the most recent turn summary (for /health)."""
+        return {
+            "enabled": self.enabled,
+            "trace_file": self.trace_file or None,
+            "turns_traced": self.turns_traced,
+            "export_errors": self.export_errors,
+            "last_turn": self.last_summary,
+        }
+
+
+# Global instance
+tracer = Tracer()
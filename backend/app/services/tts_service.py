@@ -1,38 +1,235 @@
 """
-TTS Service for converting text to speech using Sarvam AI SDK
+TTS Service for converting text to speech using Sarvam AI SDK, with an
+optional local CPU engine (Piper / VITS voice) and an on-disk audio cache.
+
+TTS_BACKEND picks the primary engine ("sarvam" or "local") and TTS_FALLBACK
+the one used when the primary fails, times out, or has failed repeatedly
+(circuit open - the primary is retried after a cooldown). Short phrases (up
+to TTS_LOCAL_MAX_CHARS) can be sent to the local engine first. The local
+engine needs piper-tts (requirements-local-tts.txt) and a Piper voice
+(LOCAL_TTS_VOICE, .onnx with its .onnx.json); without them the service runs
+without a fallback.
+
+Every synthesized clip is cached on disk by engine/voice/language/text
+(audio_cache_service), so repeated phrases never hit the network again.
 """
+import asyncio
+import base64
+import io
 import logging
+import math
 import os
+import threading
+import time
+import wave
+from pathlib import Path
 from typing import Optional
-from sarvamai import SarvamAI
+
+from sarvamai import AsyncSarvamAI
+
+from app.services.audio_cache_service import AudioCache
+from app.services.hedging_service import (
+    CircuitBreaker,
+    DeadlineExceeded,
+    DeadlinePassed,
+    HedgedCaller,
+    is_client_error,
+    time_left,
+)
+from app.services.metrics_service import SPEECH_BACKEND_LATENCY, SPEECH_FALLBACKS, TTS_CACHE_LOOKUPS
 
 logger = logging.getLogger(__name__)
 
+TTS_BACKEND = os.getenv("TTS_BACKEND", "sarvam").lower()
+TTS_FALLBACK = os.getenv("TTS_FALLBACK", "local").lower()  # "none" disables
+
+# Phrases up to this many characters go to the local engine first (0 = off)
+TTS_LOCAL_MAX_CHARS = int(os.getenv("TTS_LOCAL_MAX_CHARS", "0"))
+
+# Primary taken out of use after this many consecutive failures, retried after the cooldown
+TTS_BREAKER_FAILURES = int(os.getenv("TTS_BREAKER_FAILURES", "3"))
+TTS_BREAKER_COOLDOWN_S = float(os.getenv("TTS_BREAKER_COOLDOWN_S", "30"))
+
+# Piper voice (.onnx; its config is read from <voice>.onnx.json)
+LOCAL_TTS_VOICE = os.getenv("LOCAL_TTS_VOICE", "")
+LOCAL_TTS_SPEAKER_ID = os.getenv("LOCAL_TTS_SPEAKER_ID")  # Multi-speaker voices only
+LOCAL_TTS_LENGTH_SCALE = float(os.getenv("LOCAL_TTS_LENGTH_SCALE", "1.0"))  # > 1 = slower speech
+
+SARVAM_TTS_MODEL = "bulbul:v2"
+
+
+class SarvamTTSBackend:
+    """Sarvam bulbul:v2 over HTTP, with deadlines and hedging."""
+
+    name = "sarvam"
 
-class TTSService:
     def __init__(self, api_key: str = None):
+        if api_key is None:
+            api_key = os.getenv("SARVAM_API_KEY")
+            if not api_key:
+                raise ValueError("SARVAM_API_KEY environment variable not set")
+
+        self.client = AsyncSarvamAI(api_subscription_key=api_key)
+        # Deadline + hedging (TTS_TIMEOUT_S, TTS_HEDGING_ENABLED, TTS_HEDGE_*_MS)
+        self.caller = HedgedCaller("tts", timeout_s=8.0, hedge_min_ms=500, hedge_max_ms=3000, hedge_default_ms=1500)
+
+    def voice(self, speaker: str) -> str:
+        """Voice identity for the cache key."""
+        return f"{SARVAM_TTS_MODEL}/{speaker}"
+
+    async def synthesize(self, text: str, language: str, speaker: str, deadline: Optional[float] = None) -> Optional[bytes]:
+        # Use Sarvam AI SDK for TTS - correct method is 'convert'
+        # Async client: a barge-in or a lost hedge race cancels the HTTP request itself
+        response = await self.caller.call(
+            lambda timeout: self.client.text_to_speech.convert(
+                text=text,  # Single text string (not a list)
+                target_language_code=language,
+                speaker=speaker,
+                model=SARVAM_TTS_MODEL,
+                enable_preprocessing=True,
+                request_options={"timeout_in_seconds": max(1, math.ceil(timeout)), "max_retries": 0}
+            ),
+            deadline
+        )
+
+        # The response contains base64 encoded audio in audios array
+        if hasattr(response, 'audios') and response.audios and len(response.audios) > 0:
+            return base64.b64decode(response.audios[0])
+        logger.warning("No audio data in response")
+        return None
+
+    def get_stats(self) -> dict:
+        return self.caller.get_stats()
+
+
+class LocalTTSBackend:
+    """Piper (VITS on ONNX Runtime) voice on the CPU; works without internet."""
+
+    name = "local"
+
+    def __init__(self, voice_path: str = LOCAL_TTS_VOICE):
+        if not voice_path:
+            raise ValueError("LOCAL_TTS_VOICE not set")
+        from piper.voice import PiperVoice
+
+        logger.info(f"Loading local TTS voice {voice_path}...")
+        self.piper = PiperVoice.load(voice_path)
+        self.voice_name = Path(voice_path).stem
+        self.speaker_id = int(LOCAL_TTS_SPEAKER_ID) if LOCAL_TTS_SPEAKER_ID else None
+        # One synthesis at a time - a second one would only halve the speed of both
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.abandoned = 0
+
+    def voice(self, speaker: str) -> str:
+        """Voice identity for the cache key (Sarvam speaker names don't apply)."""
+        return f"piper/{self.voice_name}/{self.speaker_id}/{LOCAL_TTS_LENGTH_SCALE}"
+
+    def _synthesize_sync(self, text: str) -> bytes:
+        wav_buffer = io.BytesIO()
+        with self._lock, wave.open(wav_buffer, 'wb') as wav_file:
+            self.piper.synthesize(text, wav_file, speaker_id=self.speaker_id, length_scale=LOCAL_TTS_LENGTH_SCALE)
+        return wav_buffer.getvalue()
+
+    async def synthesize(self, text: str, language: str, speaker: str, deadline: Optional[float] = None) -> Optional[bytes]:
+        remaining = time_left(deadline)
+        if remaining is not None and remaining <= 0:
+            raise DeadlinePassed("local tts: turn deadline already passed")
+
+        self.calls += 1
+        try:
+            # The synthesis thread can't be interrupted; past the deadline its result is dropped
+            return await asyncio.wait_for(asyncio.to_thread(self._synthesize_sync, text), remaining)
+        except asyncio.TimeoutError:
+            self.abandoned += 1
+            raise DeadlineExceeded(f"local tts: no audio within {remaining:.1f}s")
+
+    def get_stats(self) -> dict:
+        return {"voice": self.voice_name, "calls": self.calls, "abandoned": self.abandoned}
+
+
+def create_tts_backend(name: str, api_key: str = None):
+    """Create a TTS backend by name ("sarvam" or "local")."""
+    if name == "sarvam":
+        return SarvamTTSBackend(api_key=api_key)
+    if name == "local":
+        return LocalTTSBackend()
+    raise ValueError(f"Unknown TTS backend '{name}'")
+
+
+class TTSService:
+    def __init__(self, api_key: str = None, backend: str = TTS_BACKEND, fallback: str = TTS_FALLBACK,
+                 cache: AudioCache = None):
         """
-        Initialize TTS service with Sarvam AI SDK
+        Initialize TTS service with its primary backend, optional fallback and audio cache
 
         Args:
             api_key: Sarvam AI API key
+            backend: Primary backend ("sarvam" or "local")
+            fallback: Fallback backend ("local", "sarvam" or "none")
+            cache: Audio cache (default: TTS_CACHE_DIR)
         """
-        if api_key is None:
-            api_key = os.getenv("SARVAM_API_KEY")
-            if not api_key:
-                raise ValueError("SARVAM_API_KEY environment variable not set")
+        self.primary = create_tts_backend(backend, api_key)
 
-        self.client = SarvamAI(api_subscription_key=api_key)
-        logger.info("TTS service initialized with Sarvam AI SDK")
+        self.fallback = None
+        if fallback not in ("", "none", backend):
+            try:
+                self.fallback = create_tts_backend(fallback, api_key)
+            except Exception as e:
+                logger.warning(f"TTS fallback '{fallback}' not available, running without it: {e}")
 
-    async def synthesize(self, text: str, language: str = "ta-IN", speaker: str = "anushka") -> Optional[bytes]:
+        self.cache = cache if cache is not None else AudioCache()
+        self.breaker = CircuitBreaker(TTS_BREAKER_FAILURES, TTS_BREAKER_COOLDOWN_S)
+        self.fallback_uses = 0
+        logger.info(f"TTS service initialized: {self.primary.name}"
+                    + (f" (fallback: {self.fallback.name})" if self.fallback else ""))
+
+    def _local_backend(self):
+        for backend in (self.primary, self.fallback):
+            if isinstance(backend, LocalTTSBackend):
+                return backend
+        return None
+
+    async def _cached(self, backend, text: str, language: str, speaker: str) -> Optional[bytes]:
+        """Audio the backend produced for this text before, if still cached."""
+        audio = await self.cache.get(AudioCache.key(backend.name, backend.voice(speaker), language, text))
+        if audio is not None:
+            TTS_CACHE_LOOKUPS.labels("hit").inc()
+            logger.info(f"TTS cache hit ({backend.name}): {len(audio)} bytes")
+        elif self.cache.enabled:
+            TTS_CACHE_LOOKUPS.labels("miss").inc()
+        return audio
+
+    async def _run(self, backend, text: str, language: str, speaker: str, deadline: Optional[float]) -> Optional[bytes]:
+        """Cached audio, or synthesize with the backend and cache the result."""
+        audio = await self._cached(backend, text, language, speaker)
+        if audio is not None:
+            return audio
+
+        key = AudioCache.key(backend.name, backend.voice(speaker), language, text)
+        start = time.perf_counter()
+        audio = await backend.synthesize(text, language, speaker, deadline)
+        if audio:
+            SPEECH_BACKEND_LATENCY.labels("tts", backend.name).observe(time.perf_counter() - start)
+            logger.info(f"Successfully synthesized {len(audio)} bytes of audio ({backend.name})")
+            await self.cache.put(key, audio)
+        return audio
+
+    async def synthesize(
+        self,
+        text: str,
+        language: str = "ta-IN",
+        speaker: str = "anushka",
+        deadline: Optional[float] = None
+    ) -> Optional[bytes]:
         """
-        Synthesize speech from text using Sarvam AI SDK
+        Synthesize speech from text (cache, then primary backend, fallback on failure)
 
         Args:
             text: Text to convert to speech (max 1500 characters)
             language: Language code (default: ta-IN for Tamil)
             speaker: Speaker voice (default: anushka) - Options: anushka, manisha, vidya, arya, abhilash, karun, hitesh
+            deadline: Turn deadline (time.monotonic() timestamp); the request is cut off there
 
         Returns:
             Complete audio bytes or None if failed
@@ -41,38 +238,74 @@ class TTSService:
             logger.warning("Empty text provided for TTS")
             return None
 
-        try:
-            logger.info(f"Synthesizing text: '{text[:100]}...' (length: {len(text)})")
+        logger.info(f"Synthesizing text: '{text[:100]}...' (length: {len(text)})")
 
-            # Use Sarvam AI SDK for TTS - correct method is 'convert'
-            response = self.client.text_to_speech.convert(
-                text=text,  # Single text string (not a list)
-                target_language_code=language,
-                speaker=speaker,
-                model="bulbul:v2",
-                enable_preprocessing=True
-            )
-
-            # The response contains base64 encoded audio in audios array
-            if hasattr(response, 'audios') and response.audios and len(response.audios) > 0:
-                audio_base64 = response.audios[0]
-
-                # Decode base64 to bytes
-                import base64
-                audio_data = base64.b64decode(audio_base64)
-
-                logger.info(f"Successfully synthesized {len(audio_data)} bytes of audio")
-                return audio_data
-            else:
-                logger.warning("No audio data in response")
+        # Short fixed phrases: local engine first, no network round trip
+        local = self._local_backend()
+        if local is not None and len(text) <= TTS_LOCAL_MAX_CHARS:
+            try:
+                audio = await self._run(local, text, language, speaker, deadline)
+                if audio:
+                    return audio
+            except Exception as e:
+                logger.warning(f"Local TTS failed for short phrase, using {self.primary.name}: {e}")
+
+        if self.fallback is None or self.breaker.available():
+            self.breaker.on_attempt()
+            try:
+                audio = await self._run(self.primary, text, language, speaker, deadline)
+                self.breaker.on_success()
+                return audio
+            except asyncio.CancelledError:
+                self.breaker.on_cancel()
+                raise
+            except DeadlinePassed as e:
+                # Nothing was sent, so the backend isn't at fault - and no time is left for a fallback
+                self.breaker.on_cancel()
+                logger.warning(f"TTS skipped: {e}")
+                return None
+            except DeadlineExceeded as e:
+                logger.error(f"TTS synthesis timed out: {e}")
+                reason = "timeout"
+                if self.breaker.on_failure():
+                    logger.error(f"🔌 TTS backend {self.primary.name} taken out of use for {TTS_BREAKER_COOLDOWN_S:.0f}s")
+            except Exception as e:
+                logger.error(f"TTS synthesis failed: {e}")
+                reason = "error"
+                if is_client_error(e):
+                    self.breaker.on_success()
+                elif self.breaker.on_failure():
+                    logger.error(f"🔌 TTS backend {self.primary.name} taken out of use for {TTS_BREAKER_COOLDOWN_S:.0f}s")
+            if self.fallback is None:
                 return None
+        else:
+            # Primary skipped - its voice is still preferred if the phrase is cached
+            audio = await self._cached(self.primary, text, language, speaker)
+            if audio is not None:
+                return audio
+            reason = "circuit_open"
 
+        self.fallback_uses += 1
+        SPEECH_FALLBACKS.labels("tts", reason).inc()
+        logger.warning(f"🔁 TTS falling back to {self.fallback.name} ({reason})")
+        try:
+            return await self._run(self.fallback, text, language, speaker, deadline)
         except Exception as e:
-            logger.error(f"TTS synthesis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"TTS fallback {self.fallback.name} failed: {e}")
             return None
 
+    def get_stats(self) -> dict:
+        """Backends, primary health, fallback use and cache (for /health)."""
+        return {
+            "backend": self.primary.name,
+            "fallback": self.fallback.name if self.fallback else None,
+            "primary_state": self.breaker.state,
+            "fallback_uses": self.fallback_uses,
+            "cache": self.cache.get_stats(),
+            self.primary.name: self.primary.get_stats(),
+            **({self.fallback.name: self.fallback.get_stats()} if self.fallback else {}),
+        }
+
     async def close(self):
         """Clean up resources"""
         pass
@@ -96,4 +329,4 @@ def init_tts_service(api_key: str = None):
 
 def get_tts_service() -> Optional[TTSService]:
     """Get the global TTS service instance"""
-    return tts_service
\ No newline at end of file
+    return tts_service
@@ -0,0 +1,76 @@
+"""
+Silero VAD on ONNX Runtime + NumPy (no PyTorch).
+
+The Silero model is recurrent: each 512-sample frame is scored together with
+the last 64 samples of the previous frame and a hidden state. That state is
+per audio stream, so every connection gets its own VADState while all of
+them share one InferenceSession (ONNX Runtime sessions are safe to run
+concurrently).
+"""
+import logging
+
+import numpy as np
+import onnxruntime
+
+logger = logging.getLogger(__name__)
+
+# Samples of the previous frame prepended to each frame (Silero v5)
+CONTEXT_SAMPLES = {16000: 64, 8000: 32}
+FRAME_SAMPLES = {16000: 512, 8000: 256}
+
+
+class VADState:
+    """Recurrent state of one audio stream."""
+
+    def __init__(self, context_samples: int):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros(context_samples, dtype=np.float32)
+
+    def reset(self):
+        self.state[:] = 0.0
+        self.context[:] = 0.0
+
+
+class SileroVAD:
+    """Silero VAD ONNX model scored frame by frame."""
+
+    def __init__(self, model_path: str, sample_rate: int = 16000):
+        """
+        Args:
+            model_path: Path to silero_vad.onnx
+            sample_rate: 16000 or 8000
+        """
+        if sample_rate not in FRAME_SAMPLES:
+            raise ValueError(f"Silero VAD supports 8000 or 16000 Hz, not {sample_rate}")
+
+        options = onnxruntime.SessionOptions()
+        options.inter_op_num_threads = 1
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.sample_rate = sample_rate
+        self.frame_samples = FRAME_SAMPLES[sample_rate]
+        self.context_samples = CONTEXT_SAMPLES[sample_rate]
+        self._sr = np.array(sample_rate, dtype=np.int64)
+
+    def new_state(self) -> VADState:
+        """Fresh state for a new audio stream."""
+        return VADState(self.context_samples)
+
+    def speech_probability(self, frame: np.ndarray, vad_state: VADState) -> float:
+        """
+        Score one frame and advance the stream state.
+
+        Args:
+            frame: float32 samples in [-1, 1], exactly frame_samples long
+            vad_state: State of the stream the frame belongs to
+
+        Returns:
+            Speech probability (0-1)
+        """
+        if frame.shape[-1] != self.frame_samples:
+            raise ValueError(f"Expected {self.frame_samples} samples, got {frame.shape[-1]}")
+
+        x = np.concatenate((vad_state.context, frame.astype(np.float32, copy=False)))[np.newaxis, :]
+        output, vad_state.state = self.session.run(None, {'input': x, 'state': vad_state.state, 'sr': self._sr})
+        vad_state.context = x[0, -self.context_samples:]
+        return float(output[0, 0])
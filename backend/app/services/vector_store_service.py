@@ -1,5 +1,6 @@
 """Vector store service for menu retrieval using Qdrant."""
 
+import hashlib
 import json
 import uuid
 import logging
@@ -13,15 +14,9 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
-    MatchAny
+    MatchAny,
+    PointIdsList
 )
-try:
-    # Using sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 for multilingual embeddings (384d)
-    from sentence_transformers import SentenceTransformer
-except Exception:
-    # If sentence_transformers isn't present or fails, defer import error until runtime
-    SentenceTransformer = None
-
 from app.services.database_service import db_service
 
 logger = logging.getLogger(__name__)
@@ -47,6 +42,21 @@ def get_meal_period(hour: int) -> str:
         return "All-Day"
 
 
+def embedding_text(item) -> str:
+    """Text a dish is embedded from."""
+    return f"{item['category']}: {item['name']}. {item['description']}"
+
+
+def embedding_hash(text: str) -> str:
+    """Hash of the embedding text, stored in the payload to skip re-embedding unchanged dishes."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def point_id(dish_id: str) -> str:
+    """Stable Qdrant point ID of a dish."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, dish_id))
+
+
 class VectorStoreService:
     """Service for managing menu items in Qdrant vector database."""
 
@@ -114,34 +124,7 @@ class VectorStoreService:
             # Create embeddings and points
             points = []
             for item in menu_items:
-                # Create embedding text
-                embedding_text = f"{item['category']}: {item['name']}. {item['description']}"
-                emb = self.embedding_model.encode(embedding_text)
-                # Ensure we convert numpy arrays to Python lists for Qdrant
-                try:
-                    embedding = emb.tolist()
-                except Exception:
-                    embedding = list(emb)
-
-                # Create point
-                point_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, item["dish_id"]))
-                point = PointStruct(
-                    id=point_uuid,
-                    vector=embedding,
-                    payload={
-                        "dish_id": item["dish_id"],
-                        "name": item["name"],
-                        "description": item["description"],
-                        "category": item["category"],
-                        "meal_period": item.get("meal_period", "All-Day"),
-                        "price": float(item["price"]),
-                        "popularity_score": item.get("popularity_score", 5),
-                        "dietary_tags": item.get("dietary_tags", []),
-                        "availability_status": item.get("availability_status", "available"),
-                        "quantity": item.get("quantity", 0)  # Include quantity from DB
-                    }
-                )
-                points.append(point)
+                points.append(self._build_point(item, self._embed(embedding_text(item))))
 
             # Upsert points
             self.client.upsert(collection_name=self.collection_name, points=points)
@@ -151,6 +134,56 @@ class VectorStoreService:
             logger.error(f"Error initializing Qdrant collection: {e}")
             raise
 
+    def _embed(self, text: str) -> List[float]:
+        emb = self.embedding_model.encode(text)
+        # Ensure we convert numpy arrays to Python lists for Qdrant
+        try:
+            return emb.tolist()
+        except Exception:
+            return list(emb)
+
+    def _build_point(self, item, embedding: List[float]) -> PointStruct:
+        """Qdrant point for a menu item row."""
+        return PointStruct(
+            id=point_id(item["dish_id"]),
+            vector=embedding,
+            payload={
+                "dish_id": item["dish_id"],
+                "name": item["name"],
+                "description": item["description"],
+                "category": item["category"],
+                "meal_period": item.get("meal_period", "All-Day"),
+                "price": float(item["price"]),
+                "popularity_score": item.get("popularity_score", 5),
+                "dietary_tags": item.get("dietary_tags", []),
+                "availability_status": item.get("availability_status", "available"),
+                "quantity": item.get("quantity", 0),  # Include quantity from DB
+                "embedding_hash": embedding_hash(embedding_text(item))
+            }
+        )
+
+    async def ensure_collection(self):
+        """
+        Reuse the existing collection on restart instead of re-embedding the
+        whole menu: if it exists with the model's vector size, only sync it
+        from PostgreSQL (which embeds only new or edited dishes); otherwise
+        build it from scratch.
+        """
+        try:
+            vector_size = int(self.embedding_model.get_sentence_embedding_dimension())
+            info = self.client.get_collection(self.collection_name)
+            existing_size = info.config.params.vectors.size
+        except Exception:
+            existing_size = vector_size = None
+
+        if existing_size is None or existing_size != vector_size:
+            await self.initialize_collection()
+            return
+
+        self.vector_size = vector_size
+        logger.info(f"Reusing collection '{self.collection_name}' ({info.points_count} points), syncing from PostgreSQL")
+        await self.sync_from_database()
+
     def search_menu(
         self,
         query_text: str,
@@ -241,41 +274,40 @@ class VectorStoreService:
                 logger.warning("No menu items found in database, skipping sync")
                 return
 
-            # Create/update embeddings and points
+            # Stored points with their embedding hashes: unchanged dishes keep their vector
+            stored, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=max(len(menu_items) * 2, 1000),
+                with_payload=["embedding_hash"],
+                with_vectors=True
+            )
+            stored_by_id = {str(point.id): point for point in stored}
+
+            # Create/update points, embedding only new or edited dishes
             points = []
+            embedded = 0
             for item in menu_items:
-                # Create embedding text
-                embedding_text = f"{item['category']}: {item['name']}. {item['description']}"
-                emb = self.embedding_model.encode(embedding_text)
-
-                # Convert to list
-                try:
-                    embedding = emb.tolist()
-                except Exception:
-                    embedding = list(emb)
-
-                # Create point with same UUID as initialization
-                point_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, item["dish_id"]))
-                point = PointStruct(
-                    id=point_uuid,
-                    vector=embedding,
-                    payload={
-                        "dish_id": item["dish_id"],
-                        "name": item["name"],
-                        "description": item["description"],
-                        "category": item["category"],
-                        "meal_period": item.get("meal_period", "All-Day"),
-                        "price": float(item["price"]),
-                        "popularity_score": item.get("popularity_score", 5),
-                        "dietary_tags": item.get("dietary_tags", []),
-                        "availability_status": item.get("availability_status", "available"),
-                        "quantity": item.get("quantity", 0)
-                    }
-                )
-                points.append(point)
+                text = embedding_text(item)
+                previous = stored_by_id.get(point_id(item["dish_id"]))
+                if previous is not None and previous.vector and (previous.payload or {}).get("embedding_hash") == embedding_hash(text):
+                    embedding = previous.vector
+                else:
+                    embedding = self._embed(text)
+                    embedded += 1
+                points.append(self._build_point(item, embedding))
 
             # Upsert all points (updates existing, adds new)
             self.client.upsert(collection_name=self.collection_name, points=points)
+
+            # Drop dishes that were removed from the menu
+            current_ids = {point.id for point in points}
+            stale_ids = [point.id for point in stored if str(point.id) not in current_ids]
+            if stale_ids:
+                self.client.delete(collection_name=self.collection_name, points_selector=PointIdsList(points=stale_ids))
+                logger.info(f"Removed {len(stale_ids)} dishes no longer on the menu from Qdrant")
+
+            if embedded:
+                logger.info(f"Embedded {embedded} new or changed dishes")
             logger.debug(f"✓ Synced {len(points)} menu items from PostgreSQL to Qdrant")
 
         except Exception as e:
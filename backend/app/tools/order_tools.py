@@ -6,6 +6,9 @@ import json
 from typing import List, Dict, Optional
 from datetime import datetime
 from app.services.database_service import db_service
+from app.services.menu_catalog_service import menu_catalog, pick_match
+from app.services.reservation_service import reservation_service
+from app.services.print_worker_service import enqueue_order_event
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +18,7 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "add_item_to_order",
-            "description": "Add a menu item to the customer's current order. Call this IMMEDIATELY when customer mentions a dish name and quantity. Examples: '2 idli', 'one coffee', 'dosa'. Do NOT wait for confirmation - add items as they order.",
+            "description": "Add a menu item to the customer's current order. Call this IMMEDIATELY when customer mentions a dish name and quantity. Examples: '2 idli', 'one coffee', 'dosa'. Do NOT wait for confirmation - add items as they order. If the result has needs_clarification, ask the customer which of the listed candidates they meant instead of guessing.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -83,6 +86,38 @@ TOOLS = [
 ]
 
 
+def _held_by_others_sql(session_param: str) -> str:
+    """
+    SQL for the units of menu item `m` held by other sessions
+
+    Args:
+        session_param: Placeholder of this session's ID (e.g. "$3")
+
+    Returns:
+        Subquery expression, or "0" when stock reservations are disabled
+    """
+    if not reservation_service.enabled:
+        return "0"
+    return f"""COALESCE((
+        SELECT SUM(r.quantity) FROM reservations r
+        WHERE r.dish_id = m.dish_id AND r.session_id <> {session_param}
+        AND r.expires_at > NOW()
+    ), 0)"""
+
+
+class InsufficientStockError(Exception):
+    """Raised inside the confirmation transaction when dishes are short of stock."""
+
+    def __init__(self, shortfalls: List[Dict]):
+        self.shortfalls = shortfalls
+        super().__init__(
+            "Insufficient stock for " + ", ".join(
+                f"{s['name']} (available: {s['available']}, ordered: {s['ordered']})"
+                for s in shortfalls
+            )
+        )
+
+
 class OrderToolExecutor:
     """Executes tool calls from LLM"""
 
@@ -143,27 +178,64 @@ class OrderToolExecutor:
             # DEBUG: Log client_state keys and ID
             logger.info(f"🔍 ADD ITEM - client_state id: {id(self.client_state)}, keys: {list(self.client_state.keys())}")
 
-            # Search for dish in database
-            item = await db_service.get_item_by_name(dish_name)
+            # Resolve from the in-memory catalog (no DB scan);
+            # fall back to the pg_trgm search if the catalog hasn't loaded
+            if menu_catalog.items:
+                item, candidates = menu_catalog.resolve(dish_name)
+            else:
+                rows = await db_service.search_items_by_name(dish_name)
+                candidates = [(row, float(row['score'])) for row in rows]
+                item = pick_match(candidates, dish_name)
+
+            if not candidates:
+                return {
+                    "success": False,
+                    "error": f"Dish '{dish_name}' not found in menu"
+                }
 
             if not item:
+                # Scores too close to call, or only a weak match - let the LLM ask the customer
+                names = [candidate['name'] for candidate, _ in candidates]
+                logger.info(f"🔍 Unclear dish '{dish_name}': {[(c['name'], round(s, 2)) for c, s in candidates]}")
                 return {
                     "success": False,
-                    "error": f"Dish '{dish_name}' not found in menu"
+                    "needs_clarification": True,
+                    "error": (
+                        f"'{dish_name}' matches several dishes: {', '.join(names)}" if len(names) > 1
+                        else f"'{dish_name}' is not on the menu, closest is {names[0]}"
+                    ),
+                    "candidates": names
                 }
 
+            existing = next(
+                (x for x in self.client_state["current_order"]
+                 if x['dish_id'] == item['dish_id']),
+                None
+            )
+            in_cart = existing['quantity'] if existing else 0
+
+            session_id = self.client_state.get("session_id")
+            if reservation_service.enabled and session_id:
+                # Hold the cart total for this dish; other tables' holds don't count as stock
+                held, stock = await reservation_service.hold(session_id, item['dish_id'], in_cart + quantity)
+                is_available = stock > 0
+            else:
+                # Live stock check by primary key
+                is_available, stock = await db_service.check_item_availability(item['dish_id'])
+                held = stock >= in_cart + quantity
+
             # Check availability
-            if item['availability_status'] != 'available':
+            if not is_available:
                 return {
                     "success": False,
                     "error": f"{dish_name} is currently unavailable"
                 }
 
             # Check stock
-            if item['quantity'] < quantity:
+            if not held:
                 return {
                     "success": False,
-                    "error": f"Only {item['quantity']} {dish_name} available"
+                    "error": f"Only {max(stock - in_cart, 0)} more {dish_name} available"
                 }
 
             # Add to order (in memory)
@@ -174,13 +246,6 @@ class OrderToolExecutor:
                 "price": float(item['price'])
             }
 
-            # Check if item already in order
-            existing = next(
-                (x for x in self.client_state["current_order"]
-                 if x['dish_id'] == item['dish_id']),
-                None
-            )
-
             if existing:
                 existing['quantity'] += quantity
                 logger.info(f"✅ Updated {dish_name} quantity to {existing['quantity']}")
@@ -205,12 +270,22 @@ class OrderToolExecutor:
     async def remove_item_from_order(self, dish_name: str) -> dict:
         """Remove item from current order"""
         try:
-            # Find item in current order
+            # Find item in current order: exact name first, then the best-ranked
+            # catalog candidate that is actually in the order (aliases/misspellings)
+            current_order = self.client_state["current_order"]
             item_index = next(
-                (i for i, x in enumerate(self.client_state["current_order"])
+                (i for i, x in enumerate(current_order)
                  if x['name'].lower() == dish_name.lower()),
                 None
             )
+            if item_index is None:
+                order_ids = [x['dish_id'] for x in current_order]
+                item_index = next(
+                    (order_ids.index(candidate['dish_id'])
+                     for candidate, _ in menu_catalog.match(dish_name)
+                     if candidate['dish_id'] in order_ids),
+                    None
+                )
 
             if item_index is None:
                 return {
@@ -221,6 +296,9 @@ class OrderToolExecutor:
             removed_item = self.client_state["current_order"].pop(item_index)
             logger.info(f"✅ Removed {removed_item['name']} from order")
 
+            if reservation_service.enabled and self.client_state.get("session_id"):
+                await reservation_service.release(self.client_state["session_id"], removed_item['dish_id'])
+
             return {
                 "success": True,
                 "message": f"Removed {removed_item['name']} from order",
@@ -256,9 +334,11 @@ class OrderToolExecutor:
         """
         Complete order confirmation flow:
         1. Pause ASR
-        2. Print kitchen bill
-        3. Update PostgreSQL database
-        4. Resume ASR for next order
+        2. Update PostgreSQL database and queue the kitchen ticket (outbox)
+        3. Keep ASR paused until the next order is started
+
+        The ticket is printed by the print worker after commit, so a slow or
+        missing printer never delays the confirmation.
         """
         try:
             # DEBUG: Log the entire client_state keys
@@ -291,47 +371,71 @@ class OrderToolExecutor:
             logger.info("⏸️  ASR paused for order processing")
 
             # ==========================================
-            # STEP 2: PRINT KITCHEN BILL (OPTIONAL)
-            # ==========================================
-            printed_successfully = False
-            try:
-                from printing.print_bill import print_bill
-
-                import time
-                temp_order_id = int(time.time()) % 100000
-
-                logger.info(f"🖨️  Printing kitchen bill for Order #{temp_order_id}...")
-
-                print_result = print_bill(
-                    items=order_items,
-                    table_no=table_number,
-                    order_id=temp_order_id,
-                    order_number=order_number_in_session
-                )
-
-                if print_result and print_result.get('success', False):
-                    logger.info("✅ Kitchen bill printed successfully!")
-                    printed_successfully = True
-                else:
-                    error_msg = print_result.get('error', 'Printer error') if print_result else 'Printer not responding'
-                    logger.warning(f"⚠️ Print failed (continuing anyway): {error_msg}")
-
-            except ImportError as import_error:
-                logger.warning(f"⚠️ Printer module not available (continuing anyway): {import_error}")
-                # Continue without printing - this is OK
-            except Exception as print_error:
-                logger.warning(f"⚠️ Print exception (continuing anyway): {print_error}")
-                # Continue without printing - this is OK
-
-            # ==========================================
-            # STEP 3: UPDATE DATABASE
+            # STEP 2: UPDATE DATABASE + QUEUE KITCHEN TICKET
             # ==========================================
             logger.info("💾 Updating database inventory...")
 
             conn = await db_service.pool.acquire()
 
+            # Total quantity per dish (one array element per dish for the set-based update)
+            ordered = {}
+            for item in order_items:
+                ordered[item['dish_id']] = ordered.get(item['dish_id'], 0) + item['quantity']
+            dish_ids = list(ordered.keys())
+            quantities = list(ordered.values())
+            session_id = self.client_state.get("session_id") or ""
+
+            # Other tables' holds only count while reservations are on
+            held_args = [session_id] if reservation_service.enabled else []
+
             try:
                 async with conn.transaction():
+                    # Decrement every dish in one statement; rows without enough
+                    # stock (after other tables' holds) are not updated, so the
+                    # check and write are one atomic step
+                    updated = await conn.fetch(
+                        f"""
+                        UPDATE menu_items AS m
+                        SET quantity = m.quantity - o.quantity,
+                            updated_at = NOW()
+                        FROM unnest($1::text[], $2::int[]) AS o(dish_id, quantity)
+                        WHERE m.dish_id = o.dish_id
+                        AND m.quantity - {_held_by_others_sql('$3')} >= o.quantity
+                        RETURNING m.dish_id, m.quantity
+                        """,
+                        dish_ids,
+                        quantities,
+                        *held_args
+                    )
+
+                    if len(updated) != len(dish_ids):
+                        updated_ids = {row['dish_id'] for row in updated}
+                        missing = [d for d in dish_ids if d not in updated_ids]
+                        stock_rows = await conn.fetch(
+                            f"""
+                            SELECT m.dish_id, GREATEST(m.quantity - {_held_by_others_sql('$2')}, 0) AS quantity
+                            FROM menu_items m
+                            WHERE m.dish_id = ANY($1::text[])
+                            """,
+                            missing,
+                            *held_args
+                        )
+                        stock = {row['dish_id']: row['quantity'] for row in stock_rows}
+                        names = {item['dish_id']: item['name'] for item in order_items}
+                        # Raising rolls back the rows that were decremented
+                        raise InsufficientStockError([
+                            {
+                                "dish_id": dish_id,
+                                "name": names[dish_id],
+                                "ordered": ordered[dish_id],
+                                "available": stock.get(dish_id, 0)
+                            }
+                            for dish_id in missing
+                        ])
+
+                    for row in updated:
+                        logger.info(f"✅ {row['dish_id']}: quantity reduced by {ordered[row['dish_id']]} (now {row['quantity']})")
+
                     # Create order record
                     order_id = await conn.fetchval(
                         """
@@ -347,53 +451,43 @@ class OrderToolExecutor:
 
                     logger.info(f"📝 Created order #{order_id} in database")
 
-                    # Update each item's inventory
-                    for item in order_items:
-                        # Safety check - verify current stock
-                        current_qty = await conn.fetchval(
-                            "SELECT quantity FROM menu_items WHERE dish_id = $1",
-                            item['dish_id']
-                        )
+                    # The holds become the sale
+                    if reservation_service.enabled:
+                        await reservation_service.release(session_id, conn=conn)
 
-                        if current_qty is None:
-                            raise Exception(f"Item {item['name']} not found in database")
-
-                        if current_qty < item['quantity']:
-                            raise Exception(
-                                f"Insufficient stock for {item['name']} "
-                                f"(available: {current_qty}, ordered: {item['quantity']})"
-                            )
-
-                        # Reduce inventory
-                        await conn.execute(
-                            """
-                            UPDATE menu_items
-                            SET quantity = quantity - $1,
-                                updated_at = NOW()
-                            WHERE dish_id = $2
-                            """,
-                            item['quantity'],
-                            item['dish_id']
-                        )
-
-                        logger.info(f"✅ {item['name']}: quantity reduced by {item['quantity']}")
+                    # Save all order lines in one batch
+                    await conn.executemany(
+                        """
+                        INSERT INTO order_items (order_id, dish_id, quantity, price)
+                        VALUES ($1, $2, $3, $4)
+                        """,
+                        [
+                            (order_id, item['dish_id'], item['quantity'], item['price'])
+                            for item in order_items
+                        ]
+                    )
 
-                        # Save order item
-                        await conn.execute(
-                            """
-                            INSERT INTO order_items (order_id, dish_id, quantity, price)
-                            VALUES ($1, $2, $3, $4)
-                            """,
-                            order_id,
-                            item['dish_id'],
-                            item['quantity'],
-                            item['price']
-                        )
+                    # Kitchen ticket commits atomically with the order
+                    await enqueue_order_event(conn, order_id, {
+                        "table_number": table_number,
+                        "order_number": order_number_in_session,
+                        "items": [
+                            {
+                                "dish_id": item['dish_id'],
+                                "name": item['name'],
+                                "quantity": item['quantity'],
+                                "price": item['price'],
+                                # Kitchen station routing
+                                "category": (menu_catalog.get(item['dish_id']) or {}).get('category')
+                            }
+                            for item in order_items
+                        ]
+                    })
 
-                    logger.info(f"✅ Database updated successfully for Order #{order_id}")
+                    logger.info(f"✅ Database updated successfully for Order #{order_id}, kitchen ticket queued")
 
                     # ==========================================
-                    # STEP 4: FINALIZE - Clear order, KEEP ASR PAUSED
+                    # STEP 3: FINALIZE - Clear order, KEEP ASR PAUSED
                     # ==========================================
                     order_summary = self.client_state["current_order"].copy()
                     self.client_state["current_order"] = []  # Clear for next order
@@ -423,7 +517,7 @@ class OrderToolExecutor:
                         "message": f"Order confirmed! Bill sent to kitchen. Thank you!",
                         "total": float(total_amount),
                         "items": order_summary,
-                        "printed": printed_successfully,
+                        "print_queued": True,
                         "database_updated": True,
                         "order_number": order_number_in_session,
                         "total_orders_in_session": len(self.client_state["completed_orders"]),
@@ -432,17 +526,37 @@ class OrderToolExecutor:
                         "confirmation_duration": 10  # Show for 10 seconds
                     }
 
+            except InsufficientStockError as stock_error:
+                logger.warning(f"⚠️ Order not saved: {stock_error}")
+
+                # Nothing was written - keep the cart so the customer can adjust it
+                self.client_state["order_count"] -= 1
+                self.client_state["asr_active"] = True
+                self.client_state["order_status"] = "active"
+
+                return {
+                    "success": False,
+                    "error": f"Not enough stock: {stock_error}. Order not saved - ask the customer to change these items.",
+                    "shortfalls": stock_error.shortfalls,
+                    "database_updated": False,
+                    "order_preserved": True,
+                    "resume_asr": True
+                }
+
             except Exception as db_error:
                 logger.error(f"❌ Database error: {db_error}")
 
-                # CRITICAL: Bill printed but DB failed
+                # Transaction rolled back - no ticket was queued, so the order can be retried
+                self.client_state["order_count"] -= 1
+                self.client_state["asr_active"] = True
+                self.client_state["order_status"] = "active"
+
                 return {
                     "success": False,
-                    "error": f"CRITICAL: Bill printed but database failed: {str(db_error)}",
-                    "printed": True,
+                    "error": f"Database failed, order not saved: {str(db_error)}",
                     "database_updated": False,
-                    "requires_manual_intervention": True,
-                    "order_details": order_items
+                    "order_preserved": True,
+                    "resume_asr": True
                 }
 
             finally:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Golden-file check for kitchen ticket layout
+
+Renders fixed sample tickets with ticket_renderer (escpos Dummy printer, no
+hardware needed) and compares the ESC/POS bytes with printing/golden/*.bin.
+Run after changing the ticket layout; if the change is intended, regenerate
+the golden files with --update and commit them.
+
+Usage:
+    python3 check_ticket_layout.py           # exit 1 on any mismatch
+    python3 check_ticket_layout.py --update  # rewrite golden files
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from ticket_renderer import render_ticket, render_tickets
+
+GOLDEN_DIR = Path(__file__).parent / 'golden'
+
+# Fixed time so the rendered bytes are reproducible
+FIXED_TIME = datetime(2025, 1, 15, 19, 30)
+
+CASES = {
+    'single_ticket': lambda: render_ticket(
+        [{"name": "Chicken Biryani", "qty": 2}, {"name": "Egg Noodles", "qty": 1}],
+        table_no="5", order_id=101, now=FIXED_TIME
+    ),
+    'station_ticket': lambda: render_ticket(
+        [{"name": "Schezwan Chicken Noodles", "qty": 3}],
+        table_no="2", order_id=102, station="chinese", now=FIXED_TIME
+    ),
+    'long_names_batch': lambda: render_tickets([
+        {"items": [{"name": "Palipalayam Chicken With Extra Gravy", "qty": 12}], "table_no": "7", "order_id": 103},
+        {"items": [{"name": "Meals", "qty": 1}, {"name": "Fish Curry", "qty": 2}], "table_no": "8", "order_id": 104},
+    ], now=FIXED_TIME),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check kitchen ticket bytes against golden files")
+    parser.add_argument('--update', action='store_true', help="Rewrite the golden files")
+    args = parser.parse_args()
+
+    GOLDEN_DIR.mkdir(exist_ok=True)
+    failures = 0
+
+    for name, render in CASES.items():
+        output = render()
+        golden_path = GOLDEN_DIR / f"{name}.bin"
+
+        if args.update:
+            golden_path.write_bytes(output)
+            print(f"✓ {name}: wrote {len(output)} bytes")
+            continue
+
+        if not golden_path.exists():
+            print(f"✗ {name}: missing golden file (run with --update)")
+            failures += 1
+            continue
+
+        expected = golden_path.read_bytes()
+        if output == expected:
+            print(f"✓ {name}: {len(output)} bytes match")
+        else:
+            offset = next((i for i, (a, b) in enumerate(zip(output, expected)) if a != b), min(len(output), len(expected)))
+            print(f"✗ {name}: differs at byte {offset} (got {len(output)} bytes, expected {len(expected)})")
+            print(f"  got:      {output[offset:offset + 32]!r}")
+            print(f"  expected: {expected[offset:offset + 32]!r}")
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
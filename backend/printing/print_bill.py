@@ -1,7 +1,13 @@
-from escpos.printer import Usb
-import usb.core
 from datetime import datetime
 
+try:
+    from printing.printer_manager import get_printer_manager, open_usb_printer
+    from printing.ticket_renderer import render_ticket, render_tickets
+except ImportError:
+    # Run as a script from the printing/ directory (test_print.py)
+    from printer_manager import get_printer_manager, open_usb_printer
+    from ticket_renderer import render_ticket, render_tickets
+
 class BillPrinter:
     def __init__(self):
         self.vendor_id = 0x0fe6
@@ -10,43 +16,8 @@ class BillPrinter:
         self.out_ep = 0x01
 
     def setup_printer(self):
-        """Setup and initialize the printer"""
-        import time
-
-        # Try to find the printer (with retry)
-        max_retries = 3
-        dev = None
-
-        for i in range(max_retries):
-            dev = usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id)
-            if dev is not None:
-                break
-            if i < max_retries - 1:
-                print(f"Printer not found, retrying... ({i+1}/{max_retries})")
-                time.sleep(1)
-
-        if dev is None:
-            raise ValueError("Printer not found! Please check:\n1. Printer is connected via USB\n2. Run 'lsusb | grep 0fe6' to verify\n3. You may need USB permissions")
-
-        # Detach kernel driver from all interfaces
-        for cfg in dev:
-            for intf in cfg:
-                if dev.is_kernel_driver_active(intf.bInterfaceNumber):
-                    try:
-                        dev.detach_kernel_driver(intf.bInterfaceNumber)
-                    except usb.core.USBError:
-                        pass
-
-        # Reset and configure
-        try:
-            dev.reset()
-            dev.set_configuration()
-        except usb.core.USBError:
-            pass
-
-        # Initialize printer
-        p = Usb(self.vendor_id, self.product_id, 0, in_ep=self.in_ep, out_ep=self.out_ep)
-        return p
+        """Setup and initialize the printer (fresh USB connection)"""
+        return open_usb_printer(self.vendor_id, self.product_id, self.in_ep, self.out_ep)
 
     def print_bill(self, items, table_no="1", order_id=None):
         """
@@ -61,52 +32,36 @@ class BillPrinter:
         order_id : str
             Order ID (auto-generated if not provided)
         """
-        # Setup printer
-        p = self.setup_printer()
-
-        # Get current date and time
-        now = datetime.now()
-        date_str = now.strftime("%d-%m-%Y")
-        time_str = now.strftime("%I:%M %p")
-
         # Auto-generate order ID if not provided
         if order_id is None:
-            order_id = now.strftime("A%H%M%S")
-
-        # ==================== ORDER INFO ====================
-        p.set(align='left', bold=True)
-        p.text(f"Table: {table_no}\n")
-        p.text(f"Order: {order_id}\n")
-        p.set(bold=False)
-        p.text(f"Date: {date_str}  {time_str}\n")
-        p.text("--------------------------------\n")
-
-        # ==================== ITEMS ====================
-        p.text("Item                     Qty\n")
-        p.text("--------------------------------\n")
-
-        # Print items
-        for item in items:
-            name = item['name']
-            qty = item['qty']
-
-            # Format item line (32 chars wide for receipt)
-            name_short = name[:24].ljust(24)
-            qty_str = str(qty).rjust(4)
-
-            p.text(f"{name_short} {qty_str}\n")
-
-        p.text("--------------------------------\n")
-        p.text("\n\n")
+            order_id = datetime.now().strftime("A%H%M%S")
 
-        # Cut paper
-        p.cut()
-        p.close()
+        # Render first, then one bulk write on the shared, already-open connection
+        data = render_ticket(items, table_no, order_id)
+        get_printer_manager().run(lambda p: p._raw(data))
 
         print(f"✓ Bill printed!")
         print(f"  Order: {order_id}")
         print(f"  Table: {table_no}")
 
+    def print_tickets(self, tickets, station=None, printer_config=None):
+        """
+        Print several tickets in one printer session
+
+        Parameters:
+        -----------
+        tickets : list of dict
+            Each dict: {'items': [{'name', 'qty'}], 'table_no', 'order_id', 'station'}
+        station : str
+            Kitchen station (selects its printer)
+        printer_config : dict
+            Station printer settings (see printer_manager.get_printer_manager)
+        """
+        # Render the whole batch before taking the printer, then write it in one go
+        data = render_tickets(tickets)
+        get_printer_manager(station, printer_config).run(lambda p: p._raw(data))
+        print(f"✓ {len(tickets)} ticket(s) printed" + (f" at {station}" if station else ""))
+
 
 def print_bill(items, table_no="1", order_id=None, order_number=None):
     """
@@ -156,3 +111,46 @@ def print_bill(items, table_no="1", order_id=None, order_number=None):
             "success": False,
             "error": str(e)
         }
+
+
+def print_station_tickets(tickets, station=None, printer_config=None):
+    """
+    Print a batch of kitchen tickets for one station in a single printer session
+
+    Parameters:
+    -----------
+    tickets : list of dict
+        Each dict: {'items': [{'name': str, 'quantity': int}], 'table_no': str,
+        'order_id': int, 'station': str}
+    station : str
+        Kitchen station name (None for the default printer)
+    printer_config : dict
+        Station printer settings: backend, host, port, file (optional)
+
+    Returns:
+    --------
+    dict
+        {"success": True/False, "error": "..." (if failed), "tickets": int}
+    """
+    try:
+        formatted = [
+            dict(ticket, items=[
+                {'name': item['name'], 'qty': item.get('quantity', item.get('qty', 1))}
+                for item in ticket['items']
+            ])
+            for ticket in tickets
+        ]
+
+        BillPrinter().print_tickets(formatted, station, printer_config)
+
+        return {
+            "success": True,
+            "tickets": len(tickets)
+        }
+
+    except Exception as e:
+        print(f"✗ Print failed: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
@@ -0,0 +1,244 @@
+"""
+Long-lived kitchen printer connection
+
+Opening the USB printer (discovery, kernel driver detach, reset) takes
+seconds, so the PrinterManager does it once and keeps the connection open
+between tickets. A keep-alive thread pings the printer while idle, and any
+write error (USBError, broken socket) closes the connection, reconnects and
+retries the ticket once.
+
+Backends (PRINTER_BACKEND):
+- usb:     the ESC/POS USB printer (default, 0fe6:811e)
+- network: ESC/POS over TCP (PRINTER_HOST, PRINTER_PORT=9100)
+- file:    write to a device node or plain file (PRINTER_FILE), e.g. a
+           fake printer for local testing
+
+Kitchen stations can have their own printer; get_printer_manager(station,
+config) keeps one manager per station, and stations without a config share
+the default printer.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from escpos.printer import File, Network, Usb
+
+# Printer vendor/product and endpoints (same as BillPrinter)
+USB_VENDOR_ID = 0x0fe6
+USB_PRODUCT_ID = 0x811e
+USB_IN_EP = 0x81
+USB_OUT_EP = 0x01
+
+PRINTER_BACKEND = os.getenv('PRINTER_BACKEND', 'usb').lower()
+PRINTER_HOST = os.getenv('PRINTER_HOST', '127.0.0.1')
+PRINTER_PORT = int(os.getenv('PRINTER_PORT', '9100'))
+PRINTER_FILE = os.getenv('PRINTER_FILE', '/tmp/kitchen_printer.bin')
+PRINTER_KEEPALIVE_SECONDS = float(os.getenv('PRINTER_KEEPALIVE_SECONDS', '30'))
+
+
+def open_usb_printer(vendor_id=USB_VENDOR_ID, product_id=USB_PRODUCT_ID, in_ep=USB_IN_EP, out_ep=USB_OUT_EP,
+                     max_retries=3):
+    """
+    Find, detach and reset the USB printer, then open it
+
+    Returns:
+        escpos Usb printer
+    """
+    # pyusb is only needed for the USB backend
+    import usb.core
+
+    # Try to find the printer (with retry)
+    dev = None
+
+    for i in range(max_retries):
+        dev = usb.core.find(idVendor=vendor_id, idProduct=product_id)
+        if dev is not None:
+            break
+        if i < max_retries - 1:
+            print(f"Printer not found, retrying... ({i+1}/{max_retries})")
+            time.sleep(1)
+
+    if dev is None:
+        raise ValueError("Printer not found! Please check:\n1. Printer is connected via USB\n2. Run 'lsusb | grep 0fe6' to verify\n3. You may need USB permissions")
+
+    # Detach kernel driver from all interfaces
+    for cfg in dev:
+        for intf in cfg:
+            if dev.is_kernel_driver_active(intf.bInterfaceNumber):
+                try:
+                    dev.detach_kernel_driver(intf.bInterfaceNumber)
+                except usb.core.USBError:
+                    pass
+
+    # Reset and configure
+    try:
+        dev.reset()
+        dev.set_configuration()
+    except usb.core.USBError:
+        pass
+
+    # Initialize printer
+    return Usb(vendor_id, product_id, 0, in_ep=in_ep, out_ep=out_ep)
+
+
+class PrinterManager:
+    """Keeps one printer connection open and reconnects on errors"""
+
+    def __init__(self, backend=PRINTER_BACKEND, host=PRINTER_HOST, port=PRINTER_PORT, file=PRINTER_FILE):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.file = file
+        self.printer = None
+        self.lock = threading.RLock()
+        self.keepalive_thread = None
+        self.last_used = 0.0
+        self.status = {
+            "backend": backend,
+            "connected": False,
+            "connects": 0,
+            "reconnects": 0,
+            "jobs": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_print_ms": None,
+            "last_print_at": None,
+        }
+
+    def _open(self):
+        """Open the configured backend"""
+        if self.backend == 'network':
+            printer = Network(self.host, port=self.port, timeout=5)
+        elif self.backend == 'file':
+            printer = File(self.file)
+        else:
+            printer = open_usb_printer()
+
+        # escpos 3 opens lazily - connect now so errors surface here
+        if hasattr(printer, 'open'):
+            printer.open()
+        return printer
+
+    def connect(self):
+        """Open the printer if it isn't already (call with the lock held)"""
+        if self.printer is not None:
+            return self.printer
+
+        self.printer = self._open()
+        self.status["connected"] = True
+        self.status["connects"] += 1
+        print(f"✓ Printer connected ({self.backend})")
+        self._start_keepalive()
+        return self.printer
+
+    def disconnect(self):
+        """Close the printer connection (ignores errors from a dead device)"""
+        with self.lock:
+            if self.printer is not None:
+                try:
+                    self.printer.close()
+                except Exception:
+                    pass
+            self.printer = None
+            self.status["connected"] = False
+
+    def run(self, job):
+        """
+        Run a print job against the open printer, reconnecting once on failure
+
+        Parameters:
+        -----------
+        job : callable
+            Called with the escpos printer; writes one or more tickets
+
+        Returns:
+        --------
+        Whatever job returns
+        """
+        with self.lock:
+            start = time.perf_counter()
+            for attempt in range(2):
+                try:
+                    result = job(self.connect())
+                    break
+                except Exception as e:
+                    self.status["errors"] += 1
+                    self.status["last_error"] = str(e)
+                    self.disconnect()
+                    if attempt == 1:
+                        raise
+                    print(f"✗ Printer error, reconnecting: {e}")
+                    self.status["reconnects"] += 1
+
+            self.last_used = time.monotonic()
+            self.status["jobs"] += 1
+            self.status["last_print_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.status["last_print_at"] = datetime.now().isoformat()
+            return result
+
+    def _start_keepalive(self):
+        if PRINTER_KEEPALIVE_SECONDS <= 0:
+            return
+        if self.keepalive_thread is None or not self.keepalive_thread.is_alive():
+            self.keepalive_thread = threading.Thread(target=self._keepalive_loop, name="printer-keepalive", daemon=True)
+            self.keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        """Ping the idle printer (ESC @) so a dead connection is found before the next ticket"""
+        while True:
+            time.sleep(PRINTER_KEEPALIVE_SECONDS)
+            with self.lock:
+                if time.monotonic() - self.last_used < PRINTER_KEEPALIVE_SECONDS:
+                    continue
+                try:
+                    self.connect().hw('INIT')
+                    self.last_used = time.monotonic()
+                except Exception as e:
+                    self.status["errors"] += 1
+                    self.status["last_error"] = str(e)
+                    self.disconnect()
+
+    def get_status(self):
+        """Connection state and counters (for /health)"""
+        return dict(self.status)
+
+
+DEFAULT_PRINTER = 'default'
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_printer_manager(station=None, config=None):
+    """
+    Get the printer manager for a kitchen station
+
+    Parameters:
+    -----------
+    station : str
+        Station name (None for the default printer)
+    config : dict
+        Station printer settings: backend, host, port, file. Stations without
+        a config share the default printer.
+    """
+    key = station if config else DEFAULT_PRINTER
+    with _managers_lock:
+        if key not in _managers:
+            if config:
+                _managers[key] = PrinterManager(
+                    backend=config.get('backend', PRINTER_BACKEND).lower(),
+                    host=config.get('host', PRINTER_HOST),
+                    port=int(config.get('port', PRINTER_PORT)),
+                    file=config.get('file', PRINTER_FILE)
+                )
+            else:
+                _managers[key] = PrinterManager()
+        return _managers[key]
+
+
+def get_all_printer_status():
+    """Status of every printer opened in this process, keyed by station"""
+    with _managers_lock:
+        return {key: manager.get_status() for key, manager in _managers.items()}
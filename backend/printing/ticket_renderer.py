@@ -0,0 +1,101 @@
+"""
+Kitchen ticket renderer
+
+Builds the complete ESC/POS byte stream for a ticket in memory (escpos Dummy
+printer), so the printer gets one bulk write per batch instead of a USB
+transfer per line, and the layout can be checked byte-for-byte against golden
+files (see check_ticket_layout.py).
+"""
+
+from datetime import datetime
+
+from escpos.printer import Dummy
+
+# Receipt width in characters
+LINE_WIDTH = 32
+NAME_WIDTH = 24
+QTY_WIDTH = 4
+SEPARATOR = "-" * LINE_WIDTH + "\n"
+
+
+def _write_ticket(p, items, table_no, order_id, station=None, now=None):
+    """Write one ticket with escpos commands (p is any escpos printer)"""
+    # Get current date and time
+    now = now or datetime.now()
+    date_str = now.strftime("%d-%m-%Y")
+    time_str = now.strftime("%I:%M %p")
+
+    # ==================== STATION ====================
+    if station:
+        p.set(align='center', bold=True)
+        p.text(f"** {station.upper()} **\n")
+
+    # ==================== ORDER INFO ====================
+    p.set(align='left', bold=True)
+    p.text(f"Table: {table_no}\n")
+    p.text(f"Order: {order_id}\n")
+    p.set(bold=False)
+    p.text(f"Date: {date_str}  {time_str}\n")
+    p.text(SEPARATOR)
+
+    # ==================== ITEMS ====================
+    p.text("Item".ljust(NAME_WIDTH + 1) + "Qty\n")
+    p.text(SEPARATOR)
+
+    # Format item lines (32 chars wide for receipt)
+    lines = [
+        f"{item['name'][:NAME_WIDTH].ljust(NAME_WIDTH)} {str(item['qty']).rjust(QTY_WIDTH)}\n"
+        for item in items
+    ]
+    p.text("".join(lines))
+
+    p.text(SEPARATOR)
+    p.text("\n\n")
+
+    # Cut paper
+    p.cut()
+
+
+def render_ticket(items, table_no="1", order_id=None, station=None, now=None):
+    """
+    Render one ticket to ESC/POS bytes
+
+    Parameters:
+    -----------
+    items : list of dict
+        Each dict should have: {'name': str, 'qty': int}
+    table_no : str
+        Table number
+    order_id : str
+        Order ID
+    station : str
+        Kitchen station header (optional)
+    now : datetime
+        Ticket time (default: current time; fixed in golden files)
+
+    Returns:
+    --------
+    bytes
+    """
+    dummy = Dummy()
+    _write_ticket(dummy, items, table_no, order_id, station, now)
+    return dummy.output
+
+
+def render_tickets(tickets, now=None):
+    """
+    Render several tickets into one ESC/POS byte stream
+
+    Parameters:
+    -----------
+    tickets : list of dict
+        Each dict: {'items': [{'name', 'qty'}], 'table_no', 'order_id', 'station'}
+
+    Returns:
+    --------
+    bytes
+    """
+    return b"".join(
+        render_ticket(ticket['items'], ticket.get('table_no', '1'), ticket.get('order_id'), ticket.get('station'), now)
+        for ticket in tickets
+    )
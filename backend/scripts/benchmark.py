@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot-path components, checked against recorded baselines
+
+Each benchmark is timed in auto-sized batches (like timeit.autorange), repeated,
+and the median time per call is compared with scripts/benchmark_baseline.json.
+A benchmark more than --threshold times slower than its baseline fails the run.
+
+Benchmarks whose dependency isn't available here (Silero model, embedding
+model, PostgreSQL) are reported as skipped, not failed.
+
+Baselines are only comparable on the same hardware: record them on the
+restaurant server (or CI runner) with --update and commit the file; the run
+warns when the recorded machine differs. Without a baseline file the run has
+nothing to gate on and exits 2; benchmarks missing from the file are listed.
+
+Usage:
+    python scripts/benchmark.py                       # compare with baselines, exit 1 on regression, 2 without baselines
+    python scripts/benchmark.py --only filter_price   # benchmarks whose name contains the text
+    python scripts/benchmark.py --update              # record new baselines
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import main  # noqa: E402
+from app.services.database_service import db_service  # noqa: E402
+from app.services.embedding_service import load_embedding_model  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+from app.services.menu_catalog_service import menu_catalog  # noqa: E402
+from app.services.vector_store_service import VectorStoreService  # noqa: E402
+from app.tools.order_tools import OrderToolExecutor  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / 'benchmark_baseline.json'
+MENU_PATH = Path(__file__).parent.parent / 'app' / 'data' / 'menu.json'
+
+# Minimum wall time per timed batch, and number of batches
+MIN_BATCH_SECONDS = 0.2
+REPEAT = 5
+
+# Dish name -> dish it must resolve to (None = the customer is asked), checked before timing menu.match
+MENU_MATCH_CASES = {
+    "chicken biryani": "Chicken Biryani",
+    "chiken biriyani": "Chicken Biryani",
+    "சிக்கன் பிரியாணி": "Chicken Biryani",
+    "fish": "Fish Curry",
+    "fish fry": None,        # Not on the menu - must not become Fish Curry
+    "mutton chuka": None,
+}
+
+BOT_RESPONSE = (
+    "சிக்கன் பிரியாணி ரொம்ப நல்லா இருக்கும். அதோட விலை 180 ரூபாய். "
+    "எக் நூடுல்ஸ் கூட ட்ரை பண்ணலாம்! வேற என்ன வேணும்? "
+    "இன்னைக்கு ஸ்பெஷல் மட்டன் சுக்கா. ஒரு ப்ளேட் 250 rupees"
+)
+USER_QUERY = "ஒரு சிக்கன் பிரியாணி குடுங்க"
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup when its dependency isn't available."""
+
+
+class Benchmark:
+    """A named hot-path call; setup() returns the zero-argument callable to time (may return an awaitable)."""
+
+    def __init__(self, name: str, setup: Callable[[], Awaitable[Callable]]):
+        self.name = name
+        self.setup = setup
+
+
+async def _time_batch(fn: Callable, is_async: bool, loops: int) -> float:
+    start = time.perf_counter()
+    if is_async:
+        for _ in range(loops):
+            await fn()
+    else:
+        for _ in range(loops):
+            fn()
+    return time.perf_counter() - start
+
+
+async def measure(fn: Callable) -> Dict[str, float]:
+    """
+    Time fn per call
+
+    Returns:
+        Dict with median_us, min_us and loops per batch
+    """
+    # Warm-up (lazy imports, caches, prepared statements); also tells async calls apart
+    result = fn()
+    is_async = inspect.isawaitable(result)
+    if is_async:
+        await result
+
+    loops = 1
+    while True:
+        elapsed = await _time_batch(fn, is_async, loops)
+        if elapsed >= MIN_BATCH_SECONDS:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(MIN_BATCH_SECONDS / elapsed) + 1))
+
+    per_call = [await _time_batch(fn, is_async, loops) / loops * 1e6 for _ in range(REPEAT)]
+    return {"median_us": round(statistics.median(per_call), 2), "min_us": round(min(per_call), 2), "loops": loops}
+
+
+def load_menu_items() -> List[Dict]:
+    with open(MENU_PATH, 'r', encoding='utf-8') as f:
+        items = json.load(f)['menu']['items']
+    for item in items:
+        item['availability_status'] = item.get('availability_status', 'Available').lower()
+    return items
+
+
+# ==================== BENCHMARKS ====================
+
+async def setup_vad():
+    try:
+        main.init_vad()
+    except Exception as e:
+        raise Skip(f"Silero VAD not available: {e}")
+    frame = (np.random.default_rng(0).standard_normal(main.CHUNK_SIZE) * 3000).astype(np.int16).tobytes()
+    client_state = {}
+    return lambda: main.process_audio_chunk(frame, client_state)
+
+
+async def setup_filter_price_mentions():
+    return lambda: main.filter_price_mentions(USER_QUERY, BOT_RESPONSE)
+
+
+async def setup_split_sentences():
+    return lambda: main.split_sentences(BOT_RESPONSE)
+
+
+def _stub_llm(message) -> LLMService:
+    """LLMService with a canned Groq response (times our request/response handling only)"""
+    async def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    service = LLMService(api_key="benchmark")
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+
+async def setup_llm_chat_text():
+    service = _stub_llm(SimpleNamespace(content=BOT_RESPONSE * 2, tool_calls=None))
+    messages = [{"role": "system", "content": "menu"}, {"role": "user", "content": USER_QUERY}]
+    return lambda: service.chat(messages, temperature=0.3, max_tokens=1000, tools=main.TOOLS)
+
+
+async def setup_llm_chat_tool_call():
+    tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(
+        name="add_item_to_order", arguments=json.dumps({"dish_name": "Chicken Biryani", "quantity": 2})
+    ))
+    service = _stub_llm(SimpleNamespace(content=None, tool_calls=[tool_call]))
+    messages = [{"role": "system", "content": "menu"}, {"role": "user", "content": USER_QUERY}]
+    return lambda: service.chat(messages, temperature=0.3, max_tokens=1000, tools=main.TOOLS)
+
+
+async def setup_format_menu_context():
+    results = [SimpleNamespace(payload=item) for item in load_menu_items()]
+    service = VectorStoreService(client=None, embedding_model=None)
+    return lambda: service.format_menu_context(results)
+
+
+def _embedding_model():
+    try:
+        return load_embedding_model()
+    except Exception as e:
+        raise Skip(f"embedding model not available: {e}")
+
+
+async def setup_embed_single():
+    model = _embedding_model()
+    return lambda: model.encode(USER_QUERY)
+
+
+async def setup_embed_batch():
+    model = _embedding_model()
+    queries = [f"{item['category']}: {item['name']}. {item['description']}" for item in load_menu_items()[:16]]
+    return lambda: model.encode(queries, batch_size=16)
+
+
+def check_menu_matches() -> int:
+    """Resolve MENU_MATCH_CASES against the menu file; returns the number of wrong answers."""
+    menu_catalog.load(load_menu_items())
+    failures = 0
+    for dish_name, expected in MENU_MATCH_CASES.items():
+        item, candidates = menu_catalog.resolve(dish_name)
+        got = item['name'] if item else None
+        if got != expected:
+            failures += 1
+            ranked = ', '.join(f"{c['name']} {score:.2f}" for c, score in candidates)
+            print(f"✗ menu match '{dish_name}': expected {expected or 'clarification'}, "
+                  f"got {got or 'clarification'} ({ranked})")
+    return failures
+
+
+async def setup_menu_match():
+    menu_catalog.load(load_menu_items())
+    return lambda: menu_catalog.match("chiken biriyani")
+
+
+async def _order_executor() -> OrderToolExecutor:
+    if db_service.pool is None:
+        try:
+            await db_service.initialize()
+        except Exception as e:
+            raise Skip(f"PostgreSQL not reachable: {e}")
+        if db_service.pool is None:
+            raise Skip("PostgreSQL not reachable")
+        await menu_catalog.refresh(force=True)
+    return OrderToolExecutor({
+        "session_id": "benchmark",
+        "current_order": [],
+        "order_count": 0,
+        "completed_orders": [],
+        "last_tool_result": {},
+    })
+
+
+async def setup_order_add_remove():
+    executor = await _order_executor()
+    dish_name = next(iter(menu_catalog.items.values()))['name']
+
+    async def add_remove():
+        await executor.execute_tool("add_item_to_order", {"dish_name": dish_name, "quantity": 1})
+        await executor.execute_tool("remove_item_from_order", {"dish_name": dish_name})
+    return add_remove
+
+
+async def setup_order_get_current():
+    executor = await _order_executor()
+    return lambda: executor.execute_tool("get_current_order", {})
+
+
+BENCHMARKS = [
+    Benchmark("vad.process_audio_chunk", setup_vad),
+    Benchmark("text.filter_price_mentions", setup_filter_price_mentions),
+    Benchmark("text.split_sentences", setup_split_sentences),
+    Benchmark("llm.chat_text_response", setup_llm_chat_text),
+    Benchmark("llm.chat_tool_call", setup_llm_chat_tool_call),
+    Benchmark("retrieval.format_menu_context", setup_format_menu_context),
+    Benchmark("embedding.encode_single", setup_embed_single),
+    Benchmark("embedding.encode_batch16", setup_embed_batch),
+    Benchmark("menu.match", setup_menu_match),
+    Benchmark("order.add_remove_item", setup_order_add_remove),
+    Benchmark("order.get_current_order", setup_order_get_current),
+]
+
+
+# ==================== RUNNER ====================
+
+def machine_info() -> Dict[str, str]:
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+        "python": platform.python_version(),
+    }
+
+
+def load_baseline() -> Optional[dict]:
+    if not BASELINE_PATH.exists():
+        return None
+    return json.loads(BASELINE_PATH.read_text())
+
+
+async def run(args) -> int:
+    baseline = load_baseline()
+    if baseline is None and not args.update:
+        print(f"!!! No baselines at {BASELINE_PATH} - nothing to compare with, record them with --update")
+    if baseline and not args.update and baseline.get("machine") != machine_info():
+        print(f"! Baseline was recorded on {baseline.get('machine')}, this is {machine_info()} - ratios are indicative only")
+
+    recorded = dict(baseline.get("results", {})) if baseline else {}
+    regressions = 0
+    unbaselined = []
+
+    mismatches = check_menu_matches() if not args.only or args.only in "menu.match" else 0
+
+    print(f"{'benchmark':<32} {'median':>11} {'min':>11} {'baseline':>11} {'ratio':>7}")
+    print("-" * 76)
+    for bench in BENCHMARKS:
+        if args.only and args.only not in bench.name:
+            continue
+        try:
+            fn = await bench.setup()
+        except Skip as e:
+            print(f"{bench.name:<32} skipped ({e})")
+            continue
+
+        result = await measure(fn)
+        base = recorded.get(bench.name)
+        if base is None:
+            unbaselined.append(bench.name)
+        ratio = result["median_us"] / base["median_us"] if base and base["median_us"] else None
+        status = ""
+        if ratio is not None and ratio > args.threshold and not args.update:
+            status = "  ✗ regression"
+            regressions += 1
+        base_text = f"{base['median_us']:.1f}µs" if base else "-"
+        ratio_text = f"{ratio:.2f}x" if ratio else "-"
+        print(f"{bench.name:<32} {result['median_us']:>9.1f}µs {result['min_us']:>9.1f}µs "
+              f"{base_text:>11} {ratio_text:>7}{status}")
+
+        if args.update:
+            recorded[bench.name] = result
+
+    if db_service.pool is not None:
+        await db_service.close()
+
+    if mismatches:
+        print(f"\n✗ {mismatches} dish name(s) resolved wrongly (see MENU_MATCH_CASES)")
+        return 1
+    if args.update:
+        BASELINE_PATH.write_text(json.dumps({"machine": machine_info(), "results": recorded}, indent=2) + "\n")
+        print(f"\n✓ Baselines written to {BASELINE_PATH}")
+        return 0
+
+    if unbaselined:
+        print(f"\n! No baseline for: {', '.join(unbaselined)} (not gated, record with --update)")
+    if regressions:
+        print(f"\n✗ {regressions} benchmark(s) slower than {args.threshold}x baseline")
+        return 1
+    if baseline is None:
+        print(f"\n✗ No baseline file ({BASELINE_PATH.name}), the regression gate did not run")
+        return 2
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument('--only', help="Run only benchmarks whose name contains this text")
+    parser.add_argument('--threshold', type=float, default=1.3,
+                        help="Fail when median is this many times the baseline (default: 1.3)")
+    parser.add_argument('--update', action='store_true', help="Record the results as the new baselines")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    raise SystemExit(asyncio.run(run(args)))
@@ -24,6 +24,10 @@ CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items(category);
 -- Create index on availability_status for faster queries
 CREATE INDEX IF NOT EXISTS idx_menu_items_availability ON menu_items(availability_status);
 
+-- Trigram index for fuzzy dish name search (similarity ranking and LIKE '%x%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_menu_items_name_trgm ON menu_items USING GIN (LOWER(name) gin_trgm_ops);
+
 -- Create orders table
 CREATE TABLE IF NOT EXISTS orders (
     order_id SERIAL PRIMARY KEY,
@@ -35,6 +39,53 @@ CREATE TABLE IF NOT EXISTS orders (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create order_items table (one row per dish per order)
+CREATE TABLE IF NOT EXISTS order_items (
+    id SERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    dish_id VARCHAR(50) NOT NULL,
+    quantity INTEGER NOT NULL,
+    price DECIMAL(10, 2) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+
+-- Create reservations table (cart stock holds, see reservation_service.py)
+CREATE TABLE IF NOT EXISTS reservations (
+    session_id VARCHAR(64) NOT NULL,
+    dish_id VARCHAR(50) NOT NULL,
+    quantity INTEGER NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (session_id, dish_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_reservations_dish ON reservations(dish_id, expires_at);
+
+-- Create order_events outbox (kitchen tickets, drained by print_worker_service.py)
+CREATE TABLE IF NOT EXISTS order_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP,
+    printed_stations TEXT[] NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_events_pending
+    ON order_events(next_attempt_at) WHERE status IN ('pending', 'processing');
+
+-- Create sessions table (shared kiosk session state for multi-worker deployments)
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id VARCHAR(64) PRIMARY KEY,
+    state JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create trigger to auto-update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end load test for the audio WebSocket
+
+Runs the real FastAPI app (VAD, endpointing, turn pipeline, tool executor,
+menu matching, tracing) in-process with local stand-ins for the external
+services, then drives it with N simulated kiosks:
+
+- ASR (Sarvam):  returns a scripted order line after a sampled latency
+- LLM (Groq):    calls add_item_to_order for dishes it hears, then replies
+- TTS (Sarvam):  returns silent WAV audio sized like real speech
+- Qdrant:        in-memory QdrantClient with hashed embeddings (real search path)
+- PostgreSQL:    menu.json stock stand-in (or the real database with --database)
+
+Each kiosk streams microphone frames in real time (32 ms, 31.25 frames/s, the
+same VAD load as a real kiosk), speaks an utterance, waits for the bot's reply
+to finish playing, pauses and speaks again. Utterances are recorded 16 kHz
+mono WAV/PCM files from --utterances, or synthetic voiced bursts (energy VAD
+only - Silero won't take them for speech).
+
+Reported: p50/p95/p99 time to first audio as the kiosk sees it (end of the
+customer's speech -> first bot audio byte, includes the endpointing wait), as
+the server traces it (end-of-speech detected -> first byte), per-stage span
+latency, and throughput.
+
+Usage:
+    python scripts/load_test.py --clients 20 --turns 5
+    python scripts/load_test.py --clients 50 --llm-ms 900 --utterances recordings/ --vad silero
+    python scripts/load_test.py --clients 10 --database      # real PostgreSQL for stock and menu
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Stand-ins must never call out, whatever the environment says
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("PRINT_WORKER", "off")
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+
+from app import main  # noqa: E402
+from app.services.database_service import db_service  # noqa: E402
+from app.services.menu_catalog_service import menu_catalog  # noqa: E402
+from app.services.tracing_service import tracer  # noqa: E402
+from app.services.vector_store_service import VectorStoreService  # noqa: E402
+
+MENU_PATH = Path(__file__).parent.parent / 'app' / 'data' / 'menu.json'
+
+SAMPLE_RATE = main.SAMPLE_RATE
+FRAME_SAMPLES = main.CHUNK_SIZE
+FRAME_SECONDS = FRAME_SAMPLES / SAMPLE_RATE
+
+# Spoken-Tamil TTS pace used to size the fake audio
+TTS_CHARS_PER_SECOND = 14
+
+FILLER_LINES = [
+    "what do you have for dinner",
+    "is it spicy",
+    "what is popular today",
+]
+QUANTITY_WORDS = ["one", "two", "three"]
+
+
+class Latency:
+    """Log-normal latency around a median (real API latency has a long right tail)"""
+
+    def __init__(self, median_ms: float, sigma: float = 0.35):
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    async def wait(self, extra_ms: float = 0.0):
+        if self.median_ms <= 0 and extra_ms <= 0:
+            return
+        await asyncio.sleep((self.median_ms * random.lognormvariate(0, self.sigma) + extra_ms) / 1000)
+
+
+def load_menu_items() -> List[Dict]:
+    """menu.json items shaped like menu_items rows"""
+    with open(MENU_PATH, 'r', encoding='utf-8') as f:
+        items = json.load(f)['menu']['items']
+    for item in items:
+        item['availability_status'] = item.get('availability_status', 'Available').lower()
+        item['quantity'] = 10 ** 6 if item['availability_status'] == 'available' else 0
+    return items
+
+
+# ==================== SERVICE STAND-INS ====================
+
+class FakeASR:
+    """Sarvam ASR stand-in: scripted order lines, latency grows with audio length"""
+
+    def __init__(self, latency: Latency, dish_names: List[str]):
+        self.latency = latency
+        self.lines = [f"{qty} {name}" for name in dish_names for qty in QUANTITY_WORDS] + FILLER_LINES
+
+    async def transcribe(self, audio_bytes: bytes, language: str = "ta-IN", deadline: Optional[float] = None) -> str:
+        audio_seconds = len(audio_bytes) / (SAMPLE_RATE * 2)
+        await self.latency.wait(extra_ms=audio_seconds * 40)
+        return random.choice(self.lines)
+
+
+class FakeLLM:
+    """Groq stand-in: add_item_to_order for a heard dish, then a short Tamil reply"""
+
+    def __init__(self, latency: Latency, dish_names: List[str]):
+        self.latency = latency
+        # Longest first so "Chicken Fried Rice" wins over "Chicken"
+        self.dish_names = sorted(dish_names, key=len, reverse=True)
+        self.calls = 0
+
+    async def chat(self, messages, temperature=0.3, max_tokens=1000, tools=None, tool_choice=None):
+        self.calls += 1
+        last = messages[-1]
+        await self.latency.wait(extra_ms=len(json.dumps(messages, ensure_ascii=False)) / 400)
+
+        if last['role'] == 'user' and tools:
+            text = last['content'].lower()
+            for name in self.dish_names:
+                if name.lower() in text:
+                    quantity = next((i + 1 for i, word in enumerate(QUANTITY_WORDS) if text.startswith(word)), 1)
+                    return {
+                        "type": "tool_call",
+                        "tool_calls": [{
+                            "id": f"call_{self.calls}",
+                            "name": "add_item_to_order",
+                            "arguments": {"dish_name": name, "quantity": quantity}
+                        }]
+                    }
+
+        if last['role'] == 'tool':
+            return {"type": "text", "content": "சரி, ஆர்டர்ல சேர்த்துட்டேன். வேற என்ன வேணும்?"}
+        return {"type": "text", "content": "இன்னைக்கு சிக்கன் பிரியாணி ரொம்ப நல்லா இருக்கும். ட்ரை பண்றீங்களா?"}
+
+
+class FakeTTS:
+    """Sarvam TTS stand-in: silent WAV with a realistic duration for the text"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    async def synthesize(self, text: str, language: str = "ta-IN", speaker: str = "anushka",
+                         deadline: Optional[float] = None) -> Optional[bytes]:
+        await self.latency.wait(extra_ms=len(text) * 2)
+        frames = int(len(text) / TTS_CHARS_PER_SECOND * 22050)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(22050)
+            wav_file.writeframes(b"\x00\x00" * frames)
+        return buffer.getvalue()
+
+
+class HashEmbeddingModel:
+    """SentenceTransformer stand-in: character-trigram hashing into a unit vector"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        padded = f"  {text.lower()} "
+        for i in range(len(padded) - 2):
+            digest = hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, 'little') % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class EnergyVAD:
+    """Silero stand-in for synthetic audio: frame RMS above a threshold is speech"""
+
+    def new_state(self):
+        return None
+
+    def speech_probability(self, frame: np.ndarray, vad_state) -> float:
+        rms = float(np.sqrt(np.mean(np.square(frame))))
+        return 1.0 if rms > 0.02 else 0.0
+
+
+async def setup_offline_database(items: List[Dict]):
+    """Answer the menu and stock queries from menu.json instead of PostgreSQL"""
+    by_id = {item['dish_id']: item for item in items}
+
+    async def get_all_menu_items():
+        return items
+
+    async def check_item_availability(dish_id: str):
+        item = by_id.get(dish_id)
+        if not item:
+            return False, 0
+        return item['availability_status'] == 'available' and item['quantity'] > 0, item['quantity']
+
+    db_service.get_all_menu_items = get_all_menu_items
+    db_service.check_item_availability = check_item_availability
+    menu_catalog.load(items)
+
+
+async def setup_services(args, items: List[Dict]):
+    """Install the stand-ins into app.main (runs on the server's event loop)"""
+    if args.database:
+        await db_service.initialize()
+        await main.reservation_service.initialize()
+        await menu_catalog.refresh(force=True)
+    else:
+        await setup_offline_database(items)
+    main.endpointer.set_dish_names(menu_catalog.names())
+
+    await main.init_session_store()
+
+    dish_names = [item['name'] for item in menu_catalog.items.values() if item['availability_status'] == 'available']
+    main.asr_service = FakeASR(Latency(args.asr_ms), dish_names)
+    main.llm_service = FakeLLM(Latency(args.llm_ms), dish_names)
+    main.tts_service = FakeTTS(Latency(args.tts_ms))
+
+    main.vector_store_service = VectorStoreService(QdrantClient(":memory:"), HashEmbeddingModel())
+    await main.vector_store_service.initialize_collection()
+
+    main.vad_model = main.init_vad() if args.vad == 'silero' else EnergyVAD()
+    main.startup_complete.set()
+
+
+class ServerThread(threading.Thread):
+    """uvicorn on its own thread and event loop, so kiosk simulation doesn't skew server timing"""
+
+    def __init__(self, args, items: List[Dict]):
+        super().__init__(name="load-test-server", daemon=True)
+        self.args = args
+        self.items = items
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        config = uvicorn.Config(main.app, host="127.0.0.1", port=args.port, lifespan="off",
+                                log_level="warning", ws_max_size=2 ** 24)
+        self.server = uvicorn.Server(config)
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        try:
+            await setup_services(self.args, self.items)
+        except BaseException as e:
+            self.error = e
+            self.ready.set()
+            raise
+        serve = asyncio.create_task(self.server.serve())
+        while not self.server.started and not serve.done():
+            await asyncio.sleep(0.05)
+        self.ready.set()
+        await serve
+        if self.args.database:
+            await db_service.close()
+
+
+# ==================== SIMULATED KIOSKS ====================
+
+def load_utterances(path: Optional[Path]) -> List[bytes]:
+    """Recorded utterances as 16 kHz mono 16-bit PCM, or synthetic voiced bursts"""
+    if path is None:
+        rng = np.random.default_rng(0)
+        utterances = []
+        for seconds in (1.2, 1.6, 2.0, 2.4):
+            t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+            # 150 Hz voice with a 4 Hz syllable envelope and some breath noise
+            envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+            signal = 0.3 * envelope * np.sin(2 * np.pi * 150 * t) + 0.02 * rng.standard_normal(len(t))
+            utterances.append((signal * 32767).astype(np.int16).tobytes())
+        return utterances
+
+    utterances = []
+    for file in sorted(path.iterdir()):
+        if file.suffix == '.pcm':
+            utterances.append(file.read_bytes())
+        elif file.suffix == '.wav':
+            with wave.open(str(file), 'rb') as wav_file:
+                if (wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                    raise SystemExit(f"✗ {file.name}: need 16 kHz mono 16-bit WAV")
+                utterances.append(wav_file.readframes(wav_file.getnframes()))
+    if not utterances:
+        raise SystemExit(f"✗ No .wav/.pcm utterances in {path}")
+    return utterances
+
+
+class Kiosk:
+    """One simulated kiosk: a real-time microphone plus the conversation loop"""
+
+    SILENCE_FRAME = b"\x00" * (FRAME_SAMPLES * 2)
+
+    def __init__(self, kiosk_id: int, args, utterances: List[bytes], results: Dict[str, list]):
+        self.kiosk_id = kiosk_id
+        self.args = args
+        self.utterances = utterances
+        self.results = results
+        self.pending_speech: List[bytes] = []
+        self.speech_ended = asyncio.Event()
+        self.speech_end_time = 0.0
+
+    async def microphone(self, ws):
+        """Send one frame every 32 ms, speech when queued, silence otherwise"""
+        next_send = time.perf_counter()
+        while True:
+            if self.pending_speech:
+                frame = self.pending_speech.pop(0)
+                if not self.pending_speech:
+                    self.speech_end_time = time.perf_counter()
+                    self.speech_ended.set()
+            else:
+                frame = self.SILENCE_FRAME
+            await ws.send(frame)
+            next_send += FRAME_SECONDS
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+    async def speak(self, audio: bytes):
+        """Queue an utterance on the microphone and wait until it has been sent"""
+        frame_bytes = FRAME_SAMPLES * 2
+        audio = audio[:len(audio) - len(audio) % frame_bytes]
+        self.speech_ended.clear()
+        self.pending_speech.extend(audio[i:i + frame_bytes] for i in range(0, len(audio), frame_bytes))
+        await self.speech_ended.wait()
+
+    async def await_reply(self, ws) -> Optional[float]:
+        """
+        Wait for the bot's reply to finish
+
+        Returns:
+            Seconds of reply audio, or None on timeout / server error
+        """
+        first_audio = None
+        audio_seconds = 0.0
+        deadline = time.perf_counter() + self.args.turn_timeout
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                if first_audio is None:
+                    self.results['timeouts'].append(self.kiosk_id)
+                    return None
+                return audio_seconds
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+
+            if isinstance(message, bytes):
+                if first_audio is None:
+                    first_audio = time.perf_counter()
+                    self.results['client_ttfa_ms'].append((first_audio - self.speech_end_time) * 1000)
+                audio_seconds += main.estimate_audio_duration(message)
+                continue
+
+            event = json.loads(message)
+            if event.get('type') == 'audio_stream_complete' and first_audio is not None:
+                return audio_seconds
+            if event.get('type') == 'error':
+                self.results['errors'].append(event.get('message', 'error'))
+                return None
+
+    async def run(self):
+        await asyncio.sleep(self.kiosk_id * self.args.ramp / max(self.args.clients, 1))
+        uri = f"ws://127.0.0.1:{self.args.port}/ws/audio?session_id=loadtest-{self.kiosk_id}"
+
+        async with websockets.connect(uri, max_size=2 ** 24) as ws:
+            await ws.recv()  # connected status
+            mic = asyncio.create_task(self.microphone(ws))
+            try:
+                for turn in range(self.args.turns):
+                    await self.speak(random.choice(self.utterances))
+                    reply_seconds = await self.await_reply(ws)
+                    if reply_seconds is None:
+                        continue
+                    self.results['turns'].append(time.perf_counter())
+                    # Listen to the reply, then think before the next order line
+                    await asyncio.sleep(reply_seconds + random.uniform(*self.args.think))
+            finally:
+                mic.cancel()
+
+
+# ==================== REPORT ====================
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "      -       -       -       -      0"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{p50:7.0f} {p95:7.0f} {p99:7.0f} {max(values):7.0f} {len(values):6d}"
+
+
+def print_report(args, results: Dict[str, list], server_turns: List[dict], elapsed: float):
+    stage_ms: Dict[str, list] = {}
+    for turn in server_turns:
+        for key, value in turn.items():
+            if key.endswith('_ms') and value is not None:
+                stage_ms.setdefault(key[:-3], []).append(value)
+
+    print("\nLoad test results")
+    print("-" * 64)
+    print(f"Kiosks: {args.clients}   turns/kiosk: {args.turns}   "
+          f"ASR/LLM/TTS median: {args.asr_ms:.0f}/{args.llm_ms:.0f}/{args.tts_ms:.0f} ms   VAD: {args.vad}")
+    print(f"Completed turns: {len(results['turns'])}   timeouts: {len(results['timeouts'])}   "
+          f"errors: {len(results['errors'])}   duration: {elapsed:.1f} s")
+    print(f"Throughput: {len(results['turns']) / elapsed:.2f} turns/s   "
+          f"VAD load: {args.clients / FRAME_SECONDS:.0f} frames/s")
+    print("-" * 64)
+    print(f"{'(ms)':<26} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} {'n':>6}")
+    print(f"{'kiosk time to first audio':<26} {percentiles(results['client_ttfa_ms'])}")
+    print(f"{'server time to first audio':<26} {percentiles(stage_ms.pop('first_audio', []))}")
+    for stage in ('asr', 'retrieval', 'llm', 'tool', 'tts', 'total'):
+        if stage in stage_ms:
+            print(f"{'  ' + stage + ' (per turn)':<26} {percentiles(stage_ms[stage])}")
+    print("-" * 64)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "clients": args.clients,
+            "turns_completed": len(results['turns']),
+            "timeouts": len(results['timeouts']),
+            "errors": results['errors'],
+            "duration_s": round(elapsed, 2),
+            "turns_per_second": round(len(results['turns']) / elapsed, 3),
+            "client_ttfa_ms": results['client_ttfa_ms'],
+            "server_turns": server_turns,
+        }, indent=2, ensure_ascii=False))
+        print(f"✓ Raw results written to {args.json}")
+
+
+async def run_kiosks(args, utterances: List[bytes]) -> Dict[str, list]:
+    results = {'client_ttfa_ms': [], 'turns': [], 'timeouts': [], 'errors': []}
+    kiosks = [Kiosk(i, args, utterances, results) for i in range(args.clients)]
+    outcomes = await asyncio.gather(*(kiosk.run() for kiosk in kiosks), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            results['errors'].append(f"{type(outcome).__name__}: {outcome}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for /ws/audio with local service stand-ins")
+    parser.add_argument('--clients', type=int, default=10, help="Simulated kiosks (default: 10)")
+    parser.add_argument('--turns', type=int, default=5, help="Utterances per kiosk (default: 5)")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds over which kiosks connect (default: 5)")
+    parser.add_argument('--think', type=float, nargs=2, default=(0.5, 2.0), metavar=('MIN', 'MAX'),
+                        help="Pause after each reply, seconds (default: 0.5 2.0)")
+    parser.add_argument('--asr-ms', type=float, default=350, help="Median fake ASR latency (default: 350)")
+    parser.add_argument('--llm-ms', type=float, default=700, help="Median fake LLM latency per call (default: 700)")
+    parser.add_argument('--tts-ms', type=float, default=400, help="Median fake TTS latency (default: 400)")
+    parser.add_argument('--vad', choices=('energy', 'silero'), default='energy',
+                        help="energy stand-in (default) or the real Silero model (needs --utterances)")
+    parser.add_argument('--utterances', type=Path, help="Directory of recorded 16 kHz mono .wav/.pcm utterances")
+    parser.add_argument('--database', action='store_true', help="Use the real PostgreSQL (DB_* env) for menu and stock")
+    parser.add_argument('--turn-timeout', type=float, default=30.0, help="Seconds to wait for a reply (default: 30)")
+    parser.add_argument('--port', type=int, default=8765, help="Local port for the in-process server (default: 8765)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for transcripts and latencies")
+    parser.add_argument('--json', type=Path, help="Also write raw results to this JSON file")
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    if args.vad == 'silero' and args.utterances is None:
+        parser.error("--vad silero needs recorded speech (--utterances)")
+    return args
+
+
+def main_cli():
+    args = parse_args()
+    random.seed(args.seed)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    server_turns: List[dict] = []
+    tracer.enabled = False
+    tracer.turn_listeners.append(lambda trace: server_turns.append(trace.summary()))
+
+    server = ServerThread(args, load_menu_items())
+    server.start()
+    server.ready.wait()
+    if server.error is not None:
+        raise SystemExit(f"✗ Server setup failed: {server.error}")
+    print(f"✓ App running on 127.0.0.1:{args.port} with local stand-ins, starting {args.clients} kiosk(s)...")
+
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run_kiosks(args, load_utterances(args.utterances)))
+    finally:
+        server.server.should_exit = True
+        server.join(timeout=10)
+    elapsed = time.perf_counter() - start
+
+    print_report(args, results, server_turns, elapsed)
+    raise SystemExit(1 if results['timeouts'] or results['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
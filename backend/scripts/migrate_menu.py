@@ -1,18 +1,206 @@
 #!/usr/bin/env python3
 """
-Migration script to load menu.json data into PostgreSQL database
-This script reads the existing menu.json file and populates the menu_items table
+Menu import pipeline: load menu.json data into the PostgreSQL menu_items table
+
+1. Validate the JSON (required fields, types, duplicate dish_ids) - nothing
+   touches the database if any item is invalid
+2. COPY the items into a temporary staging table (copy_records_to_table)
+3. Merge staging into menu_items in ONE transaction: insert new dishes, update
+   changed ones, delete dishes no longer on the menu
+4. Print a diff report (added / updated / removed)
+
+The live menu is never empty mid-import: readers see either the old menu or
+the new one. Live stock of existing dishes is kept unless --reset-stock.
+
+Usage:
+    python scripts/migrate_menu.py [--file branch_menu.json] [--dry-run] [--reset-stock] [--keep-missing]
 """
 
+import argparse
 import json
 import asyncio
 import asyncpg
 import os
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+DEFAULT_MENU_PATH = Path(__file__).parent.parent / 'app' / 'data' / 'menu.json'
+
+# Default stock for a newly imported (or --reset-stock) available dish
+DEFAULT_QUANTITY = 50
+
+COLUMNS = (
+    'dish_id', 'name', 'description', 'category', 'price', 'quantity',
+    'dietary_tags', 'meal_period', 'popularity_score', 'availability_status', 'image'
+)
+
+# Columns compared to decide whether an existing dish changed (quantity is live stock)
+DIFF_COLUMNS = (
+    'name', 'description', 'category', 'price',
+    'dietary_tags', 'meal_period', 'popularity_score', 'availability_status', 'image'
+)
+
+VALID_STATUSES = ('available', 'unavailable')
+
+
+def validate_items(items: List[Dict[str, Any]]) -> Tuple[List[tuple], List[str]]:
+    """
+    Validate menu.json items and convert them to staging rows
+
+    Args:
+        items: Items from menu.json ("menu" -> "items")
+
+    Returns:
+        Tuple of (rows in COLUMNS order, list of error messages)
+    """
+    rows = []
+    errors = []
+    seen = set()
+
+    for index, item in enumerate(items):
+        label = f"item #{index + 1} ({item.get('dish_id', '?')})" if isinstance(item, dict) else f"item #{index + 1}"
+
+        if not isinstance(item, dict):
+            errors.append(f"{label}: not an object")
+            continue
+
+        missing = [field for field in ('dish_id', 'name', 'category', 'price') if not item.get(field) and item.get(field) != 0]
+        if missing:
+            errors.append(f"{label}: missing {', '.join(missing)}")
+            continue
+
+        dish_id = str(item['dish_id'])
+        if len(dish_id) > 50:
+            errors.append(f"{label}: dish_id longer than 50 characters")
+        if dish_id in seen:
+            errors.append(f"{label}: duplicate dish_id")
+        seen.add(dish_id)
+
+        try:
+            price = float(item['price'])
+            if price < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"{label}: invalid price {item['price']!r}")
+            continue
+
+        try:
+            popularity = int(item.get('popularity_score', 5))
+        except (TypeError, ValueError):
+            errors.append(f"{label}: invalid popularity_score {item.get('popularity_score')!r}")
+            continue
+
+        tags = item.get('dietary_tags', [])
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            errors.append(f"{label}: dietary_tags must be a list of strings")
+            continue
+
+        status = str(item.get('availability_status', 'Available')).lower()
+        if status not in VALID_STATUSES:
+            errors.append(f"{label}: invalid availability_status {item.get('availability_status')!r}")
+            continue
+
+        # Default quantity based on availability status
+        quantity = DEFAULT_QUANTITY if status == 'available' else 0
+
+        rows.append((
+            dish_id,
+            item['name'],
+            item.get('description', ''),
+            item['category'],
+            price,
+            quantity,
+            tags,
+            item.get('meal_period', 'All-Day'),
+            popularity,
+            status,
+            item.get('image', '')
+        ))
+
+    return rows, errors
+
 
+async def merge_menu(conn, rows: List[tuple], reset_stock: bool = False, keep_missing: bool = False) -> Dict[str, List[str]]:
+    """
+    Stage rows with COPY and merge them into menu_items (caller owns the transaction)
 
-async def migrate_menu_to_postgres():
-    """Load menu.json data into PostgreSQL"""
+    Args:
+        conn: asyncpg connection inside a transaction
+        rows: Validated rows in COLUMNS order
+        reset_stock: Overwrite live quantity of existing dishes with the default
+        keep_missing: Don't delete dishes that are absent from the import
+
+    Returns:
+        Diff dict with 'added', 'updated' and 'removed' dish lists
+    """
+    await conn.execute('''
+        CREATE TEMP TABLE menu_import
+        (LIKE menu_items INCLUDING DEFAULTS)
+        ON COMMIT DROP
+    ''')
+    await conn.copy_records_to_table('menu_import', records=rows, columns=COLUMNS)
+
+    changed = ' OR '.join(f"m.{col} IS DISTINCT FROM s.{col}" for col in DIFF_COLUMNS)
+
+    added = await conn.fetch('''
+        SELECT s.dish_id, s.name FROM menu_import s
+        WHERE NOT EXISTS (SELECT 1 FROM menu_items m WHERE m.dish_id = s.dish_id)
+        ORDER BY s.dish_id
+    ''')
+    updated = await conn.fetch(f'''
+        SELECT s.dish_id, s.name FROM menu_import s
+        JOIN menu_items m ON m.dish_id = s.dish_id
+        WHERE {changed}
+        ORDER BY s.dish_id
+    ''')
+    removed = [] if keep_missing else await conn.fetch('''
+        SELECT m.dish_id, m.name FROM menu_items m
+        WHERE NOT EXISTS (SELECT 1 FROM menu_import s WHERE s.dish_id = m.dish_id)
+        ORDER BY m.dish_id
+    ''')
+
+    # Existing dishes keep their live stock unless reset; dishes switched
+    # on/off by the import get the default stock / zero
+    quantity = 'EXCLUDED.quantity' if reset_stock else (
+        "CASE WHEN EXCLUDED.availability_status <> 'available' THEN 0"
+        " WHEN menu_items.availability_status <> 'available' THEN EXCLUDED.quantity"
+        " ELSE menu_items.quantity END"
+    )
+    update_set = ', '.join(f"{col} = EXCLUDED.{col}" for col in DIFF_COLUMNS)
+    only_changed = ' OR '.join(f"menu_items.{col} IS DISTINCT FROM EXCLUDED.{col}" for col in DIFF_COLUMNS)
+    if reset_stock:
+        only_changed += ' OR menu_items.quantity IS DISTINCT FROM EXCLUDED.quantity'
+
+    await conn.execute(f'''
+        INSERT INTO menu_items ({', '.join(COLUMNS)})
+        SELECT {', '.join(COLUMNS)} FROM menu_import
+        ON CONFLICT (dish_id) DO UPDATE
+        SET {update_set}, quantity = {quantity}
+        WHERE {only_changed}
+    ''')
+
+    if removed:
+        await conn.execute('''
+            DELETE FROM menu_items m
+            WHERE NOT EXISTS (SELECT 1 FROM menu_import s WHERE s.dish_id = m.dish_id)
+        ''')
+
+    return {
+        'added': [f"{row['dish_id']}: {row['name']}" for row in added],
+        'updated': [f"{row['dish_id']}: {row['name']}" for row in updated],
+        'removed': [f"{row['dish_id']}: {row['name']}" for row in removed],
+    }
+
+
+class DryRun(Exception):
+    """Raised to roll back the import transaction after computing the diff."""
+
+
+async def migrate_menu_to_postgres(menu_path: Path = DEFAULT_MENU_PATH, dry_run: bool = False,
+                                   reset_stock: bool = False, keep_missing: bool = False) -> bool:
+    """Validate menu JSON and merge it into PostgreSQL"""
 
     # Database connection parameters
     DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -21,16 +209,25 @@ async def migrate_menu_to_postgres():
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres123')
 
-    # Read menu.json
-    menu_json_path = Path(__file__).parent.parent / 'app' / 'data' / 'menu.json'
-
-    print(f"Reading menu data from: {menu_json_path}")
+    print(f"Reading menu data from: {menu_path}")
 
-    with open(menu_json_path, 'r', encoding='utf-8') as f:
+    with open(menu_path, 'r', encoding='utf-8') as f:
         menu_data = json.load(f)
 
-    items = menu_data['menu']['items']
-    print(f"Found {len(items)} menu items to migrate")
+    items = menu_data.get('menu', {}).get('items', [])
+    rows, errors = validate_items(items)
+
+    if errors:
+        print(f"✗ {len(errors)} invalid item(s), nothing imported:")
+        for error in errors:
+            print(f"  - {error}")
+        return False
+
+    if not rows:
+        print("✗ Menu file has no items, nothing imported (refusing to empty the menu)")
+        return False
+
+    print(f"Validated {len(rows)} menu items")
 
     # Connect to PostgreSQL
     print(f"Connecting to PostgreSQL at {DB_HOST}:{DB_PORT}...")
@@ -45,61 +242,48 @@ async def migrate_menu_to_postgres():
 
     print("Connected successfully!")
 
-    # Clear existing data
-    await conn.execute("DELETE FROM menu_items")
-    print("Cleared existing menu_items data")
-
-    # Insert menu items
-    inserted_count = 0
-
-    for item in items:
-        # Default quantity based on availability status
-        quantity = 50 if item.get('availability_status', 'Available').lower() == 'available' else 0
-
-        await conn.execute('''
-            INSERT INTO menu_items
-            (dish_id, name, description, category, price, quantity,
-             dietary_tags, meal_period, popularity_score, availability_status, image)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-        ''',
-            item['dish_id'],
-            item['name'],
-            item.get('description', ''),
-            item['category'],
-            float(item['price']),
-            quantity,
-            item.get('dietary_tags', []),
-            item.get('meal_period', 'All-Day'),
-            item.get('popularity_score', 5),
-            item.get('availability_status', 'Available').lower(),
-            item.get('image', '')
-        )
-
-        inserted_count += 1
-
-        if inserted_count % 50 == 0:
-            print(f"Migrated {inserted_count}/{len(items)} items...")
+    try:
+        diff = None
+        start = time.perf_counter()
+        try:
+            async with conn.transaction():
+                diff = await merge_menu(conn, rows, reset_stock=reset_stock, keep_missing=keep_missing)
+                if dry_run:
+                    raise DryRun()
+        except DryRun:
+            pass
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
 
-    print(f"\n✓ Successfully migrated {inserted_count} menu items to PostgreSQL!")
+        # Diff report
+        print("\nMenu diff:")
+        print("-" * 80)
+        for change in ('added', 'updated', 'removed'):
+            print(f"{change.capitalize()}: {len(diff[change])}")
+            for entry in diff[change]:
+                print(f"  {'+' if change == 'added' else '~' if change == 'updated' else '-'} {entry}")
+        print("-" * 80)
 
-    # Verify the data
-    count = await conn.fetchval("SELECT COUNT(*) FROM menu_items")
-    print(f"✓ Verified: {count} items in database")
-
-    # Show sample items
-    sample_items = await conn.fetch(
-        "SELECT dish_id, name, category, price, quantity, availability_status FROM menu_items LIMIT 5"
-    )
+        if dry_run:
+            print(f"\n✓ Dry run: nothing written ({elapsed_ms:.1f} ms)")
+        else:
+            count = await conn.fetchval("SELECT COUNT(*) FROM menu_items")
+            print(f"\n✓ Menu imported in one transaction ({elapsed_ms:.1f} ms), {count} items in database")
+    finally:
+        await conn.close()
+    return True
 
-    print("\nSample migrated items:")
-    print("-" * 80)
-    for item in sample_items:
-        print(f"{item['dish_id']}: {item['name']} ({item['category']}) - ₹{item['price']} - Qty: {item['quantity']} - {item['availability_status']}")
-    print("-" * 80)
 
-    await conn.close()
-    print("\n✓ Migration completed successfully!")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import a menu JSON file into PostgreSQL")
+    parser.add_argument('--file', type=Path, default=DEFAULT_MENU_PATH, help="Menu JSON file (default: app/data/menu.json)")
+    parser.add_argument('--dry-run', action='store_true', help="Validate and show the diff without writing")
+    parser.add_argument('--reset-stock', action='store_true', help=f"Reset stock of every dish to {DEFAULT_QUANTITY} (0 if unavailable)")
+    parser.add_argument('--keep-missing', action='store_true', help="Keep dishes that are not in the file")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(migrate_menu_to_postgres())
+    args = parse_args()
+    ok = asyncio.run(migrate_menu_to_postgres(args.file, args.dry_run, args.reset_stock, args.keep_missing))
+    raise SystemExit(0 if ok else 1)
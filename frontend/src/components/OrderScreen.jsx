@@ -181,11 +181,20 @@ const OrderScreen = ({ onClose }) => {
   const menuSideRef = useRef(null)
   const lastHighlightedItemRef = useRef({ name: null, timestamp: 0 })
   const fullBotResponseRef = useRef('') // Accumulate full response for food detection
+  const codecRef = useRef('pcm') // Uplink codec negotiated with the backend ('pending' until config_ack)
+  const codecTimeoutRef = useRef(null)
+  const downlinkMimeRef = useRef('audio/wav') // Container of bot audio blobs
+  const opusEncoderRef = useRef(null)
+  const opusTimestampRef = useRef(0)
 
   const SAMPLE_RATE = 16000
   const CHUNK_SIZE = 512
+  const OPUS_FRAME_SIZE = 320 // 20 ms at 16 kHz
+  const OPUS_MIME = 'audio/ogg; codecs=opus'
+  const CODEC_ACK_TIMEOUT_MS = 2000
   const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
   const WS_URL = `${wsProtocol}//${window.location.host}/ws/audio`
+  const SESSION_KEY = 'hotelbot_session_id'
 
   // Initialize WebSocket connection and start listening automatically on mount
   useEffect(() => {
@@ -197,6 +206,7 @@ const OrderScreen = ({ onClose }) => {
     }, 1000) // Wait 1 second for WebSocket to connect
 
     return () => {
+      clearTimeout(codecTimeoutRef.current)
       disconnectWebSocket()
       stopRecording()
     }
@@ -213,11 +223,14 @@ const OrderScreen = ({ onClose }) => {
 
   const connectWebSocket = () => {
     try {
-      wsRef.current = new WebSocket(WS_URL)
+      // Reconnect with the same session so the backend resumes this table's cart
+      const sessionId = sessionStorage.getItem(SESSION_KEY)
+      wsRef.current = new WebSocket(sessionId ? `${WS_URL}?session_id=${encodeURIComponent(sessionId)}` : WS_URL)
 
       wsRef.current.onopen = () => {
         console.log('✅ WebSocket connected')
         setWsStatus('Connected')
+        negotiateCodec()
       }
 
       wsRef.current.onmessage = async (event) => {
@@ -302,8 +315,29 @@ const OrderScreen = ({ onClose }) => {
                 console.log('❌ No food items detected in response')
               }
             }
+          } else if (data.type === 'config_ack') {
+            console.log('🎚️ Audio codec:', data.uplink_codec, '/', data.downlink_codec)
+            clearTimeout(codecTimeoutRef.current)
+            codecRef.current = data.uplink_codec
+            downlinkMimeRef.current = data.downlink_codec === 'opus' ? OPUS_MIME : 'audio/wav'
+          } else if (data.type === 'stop_playback') {
+            // Customer interrupted the bot (barge-in) - drop everything queued
+            console.log('🛑 Stop playback:', data.reason)
+            sentenceQueueRef.current = []
+            currentSentenceChunksRef.current = []
+            isPlayingSentenceRef.current = false
+            setIsPlayingAudio(false)
+            if (audioElementRef.current) {
+              audioElementRef.current.onended = null
+              audioElementRef.current.pause()
+            }
           } else if (data.type === 'status') {
             console.log('📡 Status:', data.message)
+            if (data.session_id) {
+              sessionStorage.setItem(SESSION_KEY, data.session_id)
+            }
+          } else if (data.type === 'session_resumed') {
+            console.log('♻️ Session resumed with', data.current_order.length, 'item(s)')
           } else if (data.type === 'order_confirmed') {
             // Order confirmed - show confirmation screen
             console.log('✅ Order confirmed:', data)
@@ -349,6 +383,85 @@ const OrderScreen = ({ onClose }) => {
     }
   }
 
+  // Ask for Opus in both directions when this browser can encode it (WebCodecs)
+  // and play Ogg Opus; otherwise stay on raw PCM up / WAV down
+  const negotiateCodec = async () => {
+    codecRef.current = 'pcm'
+    downlinkMimeRef.current = 'audio/wav'
+
+    try {
+      if (!('AudioEncoder' in window) || !new Audio().canPlayType(OPUS_MIME)) {
+        return
+      }
+      const { supported } = await AudioEncoder.isConfigSupported({
+        codec: 'opus',
+        sampleRate: SAMPLE_RATE,
+        numberOfChannels: 1
+      })
+      if (supported && wsRef.current?.readyState === WebSocket.OPEN) {
+        // No audio until config_ack: the backend decodes everything after the
+        // config message with the new codec, so PCM frames sent now would be noise
+        codecRef.current = 'pending'
+        wsRef.current.send(JSON.stringify({ type: 'config', audio_codec: 'opus' }))
+        clearTimeout(codecTimeoutRef.current)
+        codecTimeoutRef.current = setTimeout(() => {
+          if (codecRef.current === 'pending' && wsRef.current?.readyState === WebSocket.OPEN) {
+            console.warn('No config_ack, using PCM')
+            codecRef.current = 'pcm'
+            wsRef.current.send(JSON.stringify({ type: 'config', audio_codec: 'pcm' }))
+          }
+        }, CODEC_ACK_TIMEOUT_MS)
+      }
+    } catch (e) {
+      console.warn('Opus not available, using PCM:', e)
+    }
+  }
+
+  const createOpusEncoder = () => {
+    const encoder = new AudioEncoder({
+      output: (chunk) => {
+        const packet = new Uint8Array(chunk.byteLength)
+        chunk.copyTo(packet)
+        if (wsRef.current?.readyState === WebSocket.OPEN) {
+          wsRef.current.send(packet.buffer)
+        }
+      },
+      error: (e) => {
+        console.error('❌ Opus encoder error, falling back to PCM:', e)
+        codecRef.current = 'pcm'
+        if (wsRef.current?.readyState === WebSocket.OPEN) {
+          wsRef.current.send(JSON.stringify({ type: 'config', audio_codec: 'pcm' }))
+        }
+      }
+    })
+    encoder.configure({
+      codec: 'opus',
+      sampleRate: SAMPLE_RATE,
+      numberOfChannels: 1,
+      bitrate: 16000,
+      opus: { frameDuration: 20000 }
+    })
+    opusTimestampRef.current = 0
+    return encoder
+  }
+
+  const encodeOpusFrame = (samples) => {
+    if (!opusEncoderRef.current || opusEncoderRef.current.state === 'closed') {
+      opusEncoderRef.current = createOpusEncoder()
+    }
+    const audioData = new AudioData({
+      format: 'f32',
+      sampleRate: SAMPLE_RATE,
+      numberOfFrames: samples.length,
+      numberOfChannels: 1,
+      timestamp: opusTimestampRef.current,
+      data: new Float32Array(samples)
+    })
+    opusTimestampRef.current += (samples.length * 1e6) / SAMPLE_RATE
+    opusEncoderRef.current.encode(audioData)
+    audioData.close()
+  }
+
   const disconnectWebSocket = () => {
     if (wsRef.current) {
       wsRef.current.close()
@@ -413,6 +526,11 @@ const OrderScreen = ({ onClose }) => {
         const level = Math.min(1, rms * 10) // Amplify and clamp to 0-1
         setAudioLevel(level)
 
+        // Codec switch in flight - drop audio until the backend acknowledges it
+        if (codecRef.current === 'pending') {
+          return
+        }
+
         // Resample to 16kHz
         const resampledLength = Math.floor(inputData.length / resampleRatio)
         const resampledData = new Float32Array(resampledLength)
@@ -426,7 +544,11 @@ const OrderScreen = ({ onClose }) => {
         for (let i = 0; i < resampledData.length; i++) {
           audioBuffer.push(resampledData[i])
 
-          if (audioBuffer.length >= CHUNK_SIZE) {
+          if (codecRef.current === 'opus') {
+            if (audioBuffer.length >= OPUS_FRAME_SIZE) {
+              encodeOpusFrame(audioBuffer.splice(0, OPUS_FRAME_SIZE))
+            }
+          } else if (audioBuffer.length >= CHUNK_SIZE) {
             const chunk = audioBuffer.splice(0, CHUNK_SIZE)
             const float32Array = new Float32Array(chunk)
             const int16Array = new Int16Array(CHUNK_SIZE)
@@ -467,6 +589,13 @@ const OrderScreen = ({ onClose }) => {
 
   const stopRecording = async () => {
     try {
+      if (opusEncoderRef.current) {
+        if (opusEncoderRef.current.state !== 'closed') {
+          opusEncoderRef.current.close()
+        }
+        opusEncoderRef.current = null
+      }
+
       if (processorRef.current) {
         processorRef.current.disconnect()
         processorRef.current.onaudioprocess = null
@@ -513,7 +642,7 @@ const OrderScreen = ({ onClose }) => {
       isPlayingSentenceRef.current = true
       setIsPlayingAudio(true)
 
-      const audioBlob = new Blob(sentenceChunks, { type: 'audio/wav' })
+      const audioBlob = new Blob(sentenceChunks, { type: downlinkMimeRef.current })
       const audioUrl = URL.createObjectURL(audioBlob)
 
       if (!audioElementRef.current) {